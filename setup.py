@@ -230,6 +230,9 @@ setup(
         'sqlite': [],
         'sqlite3': [],
         'memcache': memcache_require,
+        # Faster compression for the local cache.
+        'zstd': ['zstandard'],
+        'lz4': ['lz4'],
         'test': tests_require,
         'docs': [
             'sphinx',
@@ -52,6 +52,7 @@ class AbstractAdapter(DatabaseHelpersMixin):
     mover = None # type: IObjectMover
     connmanager = None # type: IConnectionManager
     oidallocator = None # type: IOIDAllocator
+    poller = None # type: IPoller
     dbiter = None # type: DatabaseIterator
     packundo = None
 
@@ -68,6 +69,8 @@ class AbstractAdapter(DatabaseHelpersMixin):
         # instances, so no need to register the openings.
         connmanager_was_set = self.connmanager is not None
         self._create()
+        self.packundo._invalidation_log_exists_query = (
+            self.mover._invalidation_log_exists_query)
         if not driver.supports_64bit_unsigned_id:
             self.packundo.MAX_TID = MAX_S_TID
             self.MAX_TID = MAX_S_TID
@@ -77,6 +80,7 @@ class AbstractAdapter(DatabaseHelpersMixin):
             self.connmanager.add_on_store_opened(self.mover.on_store_opened)
             self.connmanager.add_on_load_opened(self.mover.on_load_opened)
             self.connmanager.add_on_store_opened(self.locker.on_store_opened)
+            self.connmanager.start_replica_lag_monitor(self.poller.get_current_tid)
 
     def _create(self):
         raise NotImplementedError
@@ -90,6 +94,7 @@ class AbstractAdapter(DatabaseHelpersMixin):
         if self.oidallocator is not None:
             self.oidallocator.close()
             self.oidallocator = None
+        self.connmanager.stop_replica_lag_monitor()
 
     def _select_driver(self, options=None):
         return _select_driver(
@@ -165,6 +170,7 @@ class AbstractAdapter(DatabaseHelpersMixin):
         after_selecting_tid(committing_tid_int)
 
         self.mover.update_current(cursor, committing_tid_int)
+        self.mover.log_invalidations(cursor, committing_tid_int)
         prepared_txn_id = self.txncontrol.commit_phase1(
             store_connection, committing_tid_int)
 
@@ -19,6 +19,7 @@ from zope.interface import implementer
 from .._compat import metricmethod
 from .interfaces import IConnectionManager
 from .interfaces import ReplicaClosedException
+from .replica import ReplicaLagMonitor
 from .replica import ReplicaSelector
 
 logger = __import__('logging').getLogger(__name__)
@@ -99,6 +100,7 @@ class AbstractConnectionManager(object):
 
     replica_selector = None
     ro_replica_selector = None
+    replica_lag_monitor = None
 
     def __init__(self, options, driver):
         """
@@ -122,7 +124,8 @@ class AbstractConnectionManager(object):
 
         if options.ro_replica_conf:
             self.ro_replica_selector = ReplicaSelector(
-                options.ro_replica_conf, options.replica_timeout)
+                options.ro_replica_conf, options.replica_timeout,
+                options.replica_max_lag)
         else:
             self.ro_replica_selector = self.replica_selector
 
@@ -137,6 +140,32 @@ class AbstractConnectionManager(object):
         self._do_commit = driver.commit
         self._do_rollback = driver.rollback
 
+    def start_replica_lag_monitor(self, get_current_tid):
+        """
+        If ``replica-lag-check-interval`` is set and we have read-only
+        replicas, begin checking how far behind they are in the
+        background so that load connections use the least lagged one.
+
+        *get_current_tid* is ``IPoller.get_current_tid``.
+        """
+        interval = self.options.replica_lag_check_interval
+        if (
+                not interval
+                or self.replica_lag_monitor is not None
+                or self.ro_replica_selector is None
+                or self.ro_replica_selector is self.replica_selector
+        ):
+            return
+        self.replica_lag_monitor = ReplicaLagMonitor(
+            self.ro_replica_selector, self, get_current_tid, interval
+        ).start()
+
+    def stop_replica_lag_monitor(self):
+        monitor = self.replica_lag_monitor
+        self.replica_lag_monitor = None
+        if monitor is not None:
+            monitor.stop()
+
     def add_on_store_opened(self, f):
         """
         Add a callable(cursor, restart=bool) for when a store connection
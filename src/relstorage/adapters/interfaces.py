@@ -914,6 +914,16 @@ class IObjectMover(Interface):
         resolution maybe?
         """
 
+    def log_invalidations(cursor, tid):
+        """
+        Record the OIDs changed by *tid* in the ``invalidation_log``
+        table, if it exists.
+
+        This must be called for every commit once the table exists,
+        after the object states have been moved. Implementations may
+        check whether the table exists only once.
+        """
+
     def download_blob(cursor, oid, tid, filename):
         """Download a blob into a file.
 
@@ -1070,6 +1080,23 @@ class IPoller(Interface):
         transaction.
         """
 
+    def new_commit_listener():
+        """
+        Return a new object that can tell us when a poll would find
+        nothing new, or None if that's not possible.
+
+        The object has a ``mark()`` method, called before a poll
+        query, whose result can later be passed to
+        ``no_changes_since(token)``; if that returns true, nothing has
+        been committed since the poll. It also has ``saw_commit(tid)``,
+        to report a commit made by this process, and ``stop()``.
+
+        The caller is responsible for calling ``start()`` and
+        ``stop()``.
+
+        .. versionadded:: 3.4.1
+        """
+
 class ISchemaInstaller(Interface):
     """Install the schema in the database, clear it, or uninstall it"""
 
@@ -1330,7 +1357,8 @@ class IRelStorageAdapter(Interface):
         (ideally one call). The default implementation will use
         :meth:`lock_database_and_choose_next_tid`,
         :meth:`IObjectMover.move_from_temp`,
-        :meth:`IObjectMover.update_current` and
+        :meth:`IObjectMover.update_current`,
+        :meth:`IObjectMover.log_invalidations`,
         :meth:`ITransactionControl.commit_phase1` and
         :meth:`ITransactionControl.commit_phase2`.
 
@@ -547,6 +547,44 @@ class AbstractObjectMover(DatabaseHelpersMixin, ABC):
         stmt = self._update_current_upsert_query
         stmt.execute(cursor, (tid,))
 
+    _log_invalidations_query = Schema.invalidation_log.insert(
+    ).from_select(
+        (Schema.invalidation_log.c.tid,
+         Schema.invalidation_log.c.zoid),
+        Schema.object_state.select(
+            Schema.object_state.c.tid, Schema.object_state.c.zoid
+        ).where(
+            it.c.tid == it.orderedbindparam()
+        )
+    ).prepared()
+
+    # A query returning a row if the invalidation log exists.
+    # Subclasses that can have the log must define this.
+    _invalidation_log_exists_query = None
+
+    # Whether the invalidation log existed the first time we committed,
+    # or None if we haven't committed yet. We don't check on every
+    # commit, so a process that was running when the table was created
+    # doesn't write to it until it is restarted.
+    _invalidation_log_exists = None
+
+    @metricmethod_sampled
+    def log_invalidations(self, cursor, tid):
+        """
+        Record the objects changed by *tid* in the invalidation log,
+        if there is one.
+        """
+        exists = self._invalidation_log_exists
+        if exists is None:
+            stmt = self._invalidation_log_exists_query
+            exists = False
+            if stmt is not None:
+                cursor.execute(stmt)
+                exists = bool(cursor.fetchall())
+            self._invalidation_log_exists = exists
+        if exists:
+            self._log_invalidations_query.execute(cursor, (tid,))
+
     @metricmethod_sampled
     def download_blob(self, cursor, oid, tid, filename):
         """Download a blob into a file."""
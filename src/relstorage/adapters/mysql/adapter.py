@@ -137,6 +137,7 @@ class MySQLAdapter(AbstractAdapter):
             runner=self.runner,
             keep_history=self.keep_history,
             version_detector=self.version_detector,
+            invalidation_log=options.invalidation_log,
         )
         if self.mover is None:
             self.mover = MySQLObjectMover(
@@ -155,7 +156,8 @@ class MySQLAdapter(AbstractAdapter):
             transactions_may_go_backwards=(
                 self.connmanager.replica_selector is not None
                 or self.connmanager.ro_replica_selector is not None
-            )
+            ),
+            use_invalidation_log=options.invalidation_log,
         )
 
         self.txncontrol = MySQLTransactionControl(
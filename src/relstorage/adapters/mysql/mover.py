@@ -30,6 +30,13 @@ class MySQLObjectMover(AbstractObjectMover):
 
     _create_temp_store = Schema.temp_store.create()
 
+    _invalidation_log_exists_query = """
+    SELECT 1
+    FROM information_schema.tables
+    WHERE table_schema = DATABASE()
+        AND table_name = 'invalidation_log'
+    """
+
     @metricmethod_sampled
     def on_store_opened(self, cursor, restart=False):
         """Create the temporary table for storing objects"""
@@ -52,6 +52,17 @@ BEGIN
   -- History free has no current_object to update.
 
 
+  -- Record the changes for pollers, if the optional invalidation
+  -- log has been installed (error 1146 is a missing table). Once it
+  -- exists, every commit must do this.
+  BEGIN
+    DECLARE CONTINUE HANDLER FOR 1146 BEGIN END;
+    INSERT INTO invalidation_log (tid, zoid)
+    SELECT tid, zoid
+    FROM object_state
+    WHERE tid = p_committing_tid;
+  END;
+
   IF p_commit THEN
     COMMIT;
     -- Clean up all our temp state, *after* releasing our locks.
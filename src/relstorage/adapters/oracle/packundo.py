@@ -38,6 +38,8 @@ class OracleHistoryPreservingPackUndo(HistoryPreservingPackUndo):
 
     dialect = OracleDialect()
 
+    _trim_invalidation_log_stmt = None
+
     _script_choose_pack_transaction = """
         SELECT MAX(tid)
         FROM transaction
@@ -80,6 +82,8 @@ class OracleHistoryFreePackUndo(HistoryFreePackUndo):
 
     dialect = OracleDialect()
 
+    _trim_invalidation_log_stmt = None
+
     _script_choose_pack_transaction = """
         SELECT MAX(tid)
         FROM object_state
@@ -127,6 +127,33 @@ class PackUndo(DatabaseHelpersMixin):
         finally:
             self.connmanager.close(conn, cursor)
 
+    # Set to None if the database can't have an invalidation log.
+    _trim_invalidation_log_stmt = """
+    DELETE FROM invalidation_log
+    WHERE tid <= %(pack_tid)s
+    """
+
+    # The adapter copies this from its mover, so we trim the log
+    # exactly when commits write to it.
+    _invalidation_log_exists_query = None
+
+    def _trim_invalidation_log(self, cursor, pack_tid):
+        """
+        Remove the invalidation log entries at or before *pack_tid*,
+        if there is an invalidation log.
+
+        Pollers that last polled before then go back to polling the
+        object table, so this only costs them a slower poll.
+        """
+        stmt = self._trim_invalidation_log_stmt
+        exists_stmt = self._invalidation_log_exists_query
+        if not stmt or exists_stmt is None:
+            return
+        cursor.execute(exists_stmt)
+        if cursor.fetchall():
+            logger.debug("pack: trimming the invalidation log")
+            self.runner.run_script_stmt(cursor, stmt, {'pack_tid': pack_tid})
+
     @contextmanager
     def _make_ss_load_cursor(self, load_connection):
         # server_side_cursor() is a generator function. If we just call it and don't
@@ -1043,6 +1070,7 @@ class HistoryPreservingPackUndo(PackUndo):
                         packed_func(oid, tid)
                 packed_list = None
 
+                self._trim_invalidation_log(store_connection.cursor, pack_tid)
                 self._pack_cleanup(store_connection)
 
             except:
@@ -1666,6 +1694,7 @@ class HistoryFreePackUndo(PackUndo):
 
                 # In a DB that previously had 60MM objects, and collected 32MM,
                 # on Postgres this phase took 15 minutes
+                self._trim_invalidation_log(store_connection.cursor, pack_tid)
                 self._pack_cleanup(store_connection)
 
             except:
@@ -17,6 +17,8 @@ import logging
 
 from zope.interface import implementer
 
+from relstorage._util import get_positive_integer_from_environ
+
 from .interfaces import IPoller
 from .interfaces import StaleConnectionError
 
@@ -45,13 +47,46 @@ class Poller(object):
         func.max(Schema.all_transaction.c.tid)
     ).prepared()
 
+    # The invalidation log has a row for each object changed by each
+    # transaction, so we have to group them ourselves. The log only
+    # covers ``tid`` if it has the transactions after it; those before
+    # the log was created, or packed away, aren't in it, and we find
+    # nothing. (Every commit writes to the log once it exists, and
+    # packing only removes the oldest rows, so it has no gaps.)
+    _poll_inv_log_query = """
+    SELECT zoid, MAX(tid)
+    FROM invalidation_log
+    WHERE tid > %(tid)s
+      AND %(tid)s >= (SELECT MIN(tid) FROM invalidation_log)
+    GROUP BY zoid
+    ORDER BY MAX(tid) DESC
+    """
+
+    _invalidation_log_min_tid_query = Schema.invalidation_log.select(
+        func.min(Schema.invalidation_log.c.tid)
+    ).prepared()
+
+    #: How many changed rows to fetch from the database at a time.
+    poll_chunk_size = get_positive_integer_from_environ('RS_POLL_CHUNK_SIZE', 10000)
+
     def __init__(self, driver, keep_history, runner,
-                 revert_when_stale, transactions_may_go_backwards):
+                 revert_when_stale, transactions_may_go_backwards,
+                 use_invalidation_log=False):
         self.driver = driver
         self.keep_history = keep_history
         self.runner = runner
         self.revert_when_stale = revert_when_stale
         self.transactions_may_go_backwards = transactions_may_go_backwards
+        self.use_invalidation_log = use_invalidation_log
+
+    def new_commit_listener(self):
+        """
+        See ``IPoller``.
+
+        This implementation has no way to learn about commits, so it
+        returns None.
+        """
+        return None
 
     def get_current_tid(self, cursor):
         self._poll_newest_tid_query.execute(cursor)
@@ -72,11 +107,8 @@ class Poller(object):
         # The current_object table might move forward by a transaction while we're accessing the
         # transaction table, leading to the results being inconsistent.
         # For this reason, we only perform a single poll query against the actual object data.
-        # We order this to get the newest TID first, and we return a chain iterator
-        #
-        # Return the cursor: let it be its own iterable. This could be a
-        # very large result set. For things that matter, like gevent,
-        # consume in batches allowing periodic switches.
+        # We order this to get the newest TID first, and we return an iterator
+        # that consumes the rest of the cursor in batches.
         if prev_polled_tid is None:
             # This is the first time the connection has polled.
             # We'd have to list the entire database for the changes,
@@ -85,8 +117,13 @@ class Poller(object):
             return None, self.get_current_tid(cursor)
 
         params = {'tid': prev_polled_tid}
-        self._poll_inv_query.execute(cursor, params)
-        rows = cursor.fetchall()
+        rows = None
+        if self.use_invalidation_log:
+            rows = self._poll_invalidation_log(cursor, params)
+        if rows is None:
+            self._poll_inv_query.execute(cursor, params)
+            # Only the first row is needed to know the newest TID.
+            rows = cursor.fetchmany(self.poll_chunk_size)
         if not rows:
             if self.transactions_may_go_backwards:
                 # No detectable changes. Perhaps we went backwards? Check that,
@@ -142,4 +179,35 @@ class Poller(object):
         #
         # Thus we became convinced it was safe to remove the check in
         # history-preserving databases.
-        return rows, new_polled_tid
+        return self._iter_changes(conn, cursor, rows), new_polled_tid
+
+    def _poll_invalidation_log(self, cursor, params):
+        """
+        Find the changes since ``params['tid']`` in the invalidation
+        log, returning the first chunk of rows, or None if the log
+        doesn't go back that far.
+        """
+        self.runner.run_script_stmt(cursor, self._poll_inv_log_query, params)
+        rows = cursor.fetchmany(self.poll_chunk_size)
+        if rows:
+            return rows
+        # Either nothing changed, or the log doesn't cover the TID.
+        self._invalidation_log_min_tid_query.execute(cursor)
+        (min_tid,), = cursor.fetchall() or ((None,),)
+        if min_tid is not None and min_tid <= params['tid']:
+            return rows
+        return None
+
+    def _iter_changes(self, conn, cursor, rows):
+        # After a bulk import or a long disconnection, there could be
+        # millions of rows. Turning them all into Python objects at
+        # once would be a very large list that we immediately throw
+        # away, so we go a chunk at a time. Between chunks, let other
+        # greenlets run.
+        sleep = getattr(conn, 'gevent_sleep', None)
+        while rows:
+            for row in rows:
+                yield row
+            if sleep is not None:
+                sleep()
+            rows = cursor.fetchmany(self.poll_chunk_size)
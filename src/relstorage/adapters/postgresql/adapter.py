@@ -32,6 +32,7 @@ from ..scriptrunner import ScriptRunner
 from . import drivers
 from .batch import PostgreSQLRowBatcher
 from .connmanager import Psycopg2ConnectionManager
+from .listener import CommitListener
 from .locker import PostgreSQLLocker
 from .mover import PostgreSQLObjectMover
 
@@ -55,6 +56,32 @@ class PGPoller(Poller):
         1
     ).prepared()
 
+    def __init__(self, driver, keep_history, runner,
+                 revert_when_stale, transactions_may_go_backwards,
+                 connmanager=None, listen_for_commits=False,
+                 use_invalidation_log=False):
+        super(PGPoller, self).__init__(driver, keep_history, runner,
+                                       revert_when_stale, transactions_may_go_backwards,
+                                       use_invalidation_log)
+        self.connmanager = connmanager
+        self.listen_for_commits = listen_for_commits
+
+    def new_commit_listener(self):
+        # With replicas, the commit we hear about on the primary
+        # may not have made it to the replica we load from.
+        if (not self.listen_for_commits
+                or self.transactions_may_go_backwards
+                or not self.driver.supports_notifications):
+            return None
+
+        connmanager = self.connmanager
+        def connect():
+            return connmanager.open(
+                isolation=connmanager.isolation_read_committed,
+                application_name='RS: Listen'
+            )
+        return CommitListener(self.driver, connect, connmanager.close)
+
 
 @implementer(IRelStorageAdapter)
 class PostgreSQLAdapter(AbstractAdapter):
@@ -121,7 +148,10 @@ class PostgreSQLAdapter(AbstractAdapter):
             transactions_may_go_backwards=(
                 self.connmanager.replica_selector is not None
                 or self.connmanager.ro_replica_selector is not None
-            )
+            ),
+            connmanager=self.connmanager,
+            listen_for_commits=options.poll_notify,
+            use_invalidation_log=options.invalidation_log,
         )
 
         self.txncontrol = PostgreSQLTransactionControl(
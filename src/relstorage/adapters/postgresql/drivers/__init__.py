@@ -41,6 +41,9 @@ class AbstractPostgreSQLDriver(AbstractModuleDriver):
     # Can we use the COPY command (copy_export)?
     supports_copy = True
 
+    # Can we LISTEN for notifications (listen, wait_for_notifications)?
+    supports_notifications = False
+
     # PostgreSQL is the database most likey to generate
     # server-sent messages. Log those using a logger that
     # includes that name.
@@ -67,6 +70,19 @@ class AbstractPostgreSQLDriver(AbstractModuleDriver):
         """
         raise NotImplementedError
 
+    def listen(self, conn, cursor, channel):
+        """
+        Put *conn* in autocommit mode and begin listening on *channel*.
+        """
+        raise NotImplementedError
+
+    def wait_for_notifications(self, conn, timeout):
+        """
+        Wait up to *timeout* seconds for notifications on *conn*, and
+        return a list of their payloads (possibly empty).
+        """
+        raise NotImplementedError
+
     def set_lock_timeout(self, cursor, timeout):
         # PG8000 needs a literal embedded in the string; prepared
         # statements can't be SET with a variable.
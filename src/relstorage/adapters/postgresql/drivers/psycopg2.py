@@ -19,6 +19,8 @@ psycopg2 IDBDriver implementations.
 from __future__ import absolute_import
 from __future__ import print_function
 
+import select
+
 from zope.interface import implementer
 
 from relstorage.adapters.drivers import GeventConnectionMixin
@@ -57,6 +59,8 @@ class Psycopg2Driver(MemoryViewBlobDriverMixin,
     PRIORITY = 1
     PRIORITY_PYPY = 2
 
+    supports_notifications = True
+
     def __init__(self):
         super(Psycopg2Driver, self).__init__()
 
@@ -143,6 +147,19 @@ class Psycopg2Driver(MemoryViewBlobDriverMixin,
 
         return conn
 
+    def listen(self, conn, cursor, channel):
+        conn.autocommit = True
+        cursor.execute('LISTEN ' + channel)
+
+    def wait_for_notifications(self, conn, timeout):
+        if select.select((conn,), (), (), timeout) == ([], [], []):
+            return []
+        conn.poll()
+        notifies = conn.notifies
+        payloads = [n.payload for n in notifies]
+        del notifies[:]
+        return payloads
+
     def cursor(self, conn, server_side=False):
         if server_side:
             cursor = conn.cursor(name=str(id(conn)))
@@ -228,6 +245,8 @@ class GeventPsycopg2Driver(GeventDriverMixin, Psycopg2Driver):
     _GEVENT_NEEDS_SOCKET_PATCH = False
 
     supports_copy = False
+    # Waiting for notifications would block the hub.
+    supports_notifications = False
 
     def _create_connection(self, mod, *extra_slots):
         if getattr(mod, 'RSGeventPsycopg2Connection', self) is self:
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""
+Listening for commits with PostgreSQL's LISTEN/NOTIFY.
+
+The stored procedures that choose a TID for a commit also
+``pg_notify`` a channel. PostgreSQL only delivers notifications for
+transactions that actually commit, and only after they do. A process
+that listens on that channel can therefore know that nothing has been
+committed since it last polled, and skip the poll query.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+logger = __import__('logging').getLogger(__name__)
+
+
+class CommitListener(object):
+    """
+    Listens for commit notifications in a daemon thread.
+
+    The thread holds its own autocommit connection, opened by
+    calling *connect*, which must return ``(conn, cursor)``.
+    Notifications are read from it with *driver*. If the connection
+    is lost, we try again every *reconnect_interval* seconds; until
+    then, :meth:`no_changes_since` always answers False, so callers
+    fall back to polling.
+
+    Callers use this by getting a token from :meth:`mark` *before*
+    they query for changes. Later, if :meth:`no_changes_since` returns
+    true for that token, the database hasn't changed since the query.
+    """
+
+    CHANNEL = 'relstorage_commit'
+
+    #: How long to wait for notifications before checking
+    #: to see if we've been stopped.
+    wait_interval = 1.0
+    reconnect_interval = 5.0
+
+    def __init__(self, driver, connect, close):
+        self.driver = driver
+        self._connect = connect
+        self._close = close
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        # Incremented each time anything happens that could mean
+        # a commit we haven't polled for: a notification, a local commit,
+        # a (re)connection or disconnection.
+        self._generation = 0
+        self.connected = False
+        self.latest_tid = 0
+        self.notification_count = 0
+        self.skipped_poll_count = 0
+        self._thread = threading.Thread(target=self._run, name='pg-commit-listener')
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def mark(self):
+        """
+        Return a token identifying the current state, or None if we're
+        not listening.
+        """
+        with self._lock:
+            return self._generation if self.connected else None
+
+    def no_changes_since(self, token):
+        """
+        Has the connection stayed up and nothing been committed since
+        *token* was returned by :meth:`mark`?
+        """
+        if token is None:
+            return False
+        with self._lock:
+            result = self.connected and token == self._generation
+        if result:
+            self.skipped_poll_count += 1
+        return result
+
+    def saw_commit(self, tid):
+        """
+        Note that *tid* was committed.
+
+        The listener thread calls this for each notification, but
+        this process may also call it for its own commits; the
+        notification for those may not arrive before the committing
+        thread begins its next transaction.
+        """
+        with self._lock:
+            self._generation += 1
+            if tid and tid > self.latest_tid:
+                self.latest_tid = tid
+
+    def _set_connected(self, connected):
+        with self._lock:
+            self._generation += 1
+            self.connected = connected
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception: # pylint:disable=broad-except
+                logger.exception(
+                    "Lost the connection listening for commits; "
+                    "polling for every transaction until it's back."
+                )
+            self._stopped.wait(self.reconnect_interval)
+
+    def _listen(self):
+        conn, cursor = self._connect()
+        try:
+            self.driver.listen(conn, cursor, self.CHANNEL)
+            self._set_connected(True)
+            while not self._stopped.is_set():
+                for payload in self.driver.wait_for_notifications(conn, self.wait_interval):
+                    self.notification_count += 1
+                    try:
+                        tid = int(payload)
+                    except (TypeError, ValueError):
+                        tid = 0
+                    self.saw_commit(tid)
+        finally:
+            self._set_connected(False)
+            self._close(conn, cursor)
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'listener_connected': self.connected,
+            'listener_notifications': self.notification_count,
+            'listener_latest_tid': self.latest_tid,
+            'listener_skipped_polls': self.skipped_poll_count,
+        }
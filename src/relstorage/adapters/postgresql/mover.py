@@ -39,6 +39,13 @@ class PostgreSQLRowBatcherStoreTemps(RowBatcherStoreTemps):
 @implementer(IObjectMover)
 class PostgreSQLObjectMover(AbstractObjectMover):
 
+    # Commits write the log from the stored procedure, which makes the
+    # same check; this is for packing.
+    _invalidation_log_exists_query = """
+    SELECT 1
+    WHERE to_regclass('invalidation_log') IS NOT NULL
+    """
+
     def __init__(self, *args, **kwargs):
         super(PostgreSQLObjectMover, self).__init__(*args, **kwargs)
         if not self.driver.supports_copy:
@@ -247,6 +254,10 @@ class PostgreSQLObjectMover(AbstractObjectMover):
             WHERE temp_store.zoid = r.zoid
             """
         )
+        # The table is only emptied at commit, and we can be called
+        # many times in a transaction (see ``store-stream-size``),
+        # possibly with the same OIDs.
+        cursor.execute('DELETE FROM temp_store_replacements')
 
 
 class TempStoreCopyBuffer(io.BufferedIOBase):
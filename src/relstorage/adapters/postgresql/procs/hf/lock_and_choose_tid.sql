@@ -35,6 +35,10 @@ BEGIN
     next_tid_64 := current_tid_64 + 1;
   END IF;
 
+  -- Tell anyone listening (see listener.py) that there's a new
+  -- transaction. This is only delivered if we commit.
+  PERFORM pg_notify('relstorage_commit', next_tid_64::text);
+
   RETURN next_tid_64;
 END;
 $$
@@ -49,6 +49,19 @@ BEGIN
   FROM temp_blob_chunk;
 
   -- History free has no current_object to update.
+  -- Record the changes for pollers, if the optional invalidation
+  -- log has been installed. Once it exists, every commit must do this.
+  IF to_regclass('invalidation_log') IS NOT NULL THEN
+    INSERT INTO invalidation_log (tid, zoid)
+    SELECT tid, zoid
+    FROM object_state
+    WHERE tid = p_committing_tid;
+  END IF;
+
+  -- If we chose the TID above, this duplicates that notification,
+  -- but PostgreSQL only delivers one of them.
+  PERFORM pg_notify('relstorage_commit', p_committing_tid::text);
+
   RETURN p_committing_tid;
 END;
 $$
@@ -39,6 +39,10 @@ BEGIN
         next_tid_64, p_packed, p_username, p_description, p_extension
     );
 
+  -- Tell anyone listening (see listener.py) that there's a new
+  -- transaction. This is only delivered if we commit.
+  PERFORM pg_notify('relstorage_commit', next_tid_64::text);
+
   RETURN next_tid_64;
 END;
 $$
@@ -85,7 +85,8 @@ class PostgreSQLSchemaInstaller(AbstractSchemaInstaller):
     def __init__(self, options, connmanager, runner, locker):
         self.options = options
         super(PostgreSQLSchemaInstaller, self).__init__(
-            connmanager, runner, options.keep_history)
+            connmanager, runner, options.keep_history,
+            invalidation_log=options.invalidation_log)
         self.locker = locker
 
     def _read_proc_files(self):
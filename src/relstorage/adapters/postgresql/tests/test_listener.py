@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+from relstorage.tests import TestCase
+
+from ..listener import CommitListener
+
+
+class MockDriver(object):
+
+    def __init__(self):
+        self.listening = []
+        self.payloads = []
+        self.delivered = threading.Event()
+
+    def listen(self, _conn, _cursor, channel):
+        self.listening.append(channel)
+
+    def wait_for_notifications(self, _conn, _timeout):
+        payloads = self.payloads
+        self.payloads = []
+        if not payloads:
+            self.delivered.set()
+        return payloads
+
+
+class TestCommitListener(TestCase):
+
+    def _makeOne(self, driver=None, connect=lambda: (None, None)):
+        closed = []
+        listener = CommitListener(driver or MockDriver(), connect,
+                                  lambda *args: closed.append(args))
+        listener.closed = closed
+        listener.wait_interval = 0.01
+        listener.reconnect_interval = 0.01
+        return listener
+
+    def test_not_connected(self):
+        listener = self._makeOne()
+        self.assertIsNone(listener.mark())
+        self.assertFalse(listener.no_changes_since(None))
+
+    def test_tokens(self):
+        listener = self._makeOne()
+        listener._set_connected(True)
+        token = listener.mark()
+        self.assertTrue(listener.no_changes_since(token))
+        listener.saw_commit(5)
+        self.assertFalse(listener.no_changes_since(token))
+        self.assertEqual(listener.latest_tid, 5)
+        token = listener.mark()
+        self.assertTrue(listener.no_changes_since(token))
+        # Losing the connection invalidates tokens, even if we
+        # get it back.
+        listener._set_connected(False)
+        self.assertFalse(listener.no_changes_since(token))
+        listener._set_connected(True)
+        self.assertFalse(listener.no_changes_since(token))
+        self.assertEqual(listener.stats()['listener_skipped_polls'], 2)
+
+    def test_thread(self):
+        driver = MockDriver()
+        driver.payloads = ['42', 'junk']
+        listener = self._makeOne(driver).start()
+        try:
+            self.assertTrue(driver.delivered.wait(5))
+            self.assertEqual(driver.listening, [CommitListener.CHANNEL])
+            self.assertTrue(listener.connected)
+            self.assertEqual(listener.notification_count, 2)
+            self.assertEqual(listener.latest_tid, 42)
+        finally:
+            listener.stop(5)
+        self.assertFalse(listener._thread.is_alive())
+        self.assertFalse(listener.connected)
+        self.assertEqual(listener.closed, [(None, None)])
+
+    def test_reconnect(self):
+        attempts = []
+        reconnected = threading.Event()
+        def connect():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ValueError("Connection refused")
+            reconnected.set()
+            return None, None
+        listener = self._makeOne(connect=connect).start()
+        try:
+            self.assertTrue(reconnected.wait(5))
+        finally:
+            listener.stop(5)
+        self.assertEqual(len(attempts), 2)
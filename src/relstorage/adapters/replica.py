@@ -14,13 +14,18 @@
 from __future__ import absolute_import
 
 import os
+import threading
 import time
 
+from persistent.timestamp import TimeStamp
 from zope.interface import implementer
 
 from .._compat import metricmethod
+from .._util import int64_to_8bytes
 from .interfaces import IReplicaSelector
 
+logger = __import__('logging').getLogger(__name__)
+
 
 @implementer(IReplicaSelector)
 class ReplicaSelector(object):
@@ -28,9 +33,26 @@ class ReplicaSelector(object):
     # The time at which we checked the config
     _config_checked = 0
 
-    def __init__(self, fn, replica_timeout):
+    #: If set, the number of seconds a replica may lag behind the
+    #: primary before we stop using it. See ``replica-max-lag``.
+    max_lag = 0
+
+    #: How many seconds less lagged another replica must be before
+    #: we move to it from a healthy one. Switching replicas closes
+    #: every connection using the old one, so we don't want to flap.
+    lag_tolerance = 1.0
+
+    def __init__(self, fn, replica_timeout, max_lag=0):
         self.replica_conf = fn
         self.replica_timeout = replica_timeout
+        self.max_lag = max_lag or 0
+        # set_lags() is called from a ReplicaLagMonitor's thread, while
+        # current() and next() are called from request threads; this
+        # guards the current replica and iteration state they share.
+        self._lock = threading.Lock()
+        # {replica: seconds behind, or None if we couldn't check it}.
+        # Empty until someone (a ReplicaLagMonitor) tells us.
+        self.lags = {}
         self._read_config()
         self._select(0)
         self._iterating = False
@@ -54,6 +76,11 @@ class ReplicaSelector(object):
             raise IndexError(
                 "No replicas specified in %s" % self.replica_conf)
         self._replicas = replicas
+        self.lags = {}
+
+    @property
+    def replicas(self):
+        return list(self._replicas)
 
     def _is_config_modified(self):
         now = time.time()
@@ -72,15 +99,63 @@ class ReplicaSelector(object):
         else:
             self._expiration = None
 
+    def _preferred_index(self):
+        """
+        The index of the healthy replica with the least lag, or of
+        the first replica if we don't know about lag.
+        """
+        lags = self.lags
+        best_lag = None
+        best_index = 0
+        for i, replica in enumerate(self._replicas):
+            lag = lags.get(replica)
+            if lag is not None and (best_lag is None or lag < best_lag):
+                best_lag = lag
+                best_index = i
+        return best_index
+
+    def set_lags(self, lags):
+        """
+        Record how far behind the primary each replica is, as a
+        mapping from replica to seconds, or to None if it couldn't be
+        checked, and move to a better replica if the current one is
+        unhealthy, too far behind, or much more lagged than another.
+
+        Moving to a less lagged replica never takes a load connection
+        backwards in time, so it doesn't cause stale reads.
+        """
+        lags = dict(lags)
+        with self._lock:
+            self.lags = lags
+            best_index = self._preferred_index()
+            best_lag = lags.get(self._replicas[best_index])
+            if best_lag is None:
+                # Nothing is healthy; leave failover to next().
+                return
+            current_lag = lags.get(self._current_replica)
+            if (
+                    current_lag is None
+                    or (self.max_lag and current_lag > self.max_lag)
+                    or best_lag + self.lag_tolerance < current_lag
+            ):
+                if best_index != self._current_index:
+                    logger.info(
+                        "Switching from replica %s (lag %s) to %s (lag %s)",
+                        self._current_replica, current_lag,
+                        self._replicas[best_index], best_lag
+                    )
+                    self._select(best_index)
+
     def current(self):
         """Get the current replica."""
-        self._iterating = False
-        if self._is_config_modified():
-            self._read_config()
-            self._select(0)
-        elif self._expiration is not None and time.time() >= self._expiration:
-            self._select(0)
-        return self._current_replica
+        with self._lock:
+            self._iterating = False
+            if self._is_config_modified():
+                self._read_config()
+                self._select(0)
+            elif self._expiration is not None and time.time() >= self._expiration:
+                self._select(self._preferred_index())
+            return self._current_replica
 
     @metricmethod
     def next(self):
@@ -88,33 +163,171 @@ class ReplicaSelector(object):
 
         Return None if there are no more replicas defined.
         """
-        if self._is_config_modified():
-            # Start over even if iteration was already in progress.
-            self._read_config()
-            self._select(0)
-            self._skip_index = None
-            self._iterating = True
-        elif not self._iterating:
-            # Start iterating.
-            self._skip_index = self._current_index
-            i = 0
-            if i == self._skip_index:
-                i = 1
+        with self._lock:
+            if self._is_config_modified():
+                # Start over even if iteration was already in progress.
+                self._read_config()
+                self._select(0)
+                self._skip_index = None
+                self._iterating = True
+            elif not self._iterating:
+                # Start iterating.
+                self._skip_index = self._current_index
+                i = 0
+                if i == self._skip_index:
+                    i = 1
+                    if i >= len(self._replicas):
+                        # There are no more replicas to try.
+                        self._select(0)
+                        return None
+                self._select(i)
+                self._iterating = True
+            else:
+                # Continue iterating.
+                i = self._current_index + 1
+                if i == self._skip_index:
+                    i += 1
                 if i >= len(self._replicas):
                     # There are no more replicas to try.
                     self._select(0)
                     return None
-            self._select(i)
-            self._iterating = True
-        else:
-            # Continue iterating.
-            i = self._current_index + 1
-            if i == self._skip_index:
-                i += 1
-            if i >= len(self._replicas):
-                # There are no more replicas to try.
-                self._select(0)
-                return None
-            self._select(i)
+                self._select(i)
+
+            return self._current_replica
+
+
+class _FixedReplicaSelector(object):
+    """
+    Selects exactly one replica, with nothing to fail over to.
+    """
+
+    def __init__(self, replica):
+        self.replica = replica
+
+    def current(self):
+        return self.replica
+
+    def next(self):
+        return None
+
+
+def _tid_time(tid_int):
+    return TimeStamp(int64_to_8bytes(tid_int)).timeTime()
+
+
+class ReplicaLagMonitor(object):
+    """
+    Every *interval* seconds, in a daemon thread, compare the
+    current TID of each replica of *selector* with that of the
+    primary, and tell the selector how far behind each one is.
+
+    Opens connections with *connmanager*; the "primary" is wherever
+    it opens connections by default. *get_current_tid* is
+    ``IPoller.get_current_tid``.
+
+    We measure lag as how long ago we first saw the primary at a TID
+    the replica doesn't have yet. Until we've watched for long enough
+    to know that, we use the difference between the times of the two
+    TIDs, which is an overestimate if the primary is rarely written.
+    """
+
+    def __init__(self, selector, connmanager, get_current_tid, interval):
+        self.selector = selector
+        self.connmanager = connmanager
+        self.get_current_tid = get_current_tid
+        self.interval = interval
+        self.check_count = 0
+        self.error_count = 0
+        # [(primary_tid, first_seen)], oldest first.
+        self._primary_tids = []
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='replica-lag-monitor')
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.check()
+            except Exception: # pylint:disable=broad-except
+                logger.exception("Failed to check replica lag")
+                self.error_count += 1
+            self._stopped.wait(self.interval)
+
+    def _current_tid(self, replica_selector):
+        connmanager = self.connmanager
+        try:
+            conn, cursor = connmanager.open(
+                isolation=connmanager.isolation_load,
+                read_only=True,
+                replica_selector=replica_selector,
+                application_name='RS: Replica lag',
+            )
+        except Exception: # pylint:disable=broad-except
+            logger.debug("Failed to connect to check replica lag", exc_info=True)
+            return None
+        try:
+            return self.get_current_tid(cursor)
+        except Exception: # pylint:disable=broad-except
+            logger.debug("Failed to check replica lag", exc_info=True)
+            return None
+        finally:
+            connmanager.rollback_and_close(conn, cursor)
+
+    def check(self):
+        """
+        Check each replica once. Returns the lags given to the selector,
+        or None if we couldn't reach the primary.
+        """
+        primary_tid = self._current_tid(None)
+        if primary_tid is None:
+            return None
+        now = time.time()
+        history = self._primary_tids
+        if not history or history[-1][0] < primary_tid:
+            history.append((primary_tid, now))
+
+        lags = {}
+        oldest_tid = primary_tid
+        for replica in self.selector.replicas:
+            tid = self._current_tid(_FixedReplicaSelector(replica))
+            if tid is None:
+                lags[replica] = None
+                continue
+            oldest_tid = min(oldest_tid, tid)
+            lags[replica] = self._lag(tid, primary_tid, now)
+
+        # We only need to remember the newest TID the slowest
+        # replica already has, and what came after.
+        while len(history) > 1 and history[1][0] <= oldest_tid:
+            del history[0]
+        self.check_count += 1
+        self.selector.set_lags(lags)
+        return lags
+
+    def _lag(self, tid, primary_tid, now):
+        if tid >= primary_tid:
+            return 0.0
+        history = self._primary_tids
+        if history[0][0] <= tid:
+            # We saw the primary when it was where the replica is
+            # now, so we know when it moved on.
+            for primary_tid_seen, first_seen in history:
+                if primary_tid_seen > tid:
+                    return max(0.0, now - first_seen)
+        return max(0.0, _tid_time(primary_tid) - _tid_time(tid))
 
-        return self._current_replica
+    def stats(self):
+        return {
+            'replica_lag_checks': self.check_count,
+            'replica_lag_errors': self.error_count,
+            'replica_lags': dict(self.selector.lags),
+        }
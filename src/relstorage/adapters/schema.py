@@ -166,6 +166,13 @@ class Schema(object):
         Column('visited', Boolean, nullable=False, default=False)
     )
 
+    # Optional: the OIDs changed by each transaction, for polling.
+    invalidation_log = Table(
+        'invalidation_log',
+        Column('tid', TID),
+        Column('zoid', OID),
+    )
+
 
 class AbstractSchemaInstaller(DatabaseHelpersMixin,
                               ABC):
@@ -191,6 +198,7 @@ class AbstractSchemaInstaller(DatabaseHelpersMixin,
         'object_state',
         'blob_chunk',
         'current_object',
+        'invalidation_log',
         'object_ref',
         'object_refs_added',
         'pack_object',
@@ -226,10 +234,11 @@ class AbstractSchemaInstaller(DatabaseHelpersMixin,
     # subclasses *must* define if they want caching.
     _PROCEDURES = None # type: dict
 
-    def __init__(self, connmanager, runner, keep_history):
+    def __init__(self, connmanager, runner, keep_history, invalidation_log=False):
         self.connmanager = connmanager
         self.driver = connmanager.driver
         self.keep_history = keep_history
+        self.invalidation_log = invalidation_log
         self.runner = runner.with_format_vars(
             tid_type=self.COLTYPE_OID_TID,
             oid_type=self.COLTYPE_OID_TID,
@@ -491,6 +500,28 @@ class AbstractSchemaInstaller(DatabaseHelpersMixin,
         """
         self.runner.run_script(cursor, self.CREATE_CURRENT_OBJECT_TMPL)
 
+    CREATE_INVALIDATION_LOG_TMPL = """
+    CREATE TABLE invalidation_log (
+        tid         {tid_type} NOT NULL,
+        zoid        {oid_type} NOT NULL,
+        PRIMARY KEY (tid, zoid)
+    ) {transactional_suffix};
+    """
+
+    def _create_invalidation_log(self, cursor):
+        """
+        An append-only journal of the OIDs changed by each
+        transaction, letting pollers find the changes since a TID by
+        reading only those rows.
+
+        This is only created if the ``invalidation-log`` option is
+        set. Once it exists, every commit writes to it, whatever the
+        option says, so that it is never missing a transaction. Rows
+        are removed by packing.
+        """
+        if self.invalidation_log:
+            self.runner.run_script(cursor, self.CREATE_INVALIDATION_LOG_TMPL)
+
     CREATE_OBJECT_REF_TMPLS = (
         """
         CREATE TABLE object_ref (
@@ -15,6 +15,9 @@ class _Functions(object):
     def max(self, column):
         return _Function('max', column)
 
+    def min(self, column):
+        return _Function('min', column)
+
     def count(self, column=Column('*')):
         return _Function('COUNT', column)
 
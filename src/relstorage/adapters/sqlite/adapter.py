@@ -99,7 +99,8 @@ class Sqlite3Adapter(AbstractAdapter):
             keep_history=self.keep_history,
             runner=self.runner,
             revert_when_stale=options.revert_when_stale,
-            transactions_may_go_backwards=False
+            transactions_may_go_backwards=False,
+            use_invalidation_log=options.invalidation_log,
         )
 
         self.txncontrol = Sqlite3TransactionControl(
@@ -115,7 +116,8 @@ class Sqlite3Adapter(AbstractAdapter):
             oid_allocator=self.oidallocator,
             connmanager=self.connmanager,
             runner=self.runner,
-            keep_history=self.keep_history
+            keep_history=self.keep_history,
+            invalidation_log=options.invalidation_log,
         )
 
         self.stats = Sqlite3Stats(
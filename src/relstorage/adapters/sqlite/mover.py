@@ -34,6 +34,13 @@ from .batch import Sqlite3RowBatcher
 class Sqlite3ObjectMover(AbstractObjectMover):
 
     _create_temp_store = Schema.temp_store.create()
+
+    _invalidation_log_exists_query = """
+    SELECT 1
+    FROM sqlite_master
+    WHERE type = 'table'
+        AND name = 'invalidation_log'
+    """
     # SQLite doesn't do well at joining temporary tables to normal tables.
     # Even after running ANALYZE. (ANALYZE doesn't get temp tables). It assumes
     # that a table with no stats has a million rows (1,048,576), so until
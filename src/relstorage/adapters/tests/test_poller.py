@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from relstorage.tests import TestCase
+from relstorage.tests import MockConnection
+from relstorage.tests import MockCursor
+from relstorage.tests import MockDriver
+
+from ..poller import Poller
+from ..scriptrunner import ScriptRunner
+
+
+class ChunkedCursor(MockCursor):
+
+    def __init__(self, rows):
+        super(ChunkedCursor, self).__init__(MockConnection())
+        self.rows = list(rows)
+        self.fetch_sizes = []
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        result = self.rows[:size]
+        del self.rows[:size]
+        return result
+
+
+class ScriptedCursor(ChunkedCursor):
+    # Each query produces the next of *results*.
+
+    def __init__(self, *results):
+        super(ScriptedCursor, self).__init__(())
+        self.results_by_query = list(results)
+        self.queries = []
+
+    def execute(self, stmt, params=None):
+        super(ScriptedCursor, self).execute(stmt, params)
+        if not stmt.startswith('PREPARE'):
+            self.queries.append((stmt, params))
+            self.rows = list(self.results_by_query.pop(0))
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+
+class TestPoller(TestCase):
+
+    def _makeOne(self, transactions_may_go_backwards=False):
+        poller = Poller(MockDriver(), False, None, False, transactions_may_go_backwards)
+        poller.poll_chunk_size = 2
+        return poller
+
+    def test_no_changes(self):
+        cursor = ChunkedCursor(())
+        changes, tid = self._makeOne().poll_invalidations(cursor.connection, cursor, 5)
+        self.assertEqual(tid, 5)
+        self.assertEqual(list(changes), [])
+
+    def test_changes_fetched_in_chunks(self):
+        rows = [(1, 9), (2, 8), (3, 7), (4, 6), (5, 6)]
+        cursor = ChunkedCursor(rows)
+        sleeps = []
+        conn = cursor.connection
+        conn.gevent_sleep = lambda: sleeps.append(1)
+        changes, tid = self._makeOne().poll_invalidations(conn, cursor, 5)
+        self.assertEqual(tid, 9)
+        # Only the first chunk has been fetched.
+        self.assertEqual(cursor.fetch_sizes, [2])
+        self.assertEqual(list(changes), rows)
+        self.assertEqual(cursor.fetch_sizes, [2, 2, 2, 2])
+        self.assertEqual(len(sleeps), 3)
+
+
+class TestPollerInvalidationLog(TestCase):
+
+    def _makeOne(self):
+        poller = Poller(MockDriver(), False, ScriptRunner(), False, False,
+                        use_invalidation_log=True)
+        poller.poll_chunk_size = 2
+        return poller
+
+    def _poll(self, cursor, prev_tid=5):
+        changes, tid = self._makeOne().poll_invalidations(cursor.connection, cursor, prev_tid)
+        return list(changes), tid
+
+    def test_changes_from_log(self):
+        rows = [(1, 9), (2, 8), (3, 7)]
+        cursor = ScriptedCursor(rows)
+        self.assertEqual(self._poll(cursor), (rows, 9))
+        self.assertEqual(len(cursor.queries), 1)
+        stmt, params = cursor.queries[0]
+        self.assertIn('invalidation_log', stmt)
+        self.assertIn('GROUP BY zoid', stmt)
+        self.assertEqual(params, {'tid': 5})
+
+    def test_no_changes_in_log(self):
+        # The oldest entry is before our TID, so the log covers it.
+        cursor = ScriptedCursor((), [(3,)])
+        self.assertEqual(self._poll(cursor), ([], 5))
+        self.assertEqual(len(cursor.queries), 2)
+
+    def test_log_does_not_cover_tid(self):
+        rows = [(1, 9)]
+        cursor = ScriptedCursor((), [(6,)], rows)
+        self.assertEqual(self._poll(cursor), (rows, 9))
+        self.assertEqual(len(cursor.queries), 3)
+        self.assertNotIn('invalidation_log', cursor.queries[-1][0])
+
+    def test_empty_log(self):
+        cursor = ScriptedCursor((), [(None,)], ())
+        self.assertEqual(self._poll(cursor), ([], 5))
+        self.assertEqual(len(cursor.queries), 3)
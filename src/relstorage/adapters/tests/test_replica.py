@@ -15,7 +15,9 @@
 import unittest
 
 
-class ReplicaSelectorTests(unittest.TestCase):
+class _ReplicaConfTestCase(unittest.TestCase):
+
+    fn = None
 
     def setUp(self):
         import os
@@ -30,6 +32,9 @@ class ReplicaSelectorTests(unittest.TestCase):
         import os
         os.remove(self.fn)
 
+
+class ReplicaSelectorTests(_ReplicaConfTestCase):
+
     def test__read_config_normal(self):
         from relstorage.adapters.replica import ReplicaSelector
         rs = ReplicaSelector(self.fn, 600.0)
@@ -127,10 +132,121 @@ class ReplicaSelectorTests(unittest.TestCase):
         self.assertEqual(rs.next(), 'example.com:9999')
         self.assertEqual(rs.next(), None)
 
+    def test_set_lags(self):
+        from relstorage.adapters.replica import ReplicaSelector
+        rs = ReplicaSelector(self.fn, 600.0, max_lag=10)
+        self.assertEqual(rs.current(), 'example.com:1234')
+        # A little behind isn't worth switching for.
+        rs.set_lags({'example.com:1234': 0.5, 'localhost:4321': 0,
+                     'localhost:9999': 0})
+        self.assertEqual(rs.current(), 'example.com:1234')
+        # But too far behind is.
+        rs.set_lags({'example.com:1234': 11, 'localhost:4321': 3,
+                     'localhost:9999': 2})
+        self.assertEqual(rs.current(), 'localhost:9999')
+        # As is being down.
+        rs.set_lags({'example.com:1234': 0, 'localhost:4321': 0,
+                     'localhost:9999': None})
+        self.assertEqual(rs.current(), 'example.com:1234')
+        # With nothing healthy, we stay put.
+        rs.set_lags({})
+        self.assertEqual(rs.current(), 'example.com:1234')
+
+    def test_set_lags_waits_for_lock(self):
+        import threading
+        from relstorage.adapters.replica import ReplicaSelector
+        rs = ReplicaSelector(self.fn, 600.0, max_lag=10)
+        lags = {'example.com:1234': 11, 'localhost:4321': 3,
+                'localhost:9999': 2}
+        # Pretend a request thread is in the middle of current() or next().
+        with rs._lock:
+            monitor = threading.Thread(target=rs.set_lags, args=(lags,))
+            monitor.start()
+            monitor.join(0.1)
+            self.assertTrue(monitor.is_alive())
+            self.assertEqual(rs._current_replica, 'example.com:1234')
+            self.assertEqual(rs._current_index, 0)
+        monitor.join()
+        self.assertEqual(rs.current(), 'localhost:9999')
+
+    def test_expiration_prefers_least_lagged(self):
+        from relstorage.adapters.replica import ReplicaSelector
+        rs = ReplicaSelector(self.fn, 600.0)
+        rs._select(1)
+        rs.lags = {'example.com:1234': 30, 'localhost:4321': 5,
+                   'localhost:9999': 0}
+        rs._expiration = 0
+        self.assertEqual(rs.current(), 'localhost:9999')
+
+
+class MockLagConnManager(object):
+
+    isolation_load = 'load'
+
+    def __init__(self, tids):
+        # {replica or None: tid or exception}
+        self.tids = tids
+        self.closed = []
+
+    def open(self, replica_selector, **_kwargs):
+        replica = replica_selector.current() if replica_selector is not None else None
+        tid = self.tids[replica]
+        if isinstance(tid, Exception):
+            raise tid
+        return replica, tid
+
+    def rollback_and_close(self, conn, _cursor):
+        self.closed.append(conn)
+
+
+class ReplicaLagMonitorTests(_ReplicaConfTestCase):
+
+    def _makeOne(self, tids):
+        from relstorage.adapters.replica import ReplicaSelector
+        from relstorage.adapters.replica import ReplicaLagMonitor
+        rs = ReplicaSelector(self.fn, 600.0)
+        connmanager = MockLagConnManager(tids)
+        return ReplicaLagMonitor(rs, connmanager, lambda cursor: cursor, 60)
+
+    def test_check(self):
+        from persistent.timestamp import TimeStamp
+        from relstorage._util import bytes8_to_int64
+        def tid(seconds):
+            return bytes8_to_int64(TimeStamp(2020, 1, 1, 0, 0, seconds).raw())
+
+        monitor = self._makeOne({
+            None: tid(30),
+            'example.com:1234': ValueError("Connection refused"),
+            'localhost:4321': tid(30),
+            'localhost:9999': tid(10),
+        })
+        lags = monitor.check()
+        self.assertIsNone(lags['example.com:1234'])
+        self.assertEqual(lags['localhost:4321'], 0)
+        # We haven't been watching long enough to know better, so
+        # we use the TIDs.
+        self.assertAlmostEqual(lags['localhost:9999'], 20, places=3)
+        self.assertEqual(monitor.selector.current(), 'localhost:4321')
+        self.assertEqual(len(monitor.connmanager.closed), 3)
+
+        # Now we saw the primary before it moved on, so we know how
+        # long the replica has been behind.
+        monitor.connmanager.tids[None] = tid(45)
+        lags = monitor.check()
+        self.assertLess(lags['localhost:4321'], 5)
+        self.assertAlmostEqual(lags['localhost:9999'], 35, places=3)
+        self.assertEqual(monitor.stats()['replica_lag_checks'], 2)
+
+    def test_check_primary_down(self):
+        monitor = self._makeOne({None: ValueError()})
+        self.assertIsNone(monitor.check())
+        self.assertEqual(monitor.selector.lags, {})
+
 
 def test_suite():
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(ReplicaSelectorTests))
+    suite.addTest(unittest.makeSuite(ReplicaLagMonitorTests))
     return suite
 
 if __name__ == '__main__':
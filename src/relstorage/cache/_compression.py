@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""
+Optional fast compression codecs for the local cache.
+
+These are used only if the corresponding third-party module is
+installed: ``zstandard`` for zstd, and ``lz4`` for lz4.
+
+zstd can also use a dictionary, trained from a sample of the states
+in the cache, which works well for the small, repetitive pickles
+(module and class names) that make up most of a ZODB. A state
+compressed with a dictionary records the ID of that dictionary, so
+states compressed with different dictionaries can be mixed.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+try:
+    import zstandard
+except ImportError: # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.block as lz4_block
+except ImportError: # pragma: no cover
+    lz4_block = None
+
+logger = __import__('logging').getLogger(__name__)
+
+#: Markers and functions ``{name: (marker, compress, decompress)}``
+#: for the codecs that are installed.
+CODECS = {}
+
+if zstandard is not None:
+    CODECS['zstd'] = (b'.s', zstandard.compress, zstandard.decompress)
+
+if lz4_block is not None:
+    CODECS['lz4'] = (b'.4', lz4_block.compress, lz4_block.decompress)
+
+#: The names of the codecs we know about but that aren't installed.
+MISSING_CODECS = frozenset(('zstd', 'lz4')) - frozenset(CODECS)
+
+#: The markers of states we can't decompress because
+#: the codec isn't installed.
+MISSING_MARKERS = frozenset(
+    {'zstd': b'.s', 'lz4': b'.4'}[name] for name in MISSING_CODECS
+) | (frozenset((b'.Z',)) if zstandard is None else frozenset())
+
+
+class ZstdDictionaries(object):
+    """
+    The zstd dictionaries known to a cache, by their ID.
+
+    One of them, the active dictionary, is used to compress.
+    zstd compressors and decompressors can't be shared between
+    threads, so each thread gets its own.
+    """
+
+    marker = b'.Z'
+
+    def __init__(self):
+        self._dictionaries = {}
+        self.active = None
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._dictionaries)
+
+    def __contains__(self, dict_id):
+        return dict_id in self._dictionaries
+
+    def add(self, dictionary_bytes, active=False):
+        """
+        Make the dictionary in *dictionary_bytes* available for
+        decompression, and optionally make it the active dictionary.
+
+        Returns the dictionary's ID.
+        """
+        dictionary = zstandard.ZstdCompressionDict(dictionary_bytes)
+        dict_id = dictionary.dict_id()
+        self._dictionaries.setdefault(dict_id, dictionary)
+        if active:
+            self.active = self._dictionaries[dict_id]
+        return dict_id
+
+    def _compressor(self):
+        local = self._local
+        active = self.active
+        if getattr(local, 'compressor_dict', None) is not active:
+            local.compressor = zstandard.ZstdCompressor(dict_data=active)
+            local.compressor_dict = active
+        return local.compressor
+
+    def compress(self, data):
+        return self._compressor().compress(data)
+
+    def dict_id_of(self, data):
+        """
+        Return the ID of the dictionary needed to decompress *data*
+        (which doesn't include the marker).
+        """
+        return zstandard.get_frame_parameters(data).dict_id
+
+    def decompress(self, data):
+        dict_id = self.dict_id_of(data)
+        decompressors = self._local.__dict__.setdefault('decompressors', {})
+        try:
+            decompressor = decompressors[dict_id]
+        except KeyError:
+            decompressor = decompressors[dict_id] = zstandard.ZstdDecompressor(
+                dict_data=self._dictionaries[dict_id])
+        return decompressor.decompress(data)
+
+    def can_decompress(self, data):
+        try:
+            return self.dict_id_of(data) in self._dictionaries
+        except zstandard.ZstdError:
+            return False
+
+    def items(self):
+        """
+        Iterate ``(dict_id, dictionary_bytes)``.
+        """
+        for dict_id, dictionary in self._dictionaries.items():
+            yield dict_id, dictionary.as_bytes()
+
+    @staticmethod
+    def train(samples, size):
+        """
+        Train and return the bytes of a dictionary of at most *size*
+        bytes from the states in *samples*.
+
+        If there aren't enough samples, return None.
+        """
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            logger.debug("Unable to train compression dictionary: %s", e)
+            return None
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""
+Loading rows from the persistent cache on demand.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+logger = __import__('logging').getLogger(__name__)
+
+
+class LazyRows(object):
+    """
+    The rows of a persistent cache database that haven't been loaded
+    into memory yet.
+
+    We keep the database connection open and know the TID of each
+    row. A row can be taken out (loaded) once. No rows can be taken
+    until the whole set has been validated against the database,
+    because until then, we don't know which of them are stale.
+    """
+
+    def __init__(self, connection, oid_to_tid):
+        self.connection = connection
+        #: ``{oid: tid}`` for the rows not yet loaded.
+        self.oid_to_tid = oid_to_tid
+        self.validated = False
+        self.load_count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.oid_to_tid)
+
+    def tid_for(self, oid):
+        return self.oid_to_tid.get(oid)
+
+    def discard(self, oids):
+        """
+        Forget the rows for *oids*; they'll never be loaded.
+        """
+        with self._lock:
+            oid_to_tid = self.oid_to_tid
+            for oid in oids:
+                oid_to_tid.pop(oid, None)
+
+    def take(self, oid, tid):
+        """
+        If we have a validated row for *oid* matching *tid* (or any TID,
+        if *tid* is None), load it and return the ``(state, tid)``,
+        and forget about it.
+
+        Otherwise, return None.
+        """
+        if not self.validated:
+            return None
+        with self._lock:
+            stored_tid = self.oid_to_tid.get(oid)
+            if stored_tid is None or (tid is not None and tid != stored_tid):
+                return None
+            del self.oid_to_tid[oid]
+            if self.connection is None:
+                return None
+            cur = self.connection.execute(
+                'SELECT CAST(state AS BLOB), tid FROM object_state WHERE zoid = ?',
+                (oid,)
+            )
+            row = cur.fetchone()
+            cur.close()
+        if row is None or row[1] != stored_tid:
+            # Someone else rewrote the database.
+            return None
+        self.load_count += 1
+        return bytes(row[0]), stored_tid
+
+    def close(self):
+        with self._lock:
+            conn = self.connection
+            self.connection = None
+            self.oid_to_tid = {}
+        if conn is not None:
+            conn.close()
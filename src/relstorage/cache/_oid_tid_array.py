@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""
+A compact OID -> TID mapping stored in sorted parallel arrays.
+
+The maps of the MVCC object index are mostly built in bulk from polls
+and then only read, so we can store them as two sorted arrays of
+native 64-bit integers and find entries by binary search. Compared to
+a BTree (or, on PyPy, a dict) there is no per-bucket overhead, and
+the bulk operations (building, merging, set operations on the keys)
+are done by C builtins (``sorted``, ``dict``, ``set``, ``array``)
+instead of by Python loops.
+
+Individual stores are buffered in a small dict and merged into the
+arrays when it grows too large or when the whole map is needed.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+from array import array
+from bisect import bisect_left
+
+from relstorage._compat import iteroiditems
+
+# 'Q' is an unsigned 64-bit integer everywhere we run.
+_TYPECODE = 'Q'
+
+
+class OidTidArray(object):
+    """
+    A mapping from OID integers to TID integers.
+
+    Supports the parts of the BTree API that the object index uses.
+    It is safe for one thread to write while others read; readers
+    take no locks.
+    """
+
+    __slots__ = (
+        # (oids, tids). These arrays are never mutated once
+        # installed; compacting replaces the tuple.
+        '_arrays',
+        # {oid: tid or None}. Stores not yet merged into the arrays;
+        # None means deleted.
+        '_pending',
+        # Our length, or None if we have to compact to find out.
+        '_len',
+        '_lock',
+    )
+
+    #: Merge pending stores into the arrays when there are more than
+    #: this many, or more than there are in the arrays, whichever is
+    #: larger. Each merge copies the arrays, so letting the pending stores
+    #: grow with them keeps the total cost of building a large map in
+    #: many pieces linear.
+    min_pending_size = 1024
+
+    def __init__(self, data=()):
+        self._arrays = (array(_TYPECODE), array(_TYPECODE))
+        self._pending = {}
+        self._len = 0
+        self._lock = threading.Lock()
+        if data:
+            self.update(data)
+
+    def get(self, oid, default=None):
+        # Read the pending stores before the arrays; compacting
+        # installs the arrays before it empties the pending stores.
+        pending = self._pending
+        if pending and oid in pending:
+            tid = pending[oid]
+        else:
+            oids, tids = self._arrays
+            i = bisect_left(oids, oid)
+            tid = tids[i] if i != len(oids) and oids[i] == oid else None
+        return default if tid is None else tid
+
+    def __getitem__(self, oid):
+        tid = self.get(oid)
+        if tid is None:
+            raise KeyError(oid)
+        return tid
+
+    def __contains__(self, oid):
+        return self.get(oid) is not None
+
+    has_key = __contains__
+
+    def __setitem__(self, oid, tid):
+        with self._lock:
+            if self._len is None:
+                self._compact()
+            if self.get(oid) is None:
+                self._len += 1
+            self._pending[oid] = tid
+            self._maybe_compact()
+
+    def __delitem__(self, oid):
+        with self._lock:
+            if self._len is None:
+                self._compact()
+            if self.get(oid) is None:
+                raise KeyError(oid)
+            self._len -= 1
+            self._pending[oid] = None
+            self._maybe_compact()
+
+    def update(self, data):
+        """
+        Store each ``(oid, tid)`` pair from *data*, which may
+        be a mapping or an iterable of pairs.
+
+        Values that don't fit in 64 bits raise TypeError when they
+        are merged into the arrays, which may not be right away.
+        """
+        if hasattr(data, 'items'):
+            data = iteroiditems(data)
+        with self._lock:
+            self._pending.update(data)
+            self._len = None
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self._pending) > max(self.min_pending_size, len(self._arrays[0])):
+            self._compact()
+
+    def _compact(self):
+        pending = self._pending
+        oids, tids = self._arrays
+        if not pending:
+            self._len = len(oids)
+            return
+        if oids:
+            merged = dict(zip(oids, tids))
+            merged.update(pending)
+        else:
+            merged = pending
+        if None in merged.values():
+            merged = {oid: tid for oid, tid in merged.items() if tid is not None}
+        new_oids = sorted(merged)
+        try:
+            new_tids = array(_TYPECODE, map(merged.__getitem__, new_oids))
+            new_oids = array(_TYPECODE, new_oids)
+        except OverflowError:
+            # BTrees raise TypeError for out-of-range values; do the same.
+            raise TypeError("OIDs and TIDs must be unsigned 64-bit integers")
+        self._arrays = (new_oids, new_tids)
+        self._pending = {}
+        self._len = len(new_oids)
+
+    def compact(self):
+        """
+        Merge any pending stores into the arrays.
+        """
+        with self._lock:
+            self._compact()
+
+    def _compacted(self):
+        if self._pending:
+            self.compact()
+        return self._arrays
+
+    def __len__(self):
+        if self._len is None:
+            self.compact()
+        return self._len
+
+    def __bool__(self):
+        return len(self) > 0
+
+    __nonzero__ = __bool__
+
+    def keys(self):
+        """
+        Return a sorted array of the OIDs.
+        """
+        return self._compacted()[0]
+
+    def values(self):
+        return self._compacted()[1]
+
+    def items(self):
+        oids, tids = self._compacted()
+        return zip(oids, tids)
+
+    iteritems = items
+    itervalues = values
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def clear(self):
+        with self._lock:
+            self._arrays = (array(_TYPECODE), array(_TYPECODE))
+            self._pending = {}
+            self._len = 0
+
+    # These raise ValueError if the map is empty, like BTrees.
+
+    def maxKey(self):
+        return self.keys()[-1] if self else max(())
+
+    def minKey(self):
+        return self.keys()[0] if self else min(())
+
+    def maxValue(self):
+        return max(self.values())
+
+    def minValue(self):
+        return min(self.values())
+
+    def difference(self, other):
+        """
+        Return the ``(oid, tid)`` pairs in this map whose OID is not in
+        the mapping *other*, as a dict.
+        """
+        oids, tids = self._compacted()
+        missing = set(oids).difference(other.keys())
+        return {oid: tid for oid, tid in zip(oids, tids) if oid in missing}
+
+    @staticmethod
+    def union_keys(maps):
+        """
+        Return the set of OIDs found in any of the *maps*.
+        """
+        result = set()
+        for mapping in maps:
+            result.update(mapping.keys())
+        return result
+
+    @staticmethod
+    def union_items(maps):
+        """
+        Combine the ``(oid, tid)`` pairs of each of the *maps* into
+        one dict. Where an OID appears more than once, the *first*
+        map wins.
+        """
+        result = {}
+        for mapping in reversed(maps):
+            result.update(mapping.items())
+        return result
+
+    def __repr__(self):
+        return '<%s at 0x%x len=%d pending=%d>' % (
+            type(self).__name__, id(self), len(self), len(self._pending)
+        )
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""
+A generational cache partitioned into independent shards.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+from itertools import chain
+from itertools import islice
+
+from relstorage._compat import iteroiditems
+from relstorage.cache import cache
+
+
+class ShardedPyCache(object):
+    """
+    Presents the same interface as :class:`relstorage.cache.cache.PyCache`,
+    but divides the OIDs among *shard_count* of them.
+
+    Each shard has its own generations and its own lock, so
+    threads working with different OIDs don't contend with each
+    other. Operations that involve many OIDs are grouped by shard and
+    take each lock only once. The byte limits are divided equally
+    among the shards; because OIDs are allocated sequentially, they
+    spread evenly across the shards.
+    """
+
+    #: How many items :meth:`set_all_for_tid` takes from its iterable
+    #: at a time.
+    set_batch_size = 1000
+
+    def __init__(self, shard_count, eden, protected, probation, sketch_entries=0):
+        self.shard_count = shard_count
+        self.shards = [
+            cache.PyCache(eden / shard_count,
+                          protected / shard_count,
+                          probation / shard_count,
+                          sketch_entries // shard_count)
+            for _ in range(shard_count)
+        ]
+        self.locks = [threading.Lock() for _ in range(shard_count)]
+
+    def _shard_for(self, oid):
+        index = oid % self.shard_count
+        return self.shards[index], self.locks[index]
+
+    def _group_pairs(self, pairs):
+        groups = [[] for _ in range(self.shard_count)]
+        for pair in pairs:
+            groups[pair[0] % self.shard_count].append(pair)
+        return groups
+
+    def _each(self):
+        # (shard, lock) for each shard that has data.
+        return [(s, l) for s, l in zip(self.shards, self.locks) if s]
+
+    # Statistics
+
+    @property
+    def hits(self):
+        return sum(s.hits for s in self.shards)
+
+    @property
+    def misses(self):
+        return sum(s.misses for s in self.shards)
+
+    @property
+    def sets(self):
+        return sum(s.sets for s in self.shards)
+
+    def reset_stats(self):
+        for shard in self.shards:
+            shard.reset_stats()
+
+    @property
+    def limit(self):
+        return sum(s.limit for s in self.shards)
+
+    @property
+    def weight(self):
+        return sum(s.weight for s in self.shards)
+
+    @property
+    def eviction_policy(self):
+        return self.shards[0].eviction_policy
+
+    # Mapping operations
+
+    def __bool__(self):
+        return any(self.shards)
+    __nonzero__ = __bool__
+
+    def __len__(self):
+        return sum(len(s) for s in self.shards)
+
+    def __contains__(self, oid):
+        shard, lock = self._shard_for(oid)
+        with lock:
+            return oid in shard
+
+    def get(self, oid):
+        shard, lock = self._shard_for(oid)
+        with lock:
+            return shard.get(oid)
+
+    __getitem__ = get
+
+    def peek(self, oid):
+        shard, lock = self._shard_for(oid)
+        with lock:
+            return shard.peek(oid)
+
+    def peek_item_with_tid(self, oid, tid):
+        shard, lock = self._shard_for(oid)
+        with lock:
+            return shard.peek_item_with_tid(oid, tid)
+
+    def contains_oid_with_tid(self, oid, tid):
+        shard, lock = self._shard_for(oid)
+        with lock:
+            return shard.contains_oid_with_tid(oid, tid)
+
+    def get_item_with_tid(self, oid, tid):
+        shard, lock = self._shard_for(oid)
+        with lock:
+            return shard.get_item_with_tid(oid, tid)
+
+    def get_items_with_tids(self, oids_tids):
+        result = {}
+        for group, shard, lock in zip(self._group_pairs(oids_tids), self.shards, self.locks):
+            if group:
+                with lock:
+                    result.update(shard.get_items_with_tids(group))
+        return result
+
+    def __setitem__(self, oid, value):
+        shard, lock = self._shard_for(oid)
+        with lock:
+            shard[oid] = value
+
+    def __delitem__(self, oid):
+        shard, lock = self._shard_for(oid)
+        with lock:
+            del shard[oid]
+
+    # Iteration. Like PyCache, this is not thread safe.
+
+    def __iter__(self):
+        return chain.from_iterable(self.shards)
+
+    def iteritems(self):
+        return chain.from_iterable(s.iteritems() for s in self.shards)
+
+    def keys(self):
+        return chain.from_iterable(s.keys() for s in self.shards)
+
+    def values(self):
+        return chain.from_iterable(s.values() for s in self.shards)
+
+    # Cache specific operations
+
+    def set_all_for_tid(self, tid_int, state_oid_iter, compress, value_limit):
+        # Don't materialize the whole iterable, it may be large; group
+        # it by shard a batch at a time.
+        state_oid_iter = iter(state_oid_iter)
+        while 1:
+            batch = list(islice(state_oid_iter, self.set_batch_size))
+            if not batch:
+                break
+            groups = [[] for _ in range(self.shard_count)]
+            for item in batch:
+                groups[item[1] % self.shard_count].append(item)
+            del batch
+            for group, shard, lock in zip(groups, self.shards, self.locks):
+                if group:
+                    with lock:
+                        shard.set_all_for_tid(tid_int, group, compress, value_limit)
+
+    def add_MRUs(self, ordered_keys, return_count_only=False):
+        # Each group keeps the least-to-most recently used order.
+        results = []
+        for group, shard, lock in zip(self._group_pairs(ordered_keys), self.shards, self.locks):
+            if group:
+                with lock:
+                    results.append(shard.add_MRUs(group, return_count_only))
+        if return_count_only:
+            return sum(results)
+        return list(chain.from_iterable(results))
+
+    def age_frequencies(self):
+        for shard, lock in self._each():
+            with lock:
+                shard.age_frequencies()
+
+    def delitems(self, oids_tids):
+        groups = self._group_pairs(iteroiditems(oids_tids))
+        for group, shard, lock in zip(groups, self.shards, self.locks):
+            if group:
+                with lock:
+                    shard.delitems(dict(group))
+
+    def del_oids(self, oids):
+        groups = [[] for _ in range(self.shard_count)]
+        for oid in oids:
+            groups[oid % self.shard_count].append(oid)
+        for group, shard, lock in zip(groups, self.shards, self.locks):
+            if group:
+                with lock:
+                    shard.del_oids(group)
+
+    def freeze(self, oids_tids):
+        groups = self._group_pairs(iteroiditems(oids_tids))
+        for group, shard, lock in zip(groups, self.shards, self.locks):
+            if group:
+                with lock:
+                    shard.freeze(dict(group))
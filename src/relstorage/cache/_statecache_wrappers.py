@@ -82,6 +82,35 @@ class MultiStateCache(object):
                 self.l[key] = result
         return result
 
+    def get_multiple(self, oids_tids):
+        oids_tids = list(oids_tids)
+        result = self.l.get_multiple(oids_tids)
+        if len(result) < len(oids_tids):
+            missing = [key for key in oids_tids if key[0] not in result]
+            from_global = self.g.get_multiple(missing)
+            for oid, value in from_global.items():
+                self.l[(oid, value[1])] = value
+            result.update(from_global)
+        return result
+
+    def prefetch_multiple(self, oids_tids):
+        """
+        Look up all the ``(oid, tid)`` pairs the local cache doesn't
+        have in the global cache at once, copying what it has into the
+        local cache.
+
+        Return the pairs found in neither. Unlike :meth:`get_multiple`,
+        this doesn't count as hits or misses in the local cache.
+        """
+        missing = self.l.prefetch_multiple(oids_tids)
+        if missing:
+            from_global = self.g.get_multiple(missing)
+            if from_global:
+                for oid, value in from_global.items():
+                    self.l[(oid, value[1])] = value
+                missing = [key for key in missing if key[0] not in from_global]
+        return missing
+
     def __setitem__(self, key, value):
         self.l[key] = value
         self.g[key] = value
@@ -156,6 +185,18 @@ class TracingStateCache(object):
 
     get = __getitem__
 
+    def get_multiple(self, oids_tids):
+        oids_tids = list(oids_tids)
+        result = self.cache.get_multiple(oids_tids)
+        trace = self._trace
+        for oid_int, tid_int in oids_tids:
+            cache_data = result.get(oid_int)
+            if cache_data:
+                trace(0x22, oid_int, tid_int, dlen=len(cache_data[0]))
+            else:
+                trace(0x20, oid_int)
+        return result
+
     def __setitem__(self, key, value):
         oid_int, _ = key
         state, tid_int = value
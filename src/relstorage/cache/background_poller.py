@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""
+Polling for changes in the background.
+
+Normally each connection polls when it begins a transaction, adding
+the time of a database round trip to the start of every request.
+Instead, one thread per process can keep the shared object index up
+to date, and connections can simply take what it has.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+from relstorage._compat import perf_counter
+from relstorage._util import timer as _timer
+
+logger = __import__('logging').getLogger(__name__)
+
+
+class BackgroundPoller(object):
+    """
+    Polls *coordinator* every *interval* seconds in a daemon thread,
+    using its own load connection from *adapter*.
+
+    This is an ``IDetachableMVCCDatabaseViewer`` of the coordinator,
+    like any other connection's cache.
+    """
+
+    # These are managed by the coordinator.
+    highest_visible_tid = None
+    detached = False
+    object_index = None
+
+    def __init__(self, coordinator, adapter, local_client, interval):
+        self.coordinator = coordinator
+        self.adapter = adapter
+        self.local_client = local_client
+        self.interval = interval
+        self._conn = self._cursor = None
+        self._stopped = threading.Event()
+        self.poll_count = 0
+        self.error_count = 0
+        self.last_duration = None
+        self.total_duration = 0.0
+        # When the last successful poll began. Its results are
+        # at least that current.
+        self._last_poll_began = None
+        self._thread = threading.Thread(target=self._run, name='background-poller')
+        self._thread.daemon = True
+
+    def start(self):
+        self.coordinator.register(self)
+        self._thread.start()
+        return self
+
+    @property
+    def lag(self):
+        """
+        How many seconds old the index may be, or None if we haven't
+        polled yet.
+        """
+        began = self._last_poll_began
+        return perf_counter() - began if began is not None else None
+
+    def is_current(self):
+        """
+        Have we polled recently enough that connections can use
+        our index instead of polling themselves?
+
+        If we're falling behind (or failing) we allow some slack,
+        and then stop answering yes.
+        """
+        lag = self.lag
+        return lag is not None and lag <= self.interval * 2
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        connmanager = self.adapter.connmanager
+        began = perf_counter()
+        try:
+            with _timer() as t:
+                if self._conn is None:
+                    self._conn, self._cursor = connmanager.open_for_load()
+                else:
+                    connmanager.restart_load(self._conn, self._cursor)
+                # We have no use for the changes ourself, but they may be
+                # an iterator.
+                changes = self.coordinator.poll(self, self._conn, self._cursor)
+                if changes is not None:
+                    for _ in changes:
+                        pass
+        except Exception: # pylint:disable=broad-except
+            logger.exception("Failed to poll in the background")
+            self.error_count += 1
+            self._close_connection()
+            return
+        self.poll_count += 1
+        self.last_duration = t.duration
+        self.total_duration += t.duration
+        self._last_poll_began = began
+
+    def _close_connection(self):
+        conn, cursor = self._conn, self._cursor
+        self._conn = self._cursor = None
+        if conn is not None:
+            self.adapter.connmanager.rollback_and_close(conn, cursor)
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self._close_connection()
+        self.coordinator.unregister(self)
+
+    def stats(self):
+        count = self.poll_count
+        return {
+            'background_poll_interval': self.interval,
+            'background_poll_count': count,
+            'background_poll_errors': self.error_count,
+            'background_poll_lag': self.lag,
+            'background_poll_last_duration': self.last_duration,
+            'background_poll_average_duration': self.total_duration / count if count else None,
+        }
@@ -49,14 +49,31 @@ using namespace relstorage::cache;
  * If so, they are removed from the index and deleted if not in use
  *
  *
+ * If a *sketch* is given, it decides which of the two oldest entries
+ * is more popular (TinyLFU), and the incoming entry must be strictly
+ * more popular to win. Otherwise, we compare the frequencies
+ * of the entries themselves.
+ *
  * Returns true if items were (or would have been) deleted from the index.
  */
 
+RSR_SINLINE
+bool _admit(const ICacheEntry& candidate,
+            const ICacheEntry& victim,
+            const FrequencySketch* sketch)
+{
+    if (sketch) {
+        return sketch->frequency(candidate.key) > sketch->frequency(victim.key);
+    }
+    return candidate.frequency >= victim.frequency;
+}
+
 RSR_SINLINE
 size_t _spill_from_ring_to_ring(Generation& updated_ring,
                                 Generation& destination_ring,
                                 const ICacheEntry* updated_ignore_me=nullptr,
-                                bool allow_rejects=true)
+                                bool allow_rejects=true,
+                                const FrequencySketch* sketch=nullptr)
 {
     ICacheEntry* updated_oldest = nullptr;
     ICacheEntry* destination_oldest = nullptr;
@@ -88,7 +105,7 @@ size_t _spill_from_ring_to_ring(Generation& updated_ring,
                 removed = updated_oldest;
                 updated_ring.remove(*updated_oldest);
             }
-            else if (updated_oldest->frequency >= destination_oldest->frequency) {
+            else if (_admit(*updated_oldest, *destination_oldest, sketch)) {
                 // good bye to the item on probation.
                 removed = destination_oldest;
                 destination_ring.remove(*destination_oldest);
@@ -312,7 +329,8 @@ bool Eden::_balance_rings(ICacheEntry* added_or_changed, bool allow_rejects)
     return _spill_from_ring_to_ring(*this,
                                     this->cache.ring_probation,
                                     added_or_changed,
-                                    allow_rejects);
+                                    allow_rejects,
+                                    this->cache.sketch());
 }
 
 void Eden::on_hit(ICacheEntry& entry)
@@ -464,6 +482,9 @@ void Cache::add_to_eden(const ProposedCacheEntry& proposed)
         throw std::runtime_error("Key already present");
     }
 
+    if (this->_sketch) {
+        this->_sketch->increment(proposed.oid());
+    }
     SVCacheEntry* entry = new SVCacheEntry(proposed);
     this->data.insert(*entry);
     this->ring_eden.add(*entry);
@@ -620,6 +641,11 @@ ICacheEntry* Cache::get(const OID_t key)
 
 SVCacheEntry* Cache::_get_or_peek(const OID_t key, const TID_t tid, const bool peek)
 {
+    if (this->_sketch && !peek) {
+        // Misses count too; that's how a popular object that was
+        // evicted gets back in.
+        this->_sketch->increment(key);
+    }
     if_existing(key, nullptr);
     SVCacheEntry* matching = existing_entry.matching_tid(tid);
     if (matching && !peek)
@@ -225,6 +225,11 @@ namespace cache {
 
             return static_cast<size_t>(s);
         }
+        /** Return a borrowed pointer to the bytes. Valid as long as the pickle is. */
+        static inline const char* data(const PyObject*const & pickle)
+        {
+            return PyBytes_AS_STRING(const_cast<PyObject*>(pickle));
+        }
         static inline bool eq(const PyObject*const& lhs,
                               const PyObject*const& rhs)
         {
@@ -271,6 +276,7 @@ namespace cache {
             return o;
         }
         static inline size_t size(const std::string& p) { return p.size(); }
+        static inline const char* data(const std::string& p) { return p.data(); }
         static inline bool eq(const std::string& lhs, const std::string& rhs) {
             return lhs == rhs;
         }
@@ -689,6 +695,16 @@ namespace cache {
             return _StateOperations::size(this->_pickle);
         }
 
+        /**
+         * The bytes of the state, without copying. Only valid while
+         * this object is alive (e.g., while Python holds a reference
+         * with Py_use()).
+         */
+        const char* data() const
+        {
+            return _StateOperations::data(this->_pickle);
+        }
+
         bool state_eq(const Pickle_t& other) const
         {
             return _StateOperations::eq(this->_pickle, other);
@@ -937,6 +953,98 @@ namespace cache {
         virtual ICacheEntry* discarding_tids_before(const TID_t tid);
     };
 
+    /**
+     * A count-min sketch estimating how often each OID has been
+     * accessed, including OIDs that are no longer (or never were) in
+     * the cache. This is the admission filter of the TinyLFU policy:
+     * an entry leaving eden is only admitted to probation if it has
+     * been used more often than the entry it would evict.
+     *
+     * Each counter is a byte saturating at 15. Once we've recorded
+     * ten times as many accesses as we have counters, every counter is
+     * halved so that old popularity fades.
+     */
+    class FrequencySketch {
+    private:
+        static const int DEPTH = 4;
+        static const uint8_t MAX_COUNT = 15;
+        std::vector<uint8_t> _table;
+        size_t _mask;
+        size_t _additions;
+        size_t _sample_size;
+
+        static RSR_INLINE uint64_t _hash(OID_t key, int row)
+        {
+            // splitmix64, with a different seed per row.
+            uint64_t x = static_cast<uint64_t>(key) + 0x9E3779B97F4A7C15ULL * (row + 1);
+            x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9ULL;
+            x = (x ^ (x >> 27)) * 0x94D049BB133111EBULL;
+            return x ^ (x >> 31);
+        }
+
+        RSR_INLINE size_t _index(OID_t key, int row) const
+        {
+            return (row * (this->_mask + 1)) + (_hash(key, row) & this->_mask);
+        }
+
+        void _reset()
+        {
+            for (std::vector<uint8_t>::iterator it = this->_table.begin();
+                 it != this->_table.end(); ++it) {
+                *it >>= 1;
+            }
+            this->_additions /= 2;
+        }
+
+    public:
+        /**
+         * Create a sketch sized for about *expected_entries* distinct keys.
+         */
+        FrequencySketch(size_t expected_entries)
+            : _mask(0), _additions(0), _sample_size(0)
+        {
+            size_t width = 64;
+            while (width < expected_entries) {
+                width <<= 1;
+            }
+            this->_table.resize(width * DEPTH);
+            this->_mask = width - 1;
+            this->_sample_size = width * 10;
+        }
+
+        void increment(OID_t key)
+        {
+            bool added = false;
+            for (int row = 0; row < DEPTH; row++) {
+                uint8_t& counter = this->_table[this->_index(key, row)];
+                if (counter < MAX_COUNT) {
+                    counter++;
+                    added = true;
+                }
+            }
+            if (added && ++this->_additions >= this->_sample_size) {
+                this->_reset();
+            }
+        }
+
+        uint8_t frequency(OID_t key) const
+        {
+            uint8_t result = MAX_COUNT;
+            for (int row = 0; row < DEPTH; row++) {
+                uint8_t counter = this->_table[this->_index(key, row)];
+                if (counter < result) {
+                    result = counter;
+                }
+            }
+            return result;
+        }
+
+        size_t width() const
+        {
+            return this->_mask + 1;
+        }
+    };
+
     class Cache;
 
     class Generation {
@@ -1185,6 +1293,8 @@ namespace cache {
             }
         };
         inline SVCacheEntry* _get_or_peek(const OID_t key, const TID_t tid, const bool peek=false);
+        // Only present when using the TinyLFU admission policy.
+        FrequencySketch* _sketch;
         BOOST_MOVABLE_BUT_NOT_COPYABLE(Cache)
     public:
         // types
@@ -1197,12 +1307,34 @@ namespace cache {
         Probation ring_probation;
 
         Cache(size_t eden_limit=0, size_t protected_limit=0, size_t probation_limit=0)
-            : ring_eden(eden_limit, *this),
+            : _sketch(nullptr),
+              ring_eden(eden_limit, *this),
               ring_protected(protected_limit, ring_probation),
               ring_probation(probation_limit, ring_protected)
         {
         }
 
+        /**
+         * Begin using a TinyLFU admission filter sized for about
+         * *expected_entries* entries to decide what enters
+         * probation from eden.
+         */
+        void use_frequency_sketch(size_t expected_entries)
+        {
+            delete this->_sketch;
+            this->_sketch = new FrequencySketch(expected_entries);
+        }
+
+        const FrequencySketch* sketch() const
+        {
+            return this->_sketch;
+        }
+
+        bool uses_frequency_sketch() const
+        {
+            return this->_sketch != nullptr;
+        }
+
         void resize(size_t eden, size_t protected_limit, size_t probation_limit)
         {
             ring_eden.change_max_weight(eden);
@@ -1221,6 +1353,7 @@ namespace cache {
 
             // Then our data, deleting anything unreferenced in Python.
             this->data.clear_and_dispose(Disposer());
+            delete this->_sketch;
         }
 
         size_t max_weight() const
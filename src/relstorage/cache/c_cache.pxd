@@ -43,6 +43,7 @@ cdef extern from "c_cache.h" namespace "relstorage::cache":
         # Using -1 for None
         object as_object()
         size_t size()
+        const char* data()
         bint operator==(SVCacheEntry&)
 
 
@@ -92,6 +93,8 @@ cdef extern from "c_cache.h" namespace "relstorage::cache":
         Cache(size_t eden, size_t protected, size_t probation) except +
         void __del__() except +
         void resize(size_t, size_t, size_t)
+        void use_frequency_sketch(size_t)
+        bool uses_frequency_sketch()
         size_t max_weight()
         void add_to_eden(ProposedCacheEntry) except +
         void store_and_make_MRU(ProposedCacheEntry) except +
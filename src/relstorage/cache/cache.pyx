@@ -128,6 +128,18 @@ cdef class SingleValue(CachedValue):
         # At this writing, reports 88
         return sizeof(SVCacheEntry)
 
+    def __getbuffer__(self, Py_buffer* buffer, int flags):
+        # A read-only view of the state, without copying it.
+        # The buffer holds a reference to us, and we hold
+        # the entry, so it can't be freed, even if it is evicted
+        # from the cache, until the buffer is released.
+        PyBuffer_FillInfo(buffer, self,
+                          <void*>self.entry.data(), self.entry.size(),
+                          1, flags)
+
+    def __releasebuffer__(self, Py_buffer* buffer):
+        pass
+
     def __iter__(self):
         return iter((
             bytes_from_pickle(self.entry),
@@ -292,8 +304,12 @@ cdef class PyCache:
     cdef readonly size_t hits
     cdef readonly size_t misses
 
-    def __cinit__(self, eden, protected, probation):
+    def __cinit__(self, eden, protected, probation, size_t sketch_entries=0):
         self.cache.resize(eden, protected, probation)
+        if sketch_entries:
+            # TinyLFU: admit entries from eden into probation based on a
+            # sketch of how often their keys have been used.
+            self.cache.use_frequency_sketch(sketch_entries)
         self.sets = self.hits = self.misses = 0
 
     cpdef reset_stats(self):
@@ -303,6 +319,10 @@ cdef class PyCache:
     def limit(self):
         return self.cache.max_weight()
 
+    @property
+    def eviction_policy(self):
+        return 'tinylfu' if self.cache.uses_frequency_sketch() else 'segmented-lru'
+
     # Access to generations
     @property
     def eden(self):
@@ -382,6 +402,32 @@ cdef class PyCache:
 
         self.misses += 1
 
+    def get_items_with_tids(self, oids_tids):
+        """
+        Like :meth:`get_item_with_tid`, but for each ``(oid, tid)`` pair
+        in the iterable *oids_tids*.
+
+        Returns a dictionary ``{oid: value}`` containing only the hits.
+
+        The whole iteration happens without giving up the GIL (as long
+        as *oids_tids* is not implemented in Python), so it is atomic
+        with respect to other threads using the cache.
+        """
+        cdef OID_t key
+        cdef TID_t native_tid
+        cdef SVCacheEntry* cvalue
+        cdef dict result = {}
+
+        for key, tid in oids_tids:
+            native_tid = -1 if tid is None else tid
+            cvalue = self.cache.get(key, native_tid)
+            if cvalue:
+                self.hits += 1
+                result[key] = SingleValue.from_entry(cvalue)
+            else:
+                self.misses += 1
+        return result
+
     def __setitem__(self, OID_t key, tuple value):
         self._do_set(key, value[0], value[1])
 
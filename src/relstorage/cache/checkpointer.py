@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""
+Writing the persistent cache in the background.
+
+Saving the whole cache when the storage is closed can take a long
+time for a large cache, and if the process dies before then, nothing
+is saved. Instead, we can periodically write just what has changed
+since the last time, leaving only a small amount to write at close.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+from relstorage._util import timer as _timer
+
+logger = __import__('logging').getLogger(__name__)
+
+
+class BackgroundCheckpointer(object):
+    """
+    Calls *checkpoint* every *interval* seconds in a daemon thread
+    until stopped.
+
+    *checkpoint* should return the number of objects it wrote.
+    Exceptions it raises are logged and otherwise ignored.
+    """
+
+    def __init__(self, interval, checkpoint, name='checkpointer'):
+        self.interval = interval
+        self._checkpoint = checkpoint
+        self._stopped = threading.Event()
+        self.checkpoint_count = 0
+        self.objects_written = 0
+        self.last_duration = None
+        self._thread = threading.Thread(target=self._run, name=name)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        try:
+            with _timer() as t:
+                count = self._checkpoint()
+        except Exception: # pylint:disable=broad-except
+            logger.exception("Failed to checkpoint the persistent cache")
+            return
+        self.checkpoint_count += 1
+        self.objects_written += count or 0
+        self.last_duration = t.duration
+        if count:
+            logger.debug("Checkpointed %d objects in %s", count, t.duration)
+
+    def stop(self, timeout=None):
+        """
+        Stop the thread, waiting up to *timeout* seconds for a
+        checkpoint in progress to finish.
+        """
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'checkpoint_interval': self.interval,
+            'checkpoint_count': self.checkpoint_count,
+            'checkpoint_objects_written': self.objects_written,
+            'checkpoint_last_duration': self.last_duration,
+        }
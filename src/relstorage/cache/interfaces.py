@@ -124,6 +124,20 @@ class IStateCache(Interface):
         such as statistics or most/least recently used lists.
         """
 
+    def get_multiple(oids_tids):
+        """
+        Look up each of the ``(oid, tid)`` pairs in the iterable *oids_tids*,
+        as for :meth:`__getitem__`.
+
+        Return a dictionary mapping each oid that was found to its
+        ``(state_bytes, tid_int)``. Pairs that were not found are
+        not present in the dictionary.
+
+        Implementations should make this cheaper than calling
+        :meth:`__getitem__` once for each pair, for example by
+        taking a lock only once or making only one network request.
+        """
+
     def __setitem__(oid_tid, state_bytes_tid):
         """
         Store the *state_bytes_tid* (``(state_bytes, tid_int)``) for
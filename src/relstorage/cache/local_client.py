@@ -16,6 +16,7 @@ from __future__ import division
 from __future__ import print_function
 
 import bz2
+import threading
 import time
 import zlib
 
@@ -30,6 +31,7 @@ from relstorage._util import timer as _timer
 from relstorage._util import log_timed as _log_timed
 from relstorage._util import consume
 from relstorage._compat import OID_TID_MAP_TYPE as OidTMap
+from relstorage._compat import OID_SET_TYPE as OidSet
 from relstorage.interfaces import Int
 
 from relstorage.cache.interfaces import IStateCache
@@ -45,6 +47,9 @@ from relstorage.cache.persistence import FAILURE_TO_OPEN_DB_EXCEPTIONS
 from relstorage.cache.local_database import Database
 
 from relstorage.cache import cache
+from relstorage.cache._sharded_cache import ShardedPyCache
+from relstorage.cache import _compression
+from relstorage.cache._lazy_rows import LazyRows
 
 logger = __import__('logging').getLogger(__name__)
 
@@ -177,6 +182,31 @@ class LocalClient(object):
         b'.z': zlib.decompress,
         b'.b': bz2.decompress
     }
+    # The faster codecs, if they're installed.
+    _compression_markers.update({
+        name: (marker, compress)
+        for name, (marker, compress, _) in _compression.CODECS.items()
+    })
+    _decompression_functions.update({
+        marker: decompress
+        for marker, _, decompress in _compression.CODECS.values()
+    })
+
+    # The zstd dictionaries we know about, or None if
+    # zstd isn't installed.
+    _dictionaries = None
+
+    # How many times bigger than the dictionary the sample
+    # of states we train it from should be.
+    _dictionary_sample_factor = 100
+
+    # The eviction policies we support. For TinyLFU, we size the
+    # frequency sketch assuming objects of about this many bytes.
+    _eviction_policies = ('segmented-lru', 'tinylfu')
+    _sketch_bytes_per_entry = 512
+    # How many keys the frequency sketch should hold, or 0
+    # to not use one.
+    _sketch_entries = 0
 
     # What multiplier of the number of items in the cache do we apply
     # to determine when to age the frequencies?
@@ -188,6 +218,19 @@ class LocalClient(object):
 
     _cache = None
 
+    # If we're checkpointing to the persistent cache in the background,
+    # the OIDs we've stored since the last time we wrote.
+    _dirty_oids = None
+    _dirty_lock = None
+
+    # If we restored lazily, the rows of the persistent cache
+    # that we haven't loaded yet.
+    _lazy_rows = None
+
+    # The {oid: tid} we restored from the persistent cache, captured
+    # while restoring, until someone asks for it to validate it.
+    _restored_oid_tids = None
+
     # Things copied from self._cache
     _peek = None
 
@@ -199,6 +242,17 @@ class LocalClient(object):
         # The real MB value is 1024 * 1024 = 1048576
         self.limit = int(1000000 * options.cache_local_mb)
         self._value_limit = options.cache_local_object_max
+        if options.cache_local_zero_copy:
+            self._state_from_value = self._view_from_value
+        if options.cache_local_dir and options.cache_local_checkpoint_interval:
+            self._dirty_oids = OidSet()
+            self._dirty_lock = threading.Lock()
+
+        policy = options.cache_local_eviction_policy
+        if policy not in self._eviction_policies:
+            raise ValueError("Unknown eviction policy %r" % (policy,))
+        if policy == 'tinylfu':
+            self._sketch_entries = max(1, self.limit // self._sketch_bytes_per_entry)
 
         # The underlying data storage. It maps ``{oid: value}``,
         # where ``value`` is an :class:`ICachedValue`.
@@ -212,6 +266,8 @@ class LocalClient(object):
         self.__initial_weight = self._cache.weight
 
         compression_module = options.cache_local_compression
+        if compression_module in _compression.MISSING_CODECS:
+            raise ValueError("Compression module %r is not installed" % (compression_module,))
         try:
             compression_markers = self._compression_markers[compression_module]
         except KeyError:
@@ -222,6 +278,17 @@ class LocalClient(object):
             if self.__compress is None:
                 self._compress = None
 
+        self._dictionary_size = 0
+        if _compression.zstandard is not None:
+            # Even if we don't compress with dictionaries, we
+            # may need to read persistent data that was.
+            self._dictionaries = _compression.ZstdDictionaries()
+            self._decompression_functions = dict(self._decompression_functions)
+            self._decompression_functions[
+                self._dictionaries.marker] = self._dictionaries.decompress
+            if compression_module == 'zstd':
+                self._dictionary_size = options.cache_local_compression_dictionary_size
+
     @property
     def size(self):
         return self._cache.weight
@@ -244,6 +311,70 @@ class LocalClient(object):
             return data
         return self._decompression_functions[pfx](data[2:])
 
+    def _state_from_value(self, value): # pylint:disable=method-hidden
+        state, tid = value
+        # Recall that for deleted objects, `state` can be None.
+        return ((self._decompress(state) if state else state), tid)
+
+    def _view_from_value(self, value):
+        # Instead of a copy of the bytes, return a read-only
+        # memoryview of the buffer held in the cache entry. The view
+        # keeps the entry alive even if it is evicted.
+        view = memoryview(value)
+        if view[:2].tobytes() in self._decompression_functions:
+            return self._decompress(view.tobytes()), value.tid
+        return view, value.tid
+
+    def _add_compression_dictionaries(self, dictionaries):
+        """
+        Make the ``(dict_id, dictionary)`` pairs available to
+        decompress states. If we're training dictionaries and don't
+        have an active one yet, start compressing with the first one.
+        """
+        for _, dictionary in dictionaries:
+            self._dictionaries.add(dictionary)
+            if self._dictionary_size and self._dictionaries.active is None:
+                self.__use_dictionary(dictionary)
+
+    def __use_dictionary(self, dictionary):
+        dict_id = self._dictionaries.add(dictionary, active=True)
+        self.__compression_marker = self._dictionaries.marker
+        self.__compress = self._dictionaries.compress
+        return dict_id
+
+    def _train_compression_dictionary(self):
+        """
+        If we should, train a zstd dictionary from a sample of the states
+        we hold, and start compressing with it.
+
+        Returns the ``(dict_id, dictionary)`` to save, or None.
+        """
+        if not self._dictionary_size or self._dictionaries.active is not None:
+            return None
+
+        sample_limit = self._dictionary_size * self._dictionary_sample_factor
+        sample_size = 0
+        samples = []
+        for _, lru_entry in self._cache.iteritems():
+            state = lru_entry.newest_value.state
+            if not state:
+                continue
+            state = self._decompress(state)
+            samples.append(state)
+            sample_size += len(state)
+            if sample_size >= sample_limit:
+                break
+
+        with _timer() as t:
+            dictionary = self._dictionaries.train(samples, self._dictionary_size)
+        if dictionary is None:
+            return None
+        logger.info(
+            "Trained compression dictionary of %s from %d states totalling %s in %s",
+            byte_display(len(dictionary)), len(samples), byte_display(sample_size),
+            t.duration)
+        return self.__use_dictionary(dictionary), dictionary
+
     def _compress(self, data): # pylint:disable=method-hidden
         # We override this if we're disabling compression
         # altogether.
@@ -267,12 +398,62 @@ class LocalClient(object):
                 logger.exception("Failed to open sqlite to write")
                 return 0
 
-            with closing(conn):
-                self.write_to_sqlite(conn, checkpoints, object_index)
+            oids = self._take_dirty_oids()
+            try:
+                with closing(conn):
+                    self.write_to_sqlite(conn, checkpoints, object_index, oids)
+            except:
+                self._restore_dirty_oids(oids)
+                raise
             # Testing: Return a signal when we tried to write
             # something.
             return 1
 
+    def _take_dirty_oids(self):
+        """
+        If we're checkpointing, return the OIDs stored since the last
+        time we wrote, and begin tracking again. Otherwise, return None
+        (meaning to write everything).
+        """
+        if self._dirty_oids is None:
+            return None
+        with self._dirty_lock:
+            oids = self._dirty_oids
+            self._dirty_oids = OidSet()
+        return oids
+
+    def _restore_dirty_oids(self, oids):
+        if oids is not None:
+            with self._dirty_lock:
+                self._dirty_oids.update(oids)
+
+    def checkpoint(self, checkpoints=None, **sqlite_args):
+        """
+        Write the objects stored since the last checkpoint (or
+        ``save``) to the persistent cache.
+
+        Unlike ``save``, this doesn't need the cache to be quiescent,
+        so it can run in the background. Does nothing unless
+        ``cache_local_checkpoint_interval`` is set.
+
+        Returns the number of objects written.
+        """
+        if self._dirty_oids is None or not self._dirty_oids:
+            return 0
+        try:
+            conn = sqlite_connect(self.options, self.prefix, **sqlite_args)
+        except FAILURE_TO_OPEN_DB_EXCEPTIONS:
+            logger.exception("Failed to open sqlite to write")
+            return 0
+
+        oids = self._take_dirty_oids()
+        try:
+            with closing(conn):
+                return self.write_to_sqlite(conn, checkpoints, oids=oids, quiescent=False)
+        except:
+            self._restore_dirty_oids(oids)
+            raise
+
     def restore(self):
         """
         Load the data from the persistent database.
@@ -287,9 +468,102 @@ class LocalClient(object):
             except FAILURE_TO_OPEN_DB_EXCEPTIONS:
                 logger.exception("Failed to read data from sqlite")
                 return
+            if options.cache_local_lazy_restore:
+                # This takes ownership of the connection.
+                return self.read_index_from_sqlite(conn)
             with closing(conn):
                 return self.read_from_sqlite(conn)
 
+    @_log_timed
+    def read_index_from_sqlite(self, connection):
+        """
+        Instead of loading the data from *connection*, remember
+        the OID and TID of each row, and keep the connection open so
+        that rows can be loaded when they're first asked for.
+
+        Nothing is loaded until :meth:`lazy_restore_validated` is
+        called.
+        """
+        db = Database.from_connection(connection)
+        checkpoints = db.checkpoints
+        if self._dictionaries is not None:
+            self._add_compression_dictionaries(db.compression_dictionaries)
+        oid_to_tid = db.oid_to_tid
+        # We only read from here on.
+        connection.execute('PRAGMA query_only = 1')
+        self._close_lazy_rows()
+        # The lazy rows are consumed as they're loaded and discarded
+        # as they're invalidated, so keep a copy.
+        self._restored_oid_tids = OidTMap(oid_to_tid)
+        self._lazy_rows = LazyRows(connection, oid_to_tid)
+        logger.info("Found %d rows to load on demand from %s", len(oid_to_tid), connection)
+        return checkpoints
+
+    def lazy_restore_validated(self):
+        """
+        Called when the rows being restored lazily have been
+        checked against the database and the stale ones removed; we
+        can begin loading them.
+        """
+        if self._lazy_rows is not None:
+            self._lazy_rows.validated = True
+
+    def restored_oids(self):
+        """
+        Return the OIDs restored from the persistent cache, including
+        those that haven't been loaded yet.
+        """
+        result = OidSet(self.keys())
+        if self._lazy_rows is not None:
+            result.update(self._lazy_rows.oid_to_tid.keys())
+        return result
+
+    def restored_oid_tids(self):
+        """
+        Return a map from each OID restored from the persistent cache,
+        including those that haven't been loaded yet, to the TID of the
+        state we restored for it.
+
+        This was captured while restoring, so it doesn't include
+        anything stored since, and it's safe to use while other
+        threads use the cache. It's only kept until this is called.
+        """
+        result = self._restored_oid_tids
+        self._restored_oid_tids = None
+        return result if result is not None else OidTMap()
+
+    def restored_state_is_current(self, oid, current_tid):
+        """
+        Given the *current_tid* of *oid* in the database (or None),
+        is what we restored for it still good?
+        """
+        if self._cache.contains_oid_with_tid(oid, current_tid):
+            return True
+        if self._lazy_rows is not None and oid not in self._cache:
+            stored_tid = self._lazy_rows.tid_for(oid)
+            return stored_tid is not None and current_tid in (None, stored_tid)
+        return False
+
+    def _load_lazy_row(self, oid, tid):
+        # After a cache miss, see if we have it waiting to be loaded.
+        row = self._lazy_rows.take(oid, tid)
+        if row is None or self._unreadable_state(row[0]):
+            return None
+        state, actual_tid = row
+        # Like everything we restore, this is frozen. It's already
+        # been compressed (if needed), and it's not new, so it doesn't
+        # need to be written back out.
+        self._cache.set_all_for_tid(actual_tid, [(state, oid, None)],
+                                    self._compress, self._value_limit)
+        self._cache.freeze({oid: actual_tid})
+        return (self._decompress(state) if state else state), actual_tid
+
+    def _close_lazy_rows(self):
+        lazy_rows = self._lazy_rows
+        self._lazy_rows = None
+        if lazy_rows is not None:
+            lazy_rows.close()
+
     @_log_timed
     def remove_invalid_persistent_oids(self, bad_oids):
         """
@@ -326,12 +600,20 @@ class LocalClient(object):
             # (those are expensive to create and tests call
             # this a LOT)
             byte_limit = self.limit
-            self._cache = cache.PyCache(
+            limits = (
                 byte_limit * self._gen_eden_pct,
                 byte_limit * self._gen_protected_pct,
                 byte_limit * self._gen_probation_pct
             )
+            shard_count = self.options.cache_local_shards
+            if shard_count and shard_count > 1:
+                self._cache = ShardedPyCache(shard_count, *limits,
+                                             sketch_entries=self._sketch_entries)
+            else:
+                self._cache = cache.PyCache(*limits, sketch_entries=self._sketch_entries)
         self._peek = self._cache.peek
+        self._close_lazy_rows()
+        self._restored_oid_tids = None
         self.reset_stats()
 
     def reset_stats(self):
@@ -348,6 +630,8 @@ class LocalClient(object):
             'ratio': self._cache.hits / total if total else 0,
             'len': len(self),
             'bytes': self.size,
+            'lazy_rows': len(self._lazy_rows) if self._lazy_rows is not None else None,
+            'lazy_loads': self._lazy_rows.load_count if self._lazy_rows is not None else None,
         }
 
     def __contains__(self, oid_tid):
@@ -357,7 +641,6 @@ class LocalClient(object):
     def get(self, oid_tid, peek=False):
         oid, tid = oid_tid
         assert tid is None or tid >= 0
-        decompress = self._decompress
         value = None
 
         if peek:
@@ -366,15 +649,42 @@ class LocalClient(object):
             value = self._cache.get_item_with_tid(oid, tid)
 
         # Finally, decompress if needed.
-        # Recall that for deleted objects, `state` can be None.
-        # TODO: This is making a copy of the string from C++ even if we
-        # don't need to decompress.
         if value is not None:
-            state, tid = value
-            return ((decompress(state) if state else state), tid)
+            return self._state_from_value(value)
+        if self._lazy_rows is not None and not peek:
+            return self._load_lazy_row(oid, tid)
 
     __getitem__ = get
 
+    def get_multiple(self, oids_tids):
+        """
+        Look up all the ``(oid, tid)`` pairs in *oids_tids* at once.
+
+        Returns a dictionary ``{oid: (state, tid)}`` holding only
+        the pairs that were found.
+        """
+        state_from_value = self._state_from_value
+        lazy_rows = self._lazy_rows
+        if lazy_rows is not None:
+            oids_tids = list(oids_tids)
+        values = self._cache.get_items_with_tids(oids_tids)
+        result = {oid: state_from_value(value) for oid, value in values.items()}
+        if lazy_rows is not None and len(result) < len(oids_tids):
+            for oid, tid in oids_tids:
+                if oid not in result:
+                    value = self._load_lazy_row(oid, tid)
+                    if value is not None:
+                        result[oid] = value
+        return result
+
+    def prefetch_multiple(self, oids_tids):
+        """
+        Return the ``(oid, tid)`` pairs in *oids_tids* that we don't have,
+        without counting hits or misses.
+        """
+        peek = self._cache.peek_item_with_tid
+        return [oid_tid for oid_tid in oids_tids if peek(*oid_tid) is None]
+
     def _age(self):
         # Age only when we're full and would thus need to evict; this
         # makes initial population faster. It's cheaper to calculate this
@@ -425,12 +735,22 @@ class LocalClient(object):
 
     def set_all_for_tid(self, tid_int, state_oid_iter):
         if self.limit:
+            if self._dirty_oids is not None:
+                state_oid_iter = self._tracking_dirty(state_oid_iter)
             self._cache.set_all_for_tid(tid_int, state_oid_iter, self._compress, self._value_limit)
             # Inline some of the logic about whether to age or not; avoiding the
             # call helps speed
             if self._cache.hits + self._cache.sets > self._next_age_at:
                 self._age()
 
+    def _tracking_dirty(self, state_oid_iter):
+        # Don't materialize the whole iterable, it may be large.
+        lock = self._dirty_lock
+        for item in state_oid_iter:
+            with lock:
+                self._dirty_oids.add(item[1])
+            yield item
+
     def __delitem__(self, oid_tid):
         self.delitems({oid_tid[0]: oid_tid[1]})
 
@@ -440,17 +760,24 @@ class LocalClient(object):
         for OID that are older than TID.
         """
         self._cache.delitems(oids_tids)
+        if self._lazy_rows is not None:
+            # Anything we hadn't loaded is probably stale.
+            self._lazy_rows.discard(oids_tids)
 
     def invalidate_all(self, oids):
         self._cache.del_oids(oids)
+        if self._lazy_rows is not None:
+            self._lazy_rows.discard(oids)
 
     def freeze(self, oids_tids):
         self._cache.freeze(oids_tids)
 
     def close(self):
-        pass
+        self._close_lazy_rows()
+        self._restored_oid_tids = None
 
-    release = close
+    def release(self):
+        "Does nothing; we're shared."
 
     def new_instance(self):
         return self
@@ -506,6 +833,9 @@ class LocalClient(object):
 
         db = Database.from_connection(connection)
         checkpoints = db.checkpoints
+        if self._dictionaries is not None:
+            self._add_compression_dictionaries(db.compression_dictionaries)
+        unreadable = self._unreadable_state
 
         @_log_timed
         def fetch_and_filter_rows():
@@ -526,12 +856,16 @@ class LocalClient(object):
             size = 0
             limit = self.limit
             items = []
+            restored_oid_tids = self._restored_oid_tids = OidTMap()
             rows = db.fetch_rows_by_priority()
             for oid, frozen, state, actual_tid, frequency in rows:
+                if unreadable(state):
+                    continue
                 size += len(state)
                 if size > limit:
                     break
                 items.append((oid, (state, actual_tid, frozen, frequency)))
+                restored_oid_tids[oid] = actual_tid
             consume(rows)
             # Rows came to us MRU to LRU, but we need to feed them the other way.
             items.reverse()
@@ -544,9 +878,30 @@ class LocalClient(object):
                           mem_usage_before=mem_before)
         return checkpoints
 
-    def _items_to_write(self, stored_oid_tid):
+    def _unreadable_state(self, state):
+        """
+        Is *state* compressed in a way we can't decompress? This
+        happens if it was written by a process that had a codec we
+        don't.
+        """
+        marker = state[:2]
+        if marker in _compression.MISSING_MARKERS:
+            return True
+        if self._dictionaries is not None and marker == self._dictionaries.marker:
+            return not self._dictionaries.can_decompress(state[2:])
+        return False
+
+    def _items_to_write(self, stored_oid_tid, oids=None):
         # pylint:disable=too-many-locals
         all_entries_len = len(self._cache)
+        if oids is None:
+            entries = self._cache.iteritems()
+        else:
+            # Only the given OIDs; they may have been evicted since.
+            all_entries_len = len(oids)
+            peek = self._cache.peek
+            entries = ((oid, peek(oid)) for oid in oids)
+            entries = ((oid, entry) for oid, entry in entries if entry is not None)
 
         # Only write the newest entry for each OID.
 
@@ -591,7 +946,7 @@ class LocalClient(object):
         # this function shows as about 3% of the total time to save
         # in a very large database.
         with _timer() as t:
-            for oid, lru_entry in self._cache.iteritems():
+            for oid, lru_entry in entries:
                 newest_value = lru_entry.newest_value
                 # We must have something at least this fresh
                 # to consider writing it out
@@ -626,7 +981,16 @@ class LocalClient(object):
             t.duration)
 
     @_log_timed
-    def write_to_sqlite(self, connection, checkpoints, object_index=None):
+    def write_to_sqlite(self, connection, checkpoints, object_index=None, oids=None,
+                        quiescent=True):
+        """
+        Write our data to the database.
+
+        If *oids* is given, only the data for those OIDs is written.
+        If *quiescent* is false, other threads may be using the cache,
+        so we don't train a compression dictionary (which walks the
+        whole cache and changes how we compress).
+        """
         # pylint:disable=too-many-locals
         mem_before = get_memory_usage()
         object_index = object_index or OidTMap()
@@ -636,6 +1000,12 @@ class LocalClient(object):
         db = Database.from_connection(connection)
         begin = time.time()
 
+        new_dictionary = None
+        if self._dictionaries is not None and quiescent:
+            # Someone else may have trained one already.
+            self._add_compression_dictionaries(db.compression_dictionaries)
+            new_dictionary = self._train_compression_dictionary()
+
         # In a large benchmark, store_temp() accounts for 32%
         # of the total time, while move_from_temp accounts for 49%.
 
@@ -646,9 +1016,13 @@ class LocalClient(object):
         # 3.7.11, 2012-03-20.
         with _timer() as batch_timer:
             cur.execute('BEGIN')
-            stored_oid_tid = db.oid_to_tid
+            # When writing only some OIDs, we know they've changed.
+            # Reading all the TIDs in the database would be much more
+            # work than letting move_from_temp() discard any older
+            # rows.
+            stored_oid_tid = db.oid_to_tid if oids is None else OidTMap()
             fetch_current = time.time()
-            count_written, _ = db.store_temp(self._items_to_write(stored_oid_tid))
+            count_written, _ = db.store_temp(self._items_to_write(stored_oid_tid, oids))
             cur.execute("COMMIT")
 
 
@@ -707,6 +1081,8 @@ class LocalClient(object):
             rows_inserted = db.move_from_temp()
             if checkpoints:
                 db.update_checkpoints(*checkpoints)
+            if new_dictionary:
+                db.store_compression_dictionary(*new_dictionary)
 
             cur.execute('COMMIT')
         # TODO: Maybe use BTrees.family.intersection to get the common keys?
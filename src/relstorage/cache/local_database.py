@@ -121,6 +121,10 @@ class Database(ABC):
 
     CREATE INDEX IF NOT EXISTS IX_object_state_f_tid
     ON object_state (frequency DESC, tid DESC);
+
+    CREATE TABLE IF NOT EXISTS compression_dictionary (
+        dict_id INTEGER NOT NULL UNIQUE, dictionary BLOB NOT NULL
+    );
     """
 
     # Without the CAST AS BLOB, if a value went in with text affinity,
@@ -159,6 +163,30 @@ class Database(ABC):
         self.cursor.execute("SELECT max_hvt, complete_since FROM checkpoints")
         return self.cursor.fetchone()
 
+    @property
+    def compression_dictionaries(self):
+        """
+        A list of ``(dict_id, dictionary)`` for the compression
+        dictionaries in the database, newest first.
+        """
+        cur = self.connection.execute(
+            "SELECT dict_id, CAST(dictionary AS BLOB) FROM compression_dictionary "
+            "ORDER BY rowid DESC"
+        )
+        with closing(cur):
+            return [(dict_id, bytes(dictionary)) for dict_id, dictionary in cur]
+
+    def store_compression_dictionary(self, dict_id, dictionary):
+        """
+        Save a compression dictionary, if one with the same ID isn't
+        already stored. Must be called in a transaction.
+        """
+        self.cursor.execute(
+            'INSERT OR IGNORE INTO compression_dictionary (dict_id, dictionary) '
+            'VALUES (?, ?)',
+            (dict_id, dictionary)
+        )
+
     def _remove_invalid_persistent_oids(self, bad_oids, cur):
         cur.execute("BEGIN")
         batch = Sqlite3RowBatcher(cur)
@@ -22,7 +22,9 @@ from __future__ import division
 from __future__ import print_function
 
 import importlib
+import threading
 
+from six.moves import queue
 from ZODB.utils import p64
 from ZODB.utils import u64
 from zope import interface
@@ -31,6 +33,106 @@ from relstorage._compat import string_types
 from relstorage._compat import iteritems
 from relstorage.cache.interfaces import IStateCache
 
+logger = __import__('logging').getLogger(__name__)
+
+
+class _ClientPool(object):
+    """
+    The memcache clients for one set of servers, shared by a
+    :class:`MemcacheStateCache` and all its new instances.
+
+    Each instance takes a client when it's created and gives it
+    back when it's released, so creating and releasing instances
+    (as ZODB does for each connection) doesn't make new connections
+    to the servers.
+    """
+
+    def __init__(self, constructor):
+        self._constructor = constructor
+        self._lock = threading.Lock()
+        self._idle = []
+        self._closed = False
+        self.writer = None
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._constructor()
+
+    def release(self, client):
+        with self._lock:
+            if not self._closed:
+                self._idle.append(client)
+                return
+        client.disconnect_all()
+
+    def start_writer(self):
+        with self._lock:
+            if self.writer is None and not self._closed:
+                self.writer = _BackgroundWriter(self)
+            return self.writer
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            writer = self.writer
+            self.writer = None
+        if writer is not None:
+            writer.stop()
+        for client in idle:
+            client.disconnect_all()
+
+
+class _BackgroundWriter(object):
+    """
+    Sends batches of values to the servers from a daemon thread
+    using its own client.
+
+    The queue is bounded; if the servers can't keep up, callers
+    wait for room.
+    """
+
+    max_pending = 100
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._queue = queue.Queue(self.max_pending)
+        self._thread = threading.Thread(target=self._run, name='memcache-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, batch):
+        self._queue.put(batch)
+
+    def _run(self):
+        client = self._pool._constructor()
+        try:
+            while True:
+                batch = self._queue.get()
+                try:
+                    if batch is None:
+                        break
+                    client.set_multi(batch)
+                except Exception: # pylint:disable=broad-except
+                    logger.exception("Failed to write to memcache")
+                finally:
+                    self._queue.task_done()
+        finally:
+            client.disconnect_all()
+
+    def flush(self):
+        """
+        Wait until everything queued so far has been sent.
+        """
+        self._queue.join()
+
+    def stop(self, timeout=10):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
 
 @interface.implementer(IStateCache)
 class MemcacheStateCache(object):
@@ -55,13 +157,16 @@ class MemcacheStateCache(object):
 
         return cls(
             lambda: module.Client(servers),
-            prefix
+            prefix,
+            background_writes=options.cache_servers_background_writes,
         )
 
-    def __init__(self, constructor, prefix):
+    def __init__(self, constructor, prefix, background_writes=False, _pool=None):
         self._constructor = constructor
         self.prefix = prefix
-        self.client = constructor()
+        self.background_writes = background_writes
+        self._pool = _pool if _pool is not None else _ClientPool(constructor)
+        self.client = self._pool.acquire()
         # checkpoints_key holds the current checkpoints.
         self.checkpoints_key = ck = '%s:checkpoints' % self.prefix
         # no unicode on Py2
@@ -86,6 +191,22 @@ class MemcacheStateCache(object):
 
     get = __getitem__
 
+    def get_multiple(self, oids_tids):
+        # As with single lookups, frozen keys are not supported.
+        keys_to_oids = {
+            self.__oid_tid_to_key(oid, tid): oid
+            for oid, tid in oids_tids
+            if tid is not None
+        }
+        if not keys_to_oids:
+            return {}
+        response = self.client.get_multi(list(keys_to_oids)) or {}
+        result = {}
+        for key, data in iteritems(response):
+            if data and len(data) >= 8 and key in keys_to_oids:
+                result[keys_to_oids[key]] = (data[8:], u64(data[:8]))
+        return result
+
     def __contains__(self, oid_tid):
         return self[oid_tid] is not None
 
@@ -110,9 +231,18 @@ class MemcacheStateCache(object):
             '%s:state:%d:%d' % (self.prefix, tid, oid): (p64(actual_tid) + (state or b''))
             for (oid, tid), (state, actual_tid) in iteritems(keys_and_values)
         }
-        self.client.set_multi(formatted)
+        writer = self._pool.start_writer() if self.background_writes else None
+        if writer is not None:
+            writer.put(formatted)
+        else:
+            self.client.set_multi(formatted)
 
     def set_all_for_tid(self, tid_int, state_oid_iter):
+        # With background writes, the values are copied into batches
+        # here (the iterable may not be usable once we return) and
+        # sent by another thread, so committing doesn't wait for the
+        # servers. That's safe because each key includes the TID, so
+        # its value never changes.
         send_size = 0
         to_send = {}
         for state, oid_int, _ in state_oid_iter:
@@ -155,18 +285,24 @@ class MemcacheStateCache(object):
         self.store_checkpoints(*change_to)
         return change_to
 
-    def close(self):
+    def release(self):
         if self.client is not None:
-            self.client.disconnect_all()
+            self._pool.release(self.client)
             self.client = None
 
-    release = close
+    def close(self):
+        self.release()
+        self._pool.close()
 
     def flush_all(self):
+        writer = self._pool.writer
+        if writer is not None:
+            writer.flush()
         self.client.flush_all()
 
     def updating_delta_map(self, deltas):
         return deltas
 
     def new_instance(self):
-        return type(self)(self._constructor, self.prefix)
+        return type(self)(self._constructor, self.prefix,
+                          self.background_writes, self._pool)
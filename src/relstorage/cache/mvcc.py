@@ -20,9 +20,12 @@ from __future__ import division
 from __future__ import print_function
 
 import os
+import threading
+from itertools import islice
 from logging import DEBUG as LDEBUG
 
 from zope.interface import implementer
+from six.moves import _thread
 
 from relstorage._compat import iterkeys
 from relstorage._compat import OID_TID_MAP_TYPE as OidTMap
@@ -32,15 +35,21 @@ from relstorage._compat import OidTMap_intersection
 from relstorage._compat import OID_SET_TYPE as OidSet
 from relstorage._compat import iteroiditems
 from relstorage._compat import IN_TESTRUNNER
+from relstorage._util import int64_to_8bytes
 from relstorage._util import log_timed
 from relstorage._util import positive_integer
 from relstorage._util import TRACE as LTRACE
 from relstorage._util import get_duration_from_environ
+from relstorage._util import thread_spawn as spawn
 from relstorage._mvcc import DetachableMVCCDatabaseCoordinator
 from relstorage.options import Options
 from relstorage.interfaces import IMVCCDatabaseViewer
 
 from .interfaces import IStorageCacheMVCCDatabaseCoordinator
+from .predictor import FollowerPredictor
+from .checkpointer import BackgroundCheckpointer
+from .background_poller import BackgroundPoller
+from ._oid_tid_array import OidTidArray
 
 logger = __import__('logging').getLogger(__name__)
 
@@ -65,7 +74,7 @@ POLL_TIMEOUT = get_duration_from_environ('RS_CACHE_POLL_TIMEOUT', None)
 
 # pylint:disable=too-many-lines
 
-class _TransactionRangeObjectIndex(OidTMap):
+class _TransactionRangeMixin(object):
     """
     Holds the portion of the object index visible to transactions <=
     ``highest_visible_tid``.
@@ -83,13 +92,26 @@ class _TransactionRangeObjectIndex(OidTMap):
     guarantee that it is complete.
 
     When ``complete_since_tid`` and ``highest_visible_tid`` are the same
+
+    This is combined with a concrete mapping type. The mapping types
+    are implemented in C, and a mixin with non-empty ``__slots__``
+    can't share a layout with them, so each subclass uses
+    ``_range_slots`` as its ``__slots__``.
     """
-    __slots__ = (
+    __slots__ = ()
+
+    _range_slots = (
         'highest_visible_tid',
         'complete_since_tid',
         'accepts_writes',
     )
 
+    # Declared here so the methods below can see them; the slots
+    # in the subclass take precedence.
+    highest_visible_tid = 0 # type: int
+    complete_since_tid = None # type: int
+    accepts_writes = True # type: bool
+
     # When the root node of a BTree splits (outgrows ``max_internal_size``),
     # it creates a new BTree object to be its child by calling ``type(self)()``
     # That doesn't work if you have required arguments.
@@ -100,7 +122,7 @@ class _TransactionRangeObjectIndex(OidTMap):
         self.complete_since_tid = complete_since_tid
         self.accepts_writes = True
 
-        OidTMap.__init__(self, data)
+        super(_TransactionRangeMixin, self).__init__(data)
 
         if self:
             # Verify the data matches what they told us.
@@ -116,6 +138,27 @@ class _TransactionRangeObjectIndex(OidTMap):
                 complete_since_tid, highest_visible_tid
             )
 
+    @classmethod
+    def from_polled_changes(cls, highest_visible_tid, complete_since_tid, changes,
+                            chunk_size=10000):
+        """
+        Like the constructor, but *changes* is an iterable of ``(oid,
+        tid)`` pairs, such as rows from a database cursor, which may
+        be arbitrarily large. We consume it in chunks of *chunk_size*,
+        so we never hold more than that many rows in memory.
+        """
+        result = cls(highest_visible_tid)
+        changes = iter(changes)
+        while 1:
+            chunk = list(islice(changes, chunk_size))
+            if not chunk:
+                break
+            result.update(chunk)
+        result.complete_since_tid = complete_since_tid
+        if DEBUG:
+            result.verify()
+        return result
+
     def verify(self, initial=True):
         # Check that our constraints are met
         if not self or not __debug__:
@@ -159,8 +202,7 @@ class _TransactionRangeObjectIndex(OidTMap):
         """
         assert bucket.highest_visible_tid == self.highest_visible_tid
         self.update(bucket)
-        if bucket.complete_since_tid < self.complete_since_tid:
-            self.complete_since_tid = bucket.complete_since_tid
+        self.complete_since_tid = min(self.complete_since_tid, bucket.complete_since_tid)
 
     def merge_older_tid(self, bucket):
         """
@@ -183,6 +225,28 @@ class _TransactionRangeObjectIndex(OidTMap):
         if bucket.complete_since_tid and bucket.complete_since_tid < self.complete_since_tid:
             self.complete_since_tid = bucket.complete_since_tid
 
+    def max_stored_tid(self):
+        return self.maxValue()
+
+    def min_stored_tid(self):
+        return self.minValue()
+
+    def __repr__(self):
+        return '<%s at 0x%x hvt=%s complete_after=%s len=%s readonly=%s>' % (
+            self.__class__.__name__,
+            id(self),
+            self.highest_visible_tid,
+            self.complete_since_tid,
+            len(self),
+            not self.accepts_writes,
+        )
+
+class _TransactionRangeObjectIndex(_TransactionRangeMixin, OidTMap):
+    """
+    A :class:`_TransactionRangeMixin` stored in a BTree.
+    """
+    __slots__ = _TransactionRangeMixin._range_slots
+
     # These raise ValueError if the map is empty
     if not hasattr(OidTMap, 'maxKey'):
         maxKey = lambda self: max(iterkeys(self))
@@ -207,18 +271,15 @@ class _TransactionRangeObjectIndex(OidTMap):
         """
         return OidTMap_difference(self, other)
 
-    max_stored_tid = maxValue
-    min_stored_tid = minValue
 
-    def __repr__(self):
-        return '<%s at 0x%x hvt=%s complete_after=%s len=%s readonly=%s>' % (
-            self.__class__.__name__,
-            id(self),
-            self.highest_visible_tid,
-            self.complete_since_tid,
-            len(self),
-            not self.accepts_writes,
-        )
+class _ArrayTransactionRangeObjectIndex(_TransactionRangeMixin, OidTidArray):
+    """
+    A :class:`_TransactionRangeMixin` stored in sorted arrays.
+    """
+    __slots__ = _TransactionRangeMixin._range_slots
+
+    items_not_in = OidTidArray.difference
+
 
 @implementer(IMVCCDatabaseViewer)
 class _ObjectIndex(object):
@@ -331,13 +392,16 @@ class _ObjectIndex(object):
         'maps',
     )
 
+    #: The type of each entry in ``maps``.
+    map_type = _TransactionRangeObjectIndex
+
     def __init__(self, highest_visible_tid, complete_since_tid=None, data=()):
         """
         An instance is created with the first poll, giving us our
         initial TID. It may optionally have data retrieved from
         previously saving the map.
         """
-        initial_bucket = _TransactionRangeObjectIndex(highest_visible_tid, None, ())
+        initial_bucket = self.map_type(highest_visible_tid, None, ())
         initial_bucket.update(data)
         initial_bucket.complete_since_tid = complete_since_tid
         initial_bucket.verify(initial=False)
@@ -366,6 +430,35 @@ class _ObjectIndex(object):
     def keys(self):
         return OidTMap_multiunion(self.maps)
 
+    def keys_in(self, mapping):
+        """
+        Return the OIDs that are keys both of *mapping* and of our
+        maps (other than *mapping*, if it's one of them).
+        """
+        maps = [m for m in self.maps if m is not mapping]
+        return OidTMap_intersection(OidTMap_multiunion(maps), mapping)
+
+    def changes_since(self, highest_visible_tid):
+        """
+        Return a mapping of the newest TID for each OID changed after
+        *highest_visible_tid*, which must be the ``highest_visible_tid`` of one
+        of our maps.
+        """
+        changes = OidTMap()
+        change_dicts = []
+        for m in self.maps:
+            if m.highest_visible_tid == highest_visible_tid:
+                break
+            change_dicts.append(m)
+
+        while change_dicts:
+            # In reverse order, capturing only the most recent change.
+            # TODO: Except for that 'ignore_tid' passed to the viewer's
+            # poll method, we could very efficiently do this with
+            # OidTMap_multiunion with one call to C.
+            changes.update(change_dicts.pop())
+        return changes
+
     def __getitem__(self, oid):
         for mapping in self.maps:
             try:
@@ -408,6 +501,15 @@ class _ObjectIndex(object):
             mapping[oid] = tid
             break
 
+    def update(self, oids_tids):
+        """
+        Store each ``oid: tid`` pair from the mapping *oids_tids*,
+        following the same rules as ``__setitem__``.
+        """
+        setitem = self.__setitem__
+        for oid, tid in iteroiditems(oids_tids):
+            setitem(oid, tid)
+
 
     @property
     def total_size(self):
@@ -466,11 +568,17 @@ class _ObjectIndex(object):
         assert highest_visible_tid >= self.highest_visible_tid
         assert complete_since_tid is not None
 
-        # First, create the transaction map.
+        # First, create the transaction map, unless the caller
+        # already did.
         assert highest_visible_tid and complete_since_tid
-        incoming_bucket = _TransactionRangeObjectIndex(highest_visible_tid,
-                                                       complete_since_tid,
-                                                       changes)
+        if isinstance(changes, self.map_type):
+            assert changes.highest_visible_tid == highest_visible_tid
+            assert changes.complete_since_tid == complete_since_tid
+            incoming_bucket = changes
+        else:
+            incoming_bucket = self.map_type(highest_visible_tid,
+                                            complete_since_tid,
+                                            changes)
         newest_bucket = self.maps[0]
         oldest_bucket = self.maps[-1]
 
@@ -491,7 +599,7 @@ class _ObjectIndex(object):
             # bucket, because that represents the oldest thing we have indexed.
             # Why merge? That doesn't make much sense. We're no longer a delta.
             # incoming_bucket.merge_older_tid(oldest_bucket)
-            other = _ObjectIndex.__new__(_ObjectIndex)
+            other = type(self).__new__(type(self))
             other.maps = [incoming_bucket, oldest_bucket]
             other.verify()
             return other
@@ -518,7 +626,7 @@ class _ObjectIndex(object):
             return self
 
         # all that's left is to put the new bucket on front of a new object.
-        other = _ObjectIndex.__new__(_ObjectIndex)
+        other = type(self).__new__(type(self))
         other.maps = [incoming_bucket]
         other.maps.extend(self.maps)
         if DEBUG:
@@ -526,6 +634,46 @@ class _ObjectIndex(object):
         return other
 
 
+class _ArrayObjectIndex(_ObjectIndex):
+    """
+    An :class:`_ObjectIndex` whose maps are stored in sorted arrays.
+
+    Lookups are binary searches instead of tree walks, and the
+    bulk operations used when polling and vacuuming are done with
+    sets and dicts.
+    """
+
+    __slots__ = ()
+
+    map_type = _ArrayTransactionRangeObjectIndex
+
+    def __getitem__(self, oid):
+        # Looking in each map with ``get`` avoids raising
+        # KeyError from all the maps that don't have it.
+        for mapping in self.maps:
+            tid = mapping.get(oid)
+            if tid is not None:
+                return tid
+        return None
+
+    def keys(self):
+        return OidTidArray.union_keys(self.maps)
+
+    def keys_in(self, mapping):
+        # *mapping* is usually much bigger than all our maps
+        # together, so we don't make a set of its keys.
+        maps = [m for m in self.maps if m is not mapping]
+        return OidTidArray.union_keys(maps).intersection(mapping.keys())
+
+    def changes_since(self, highest_visible_tid):
+        change_maps = []
+        for m in self.maps:
+            if m.highest_visible_tid == highest_visible_tid:
+                break
+            change_maps.append(m)
+        return OidTidArray.union_items(change_maps)
+
+
 class _AlreadyClosedLock(object):
 
     def __enter__(self):
@@ -534,6 +682,112 @@ class _AlreadyClosedLock(object):
     def __exit__(self, t, v, tb):
         "Does nothing"
 
+
+class _ChangedOIDs(object):
+    """
+    The OIDs of a `_ChangeSet`, as returned from ``StorageCache.poll``.
+
+    Shared between viewers, so it must not be mutated.
+    """
+
+    __slots__ = ('_oids', '_invalidations')
+
+    def __init__(self, oids):
+        self._oids = oids
+        self._invalidations = None
+
+    def __iter__(self):
+        return iter(self._oids)
+
+    def __len__(self):
+        return len(self._oids)
+
+    def __contains__(self, oid):
+        return oid in self._oids
+
+    def invalidations(self):
+        """
+        Return the ``{oid_bytes: 1}`` dict that ``poll_invalidations``
+        gives to the Connection. Built once and shared; don't mutate it.
+        """
+        result = self._invalidations
+        if result is None:
+            result = self._invalidations = {
+                int64_to_8bytes(oid): 1 for oid in self._oids
+            }
+        return result
+
+
+class _ChangeSet(object):
+    """
+    The changes a viewer sees when it moves from one highest visible
+    TID to another.
+
+    Every viewer making the same move sees the same changes, so we
+    compute them once and share them. Iterating produces ``(oid, tid)``
+    pairs.
+    """
+
+    __slots__ = ('changes', '_tids', '_oids')
+
+    def __init__(self, changes):
+        self.changes = changes
+        self._tids = None
+        self._oids = None
+
+    def __iter__(self):
+        return iter(iteroiditems(self.changes))
+
+    def __len__(self):
+        return len(self.changes)
+
+    def changed_in(self, tid):
+        """
+        Did any of the changes happen in the transaction *tid*?
+        """
+        tids = self._tids
+        if tids is None:
+            tids = self._tids = frozenset(self.changes.values())
+        return tid in tids
+
+    def oids(self):
+        """
+        Return the shared `_ChangedOIDs`.
+        """
+        oids = self._oids
+        if oids is None:
+            oids = self._oids = _ChangedOIDs(OidSet(self.changes))
+        return oids
+
+
+class _PollInFlight(object):
+    """
+    A poll being made by one viewer that others can wait for.
+    """
+
+    __slots__ = ('thread_id', '_done', 'index')
+
+    def __init__(self):
+        # If we're not monkey-patched, greenlets share a thread ID,
+        # and a greenlet waiting on the event would block the one
+        # doing the poll. Only wait for other threads.
+        self.thread_id = _thread.get_ident()
+        self._done = threading.Event()
+        self.index = None
+
+    def finish(self, index):
+        self.index = index
+        self._done.set()
+
+    def wait(self, timeout):
+        """
+        Return the index produced by the poll, or None.
+        """
+        if self.thread_id == _thread.get_ident() or not self._done.wait(timeout):
+            return None
+        return self.index
+
+
 @implementer(IStorageCacheMVCCDatabaseCoordinator)
 class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
     """
@@ -559,8 +813,67 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
     max_allowed_index_size = 100000
     object_index = None
 
+    #: The kind of object index to build, chosen by
+    #: ``cache_object_index``.
+    object_index_type = _ObjectIndex
+    OBJECT_INDEX_TYPES = {
+        'btree': _ObjectIndex,
+        'array': _ArrayObjectIndex,
+    }
+
+    #: A `FollowerPredictor`, if ``cache_prefetch_followers`` is set.
+    predictor = None
+
+    #: A `BackgroundCheckpointer`, if ``cache_local_checkpoint_interval``
+    #: is set and we have restored.
+    checkpointer = None
+    checkpoint_interval = 0
+
+    #: Whether the local client restores rows on demand, validating
+    #: them in the background.
+    lazy_restore = False
+
+    #: A `BackgroundPoller`, if ``background_poll_interval`` is set.
+    background_poller = None
+    background_poll_interval = 0
+    background_served_poll_count = 0
+    # The newest TID committed by this process.
+    _latest_local_commit = 0
+
+    #: How many OIDs one vacuum may examine; see ``cache_vacuum_budget``.
+    vacuum_budget = 0
+    vacuum_map_count = 0
+    vacuum_oid_count = 0
+    # How many times we ran out of budget.
+    vacuum_deferred_count = 0
+    # ``[bucket, remaining_oids_iter, remaining_count]`` for the oldest
+    # map, if we ran out of budget vacuuming it.
+    _vacuum_progress = None
+    # How many times a viewer used a change set that another viewer
+    # had already computed.
+    change_set_hit_count = 0
+
+    #: How long, in seconds, to wait for another viewer's poll before
+    #: making our own.
+    poll_wait_timeout = 10
+
+    #: An object from ``IPoller.new_commit_listener``, if the database
+    #: can tell us about commits.
+    commit_listener = None
+    _commit_listener_checked = False
+    #: ``(token, polled_tid)`` from the last poll we made; if the commit
+    #: listener says nothing happened since *token*, the database is
+    #: still at *polled_tid*.
+    _commit_listener_token = (None, None)
+
     def __init__(self, options=None):
         super(MVCCDatabaseCoordinator, self).__init__()
+        # {polling_since: _PollInFlight}
+        self._polls_in_flight = {}
+        self.shared_poll_count = 0
+        # {(from_hvt, to_hvt): _ChangeSet}. Replaced, not mutated, when
+        # we vacuum, so it can be read and filled without the lock.
+        self._change_sets = {}
         # There's a tension between blocking as little as possible
         # and making as few polling queries as possible. Polling is when
         # the GIL is released or gevent switches can occur, and potentially
@@ -579,6 +892,17 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
         # each new one will drop more old viewers, though, and it will start to be reclaimed.
         # Also, lots of it is shared across the connections.
         self.max_allowed_index_size = options.cache_delta_size_limit * 2
+        if options.cache_prefetch_followers:
+            self.predictor = FollowerPredictor(options.cache_prefetch_followers)
+        if options.cache_local_dir:
+            self.checkpoint_interval = options.cache_local_checkpoint_interval
+            self.lazy_restore = options.cache_local_lazy_restore
+        self.background_poll_interval = options.background_poll_interval
+        self.vacuum_budget = options.cache_vacuum_budget or 0
+        try:
+            self.object_index_type = self.OBJECT_INDEX_TYPES[options.cache_object_index]
+        except KeyError:
+            raise ValueError("Unknown object index type %r" % (options.cache_object_index,))
         self.log = logger.log
 
     def stats(self):
@@ -586,7 +910,18 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
             'registered_viewers': len(self._registered_viewers),
             'oldest viewer': self.minimum_highest_visible_tid,
             'hvt': self.object_index.maximum_highest_visible_tid if self.object_index else None,
+            'shared_polls': self.shared_poll_count,
             'index': self.object_index.stats() if self.object_index else None,
+            'commit_listener': self.commit_listener.stats() if self.commit_listener else None,
+            'background_poller': (self.background_poller.stats()
+                                  if self.background_poller else None),
+            'background_served_polls': self.background_served_poll_count,
+            'vacuumed_maps': self.vacuum_map_count,
+            'vacuumed_oids': self.vacuum_oid_count,
+            'vacuum_deferred': self.vacuum_deferred_count,
+            'vacuum_pending_oids': self._vacuum_progress[2] if self._vacuum_progress else 0,
+            'change_sets': len(self._change_sets),
+            'change_set_hits': self.change_set_hit_count,
         }
 
     @property
@@ -598,6 +933,11 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
         self.change(cache, None)
 
     def poll(self, cache, conn, cursor):
+        if not self._commit_listener_checked:
+            self._start_commit_listener(cache.adapter.poller)
+        if self.background_poll_interval and self.background_poller is None:
+            self._start_background_poller(cache)
+
         with self._lock:
             cur_ix = self.object_index
             # this can mutate without changing the object identity!
@@ -605,6 +945,55 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
 
         return self._poll(cache, conn, cursor, cur_ix, cur_ix_hvt)
 
+    def _start_commit_listener(self, poller):
+        with self._lock:
+            if self._commit_listener_checked:
+                return
+            self._commit_listener_checked = True
+            listener = poller.new_commit_listener()
+            if listener is not None:
+                self.commit_listener = listener.start()
+
+    def _start_background_poller(self, cache):
+        with self._lock:
+            if self.background_poller is not None or not self.background_poll_interval:
+                return
+            if cache.adapter.poller.transactions_may_go_backwards:
+                # With replicas, our index could be ahead of
+                # what a connection can see.
+                logger.info("Not polling in the background because replicas are in use.")
+                self.background_poll_interval = 0
+                return
+            self.background_poller = BackgroundPoller(
+                self,
+                cache.adapter,
+                cache.local_client,
+                self.background_poll_interval
+            )
+        self.background_poller.start()
+
+    def stop_background_poller(self):
+        poller = self.background_poller
+        if poller is not None:
+            self.background_poller = None
+            self.background_poll_interval = 0
+            poller.stop()
+
+    def saw_commit(self, tid):
+        """
+        Called when this process commits *tid*.
+        """
+        self._latest_local_commit = max(self._latest_local_commit, tid)
+        listener = self.commit_listener
+        if listener is not None:
+            listener.saw_commit(tid)
+
+    def stop_commit_listener(self):
+        listener = self.commit_listener
+        if listener is not None:
+            self.commit_listener = None
+            listener.stop()
+
     def __set_viewer_state_locked(self, cache, index):
         cache.object_index = index
         # attaches the viewer if it was detached.
@@ -620,7 +1009,7 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
         new_index = None
         if tid > 0:
             # tid 0 is empty database, no data.
-            new_index = _ObjectIndex(tid)
+            new_index = self.object_index_type(tid)
 
         with self._lock:
             if new_index is not None and self.object_index is None:
@@ -648,6 +1037,83 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
 
         polling_since = current_index_hvt
 
+        background_poller = self.background_poller
+        if (background_poller is not None
+                and cache is not background_poller
+                and background_poller.is_current()):
+            # The background poller is keeping up, so take what it
+            # has. This has the same snapshot consequences as skipping
+            # the poll because of the commit listener (below). We
+            # still poll for ourself if we've committed something newer than
+            # what's been polled; we must see our own writes.
+            with self._lock:
+                index = self.object_index
+            if (index is not None
+                    and index.highest_visible_tid >= polling_since
+                    and index.highest_visible_tid >= self._latest_local_commit):
+                self.background_served_poll_count += 1
+                return self._poll_skipped(cache, index)
+
+        listener = self.commit_listener
+        listener_token = None
+        if listener is not None:
+            token, token_tid = self._commit_listener_token
+            if (token_tid == polling_since
+                    and self.__index_unchanged(current_index, polling_since)
+                    and listener.no_changes_since(token)):
+                # Nothing has been committed since the last time
+                # anyone polled, so there's no need to ask. Note that
+                # because we didn't query, the load connection's
+                # snapshot will be established by its first load, and
+                # it could include a commit that happened just now,
+                # before we were notified. Loading an object changed
+                # by that commit raises ReadConflictError (see
+                # ``_check_tid_after_load``), so we never see an
+                # inconsistent state; at worst, the transaction retries.
+                return self._poll_skipped(cache, current_index)
+            listener_token = listener.mark()
+
+        # Single-flight: If another viewer is already polling from
+        # the same place, wait for it and share its index instead of
+        # making the same query ourself. This has the same snapshot
+        # consequences as skipping the poll because of the commit
+        # listener (above), and the index we get is one that was
+        # built from a poll, as required by _ObjectIndex.
+        with self._lock:
+            flight = self._polls_in_flight.get(polling_since)
+            leader = flight is None
+            if leader:
+                flight = self._polls_in_flight[polling_since] = _PollInFlight()
+
+        if not leader:
+            change_index = flight.wait(self.poll_wait_timeout)
+            # The leader's query may have started before we committed
+            # something; we must see our own writes.
+            if (change_index is not None
+                    and change_index.highest_visible_tid >= self._latest_local_commit):
+                self.shared_poll_count += 1
+                return self._poll_skipped(cache, change_index)
+            # The leader failed or flushed or took too long, or it can't
+            # see our commit. We have to find out for ourself.
+            return self._poll_database(cache, conn, cursor, current_index,
+                                       polling_since, listener_token)
+
+        change_index = None
+        try:
+            result = self._poll_database(cache, conn, cursor, current_index,
+                                         polling_since, listener_token)
+            change_index = cache.object_index
+            return result
+        finally:
+            with self._lock:
+                if self._polls_in_flight.get(polling_since) is flight:
+                    del self._polls_in_flight[polling_since]
+            flight.finish(change_index)
+
+    def _poll_database(self, cache, conn, cursor,
+                       current_index,
+                       polling_since,
+                       listener_token):
         # Do a small poll.
         # NOTE: See comment in __init__ about tensions about locking
         # and overlapping polls.
@@ -670,8 +1136,13 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
         # Ok cool, we got data to move us forward.
         # We must be careful to always consume the iterator, even if we exit early
         # (because it could be a server-side cursor holding connection state).
-        # So we do that now.
-        change_iter = list(change_iter)
+        # So we do that now, streaming it (without the lock) into the
+        # map that ``with_polled_changes`` would build from it.
+        change_iter = current_index.map_type.from_polled_changes(
+            polled_tid,
+            polling_since,
+            change_iter
+        )
         self.log(
             LTRACE,
             "Polled new tid %s since %s with %s changes",
@@ -745,6 +1216,9 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
                 return None
 
             self.__set_viewer_state_locked(cache, change_index)
+            if listener_token is not None and polled_tid >= (
+                    self._commit_listener_token[1] or 0):
+                self._commit_listener_token = (listener_token, polled_tid)
             if should_vacuum:
                 # Must be sure to vacuum using the state we installed.
                 # If it's been replaced, it will only have moved forward
@@ -754,11 +1228,28 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
 
         return change_iter
 
-    @staticmethod
-    def _find_changes_for_viewer(viewer, object_index):
+    def __index_unchanged(self, index, hvt):
+        with self._lock:
+            return self.object_index is index and index.highest_visible_tid == hvt
+
+    def _poll_skipped(self, cache, change_index):
+        # Give the viewer an index that some other poll produced.
+        # The viewer may still be behind the index.
+        change_iter = self._find_changes_for_viewer(cache, change_index)
+        with self._lock:
+            if self.object_index is None:
+                self.__set_viewer_state_locked(cache, None)
+                return None
+            self.__set_viewer_state_locked(cache, change_index)
+        return change_iter
+
+    def _find_changes_for_viewer(self, viewer, object_index):
         """
         Given a freshly polled *object_index*, and the *viewer* that polled
-        for it, build a changes iterator.
+        for it, find the `_ChangeSet` it needs to see.
+
+        Viewers moving between the same two TIDs share a change set;
+        we only build a new one the first time.
 
         Call this **before** updating the viewer's MVCC state, so that
         we know how far back we need to build the changes.
@@ -782,25 +1273,18 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
         # matching the last time this viewer polled. Everything from there
         # forward is a change
         # Note there could be no changes.
-        last_poll_time = viewer.highest_visible_tid
-        changes = OidTMap()
-        change_dicts = []
-        for m in object_index.maps:
-            if m.highest_visible_tid == last_poll_time:
-                break
-            change_dicts.append(m)
-
-        while change_dicts:
-            # In reverse order, capturing only the most recent change.
-            # TODO: Except for that 'ignore_tid' passed to the viewer's
-            # poll method, we could very efficiently do this with
-            # OidTMap_multiunion with one call to C.
-            changes.update(change_dicts.pop())
-
-        return iteroiditems(changes)
+        key = (viewer.highest_visible_tid, object_index.highest_visible_tid)
+        change_sets = self._change_sets
+        change_set = change_sets.get(key)
+        if change_set is None:
+            change_set = _ChangeSet(object_index.changes_since(viewer.highest_visible_tid))
+            change_sets[key] = change_set
+        else:
+            self.change_set_hit_count += 1
+        return change_set
 
     @log_timed
-    def _vacuum(self, cache, object_index):
+    def _vacuum(self, cache, object_index, budget=None):
         """
         Handle object index and cache entries for which we no longer
         have a requirement.
@@ -830,6 +1314,14 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
         because, even though the objects with the partially diverged index
         will still be able to read just fine, we may prematurely remove
         cached object states that they need.
+
+        If *budget* (by default, ``vacuum_budget``) is positive, we
+        stop after examining about that many OIDs, and pick up where
+        we left off the next time. The oldest map stays in the index
+        until we're done with it; viewers only ever find what we're
+        removing from it in newer maps, so that's safe, and freezing
+        the rest is only correct once everything that changed has
+        been removed.
         """
         # This is called for every transaction. It needs to be fast, and mindful
         # of what it logs.
@@ -863,6 +1355,9 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
             object_index.minimum_highest_visible_tid,
             required_tid,
         )
+        if budget is None:
+            budget = self.vacuum_budget
+        examined = 0
         oids_tids_to_del = OidTMap()
         while 1:
             if object_index.depth == 1:
@@ -876,42 +1371,24 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
                 # The last state isn't quite obsolete, others are still looking
                 # at that range. Don't remove it.
                 break
+            if budget and examined >= budget:
+                self.vacuum_deferred_count += 1
+                break
 
-            # all remaining valid viewers have highest_visible_tid > this one
-            # So any OIDs that exist in both this bucket and any newer bucket with a newer
-            # TID can be purged from the local cache because they've been changed.
-            obsolete_bucket = object_index.maps.pop()
-            # Immediately also mark it as closed before we start mutating its
-            # contents. No more storing to this one!
-            obsolete_bucket.accepts_writes = False
-            newer_oids = object_index.keys()
-            in_both = OidTMap_intersection(newer_oids, obsolete_bucket)
-
-            self.log(
-                LTRACE,
-                "Examining %d old OIDs to see if they've been replaced",
-                len(in_both)
+            examined_now, finished = self._vacuum_oldest_map(
+                object_index,
+                oids_tids_to_del,
+                budget - examined if budget else 0
             )
+            examined += examined_now
+            if not finished:
+                # Out of budget; finish next time.
+                self.vacuum_deferred_count += 1
+                break
 
-            for oid in in_both:
-                old_tid = obsolete_bucket[oid]
-                newer_tid = object_index[oid]
-                # We intersected, we're sure that they're both not None.
-                if newer_tid != old_tid:
-                    # Note that even though we're removing data from
-                    # this bucket that might be in the range that it
-                    # claims to have complete index data for, that's
-                    # fine: The end result when we put everything back
-                    # together is still going to be complete index
-                    # data, because the object changed in the future.
-                    # This particular transaction chunk won't be complete, but
-                    # it's inaccessible.
-                    # This is where we should hook in the 'invalidation' tracing.
-                    del obsolete_bucket[oid]
-                    oids_tids_to_del[oid] = old_tid # These will just keep going up
-                    # If we have a shared memcache, we can't be sure everyone
-                    # else is done with this key, so we just leave it alone.
-
+            self._vacuum_progress = None
+            obsolete_bucket = object_index.maps.pop()
+            self.vacuum_map_count += 1
             # Now at this point, the obsolete_bucket contains data that we know is
             # either not present in a future map, or is present with exactly the
             # same value. Therefore, at least until someone changes it again,
@@ -924,19 +1401,118 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
                 self.log(LTRACE, "Vacuum: Freezing %s old OIDs", len(obsolete_bucket))
                 local_client.freeze(obsolete_bucket)
 
+        self.vacuum_oid_count += examined
         if oids_tids_to_del:
             local_client.delitems(oids_tids_to_del)
 
+        # Viewers only ever catch up to the newest index, and only
+        # from a TID that's still in it.
+        min_tid = object_index.minimum_highest_visible_tid
+        max_tid = object_index.highest_visible_tid
+        self._change_sets = {
+            k: v
+            for k, v in self._change_sets.copy().items()
+            if k[0] >= min_tid and k[1] >= max_tid
+        }
+
+    def _vacuum_oldest_map(self, object_index, oids_tids_to_del, budget):
+        """
+        Remove the OIDs that have changed since the oldest map in
+        *object_index* from it, and add their old TIDs to
+        *oids_tids_to_del*.
+
+        If *budget* is positive, examine only about that many OIDs,
+        picking up where the last call left off. Returns the number of
+        OIDs examined and whether the map is finished.
+        """
+        # all remaining valid viewers have highest_visible_tid > this one
+        # So any OIDs that exist in both this bucket and any newer bucket with a newer
+        # TID can be purged from the local cache because they've been changed.
+        obsolete_bucket = object_index.maps[-1]
+        progress = self._vacuum_progress
+        if progress is None or progress[0] is not obsolete_bucket:
+            # Immediately also mark it as closed before we start mutating its
+            # contents. No more storing to this one!
+            obsolete_bucket.accepts_writes = False
+            in_both = object_index.keys_in(obsolete_bucket)
+
+            self.log(
+                LTRACE,
+                "Examining %d old OIDs to see if they've been replaced",
+                len(in_both)
+            )
+            progress = self._vacuum_progress = [obsolete_bucket, iter(in_both), len(in_both)]
+
+        examined = 0
+        for oid in progress[1]:
+            progress[2] -= 1
+            examined += 1
+            old_tid = obsolete_bucket[oid]
+            newer_tid = object_index[oid]
+            # We intersected, we're sure that they're both not None.
+            if newer_tid != old_tid:
+                # Note that even though we're removing data from
+                # this bucket that might be in the range that it
+                # claims to have complete index data for, that's
+                # fine: The end result when we put everything back
+                # together is still going to be complete index
+                # data, because the object changed in the future.
+                # This particular transaction chunk won't be complete, but
+                # it's inaccessible.
+                # This is where we should hook in the 'invalidation' tracing.
+                del obsolete_bucket[oid]
+                oids_tids_to_del[oid] = old_tid # These will just keep going up
+                # If we have a shared memcache, we can't be sure everyone
+                # else is done with this key, so we just leave it alone.
+            if budget and examined >= budget:
+                break
+        return examined, not progress[2]
+
 
     def flush_all(self):
         with self._lock:
             self.object_index = None
+            self._commit_listener_token = (None, None)
+            self._vacuum_progress = None
+            self._change_sets = {}
             self.detach_all()
 
     def close(self):
+        self.stop_background_poller()
+        self.stop_checkpointing()
+        self.stop_commit_listener()
         self.clear()
         with self._lock:
             self.object_index = None
+            self._vacuum_progress = None
+            self._change_sets = {}
+        if self.predictor is not None:
+            self.predictor.clear()
+
+    def stop_checkpointing(self):
+        checkpointer = self.checkpointer
+        if checkpointer is not None:
+            self.checkpointer = None
+            checkpointer.stop()
+
+    def checkpoint(self, local_client):
+        """
+        Write what has changed in *local_client* since the last time
+        to the persistent cache.
+
+        Unlike :meth:`save`, this can be done while viewers are active.
+        The data we write isn't necessarily current as of the
+        checkpoint we record, but that's fine: everything in the
+        persistent cache is checked against the database when it is
+        restored.
+        """
+        with self._lock:
+            object_index = self.object_index
+            max_hvt = object_index.maximum_highest_visible_tid if object_index else None
+            if not max_hvt:
+                return 0
+            checkpoints = (max_hvt, self.complete_since_tid or max_hvt)
+        return local_client.checkpoint(checkpoints)
 
     def save(self, cache, save_args):
         if not self.object_index or not self.object_index.maximum_highest_visible_tid:
@@ -947,7 +1523,7 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
         # Vacuum, disposing of uninteresting and duplicate data.
         # We should have no viewers, so we eliminated all except the final map.
         self.detach_all()
-        self._vacuum(cache, self.object_index)
+        self._vacuum(cache, self.object_index, budget=0)
         # At this point, we now have processed all the extent invalidations.
         # Note that if there was previously saved data that we invalidated,
         # and have vacuumed away from our index now, we won't know to remove it from
@@ -985,15 +1561,44 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
             # stored in the data. All loaded rows are treated as frozen.
             # We won't write them back out.
 
-            self.object_index = _ObjectIndex(highest_visible_tid)
-            self.__poll_old_oids_and_remove(adapter, local_client, timeout or POLL_TIMEOUT)
+            self.object_index = self.object_index_type(highest_visible_tid)
+            if self.lazy_restore:
+                # Rows won't be loaded until this finishes, but
+                # we can start answering requests from the database
+                # right away.
+                spawn(self.__validate_lazy_restore,
+                      (adapter, local_client, timeout or POLL_TIMEOUT),
+                      daemon=True)
+            else:
+                self.__poll_old_oids_and_remove(adapter, local_client, timeout or POLL_TIMEOUT)
+        elif self.lazy_restore:
+            # Without checkpoints, there's nothing we can validate against.
+            local_client.flush_all()
+
+        if self.checkpoint_interval and self.checkpointer is None:
+            self.checkpointer = BackgroundCheckpointer(
+                self.checkpoint_interval,
+                lambda: self.checkpoint(local_client),
+                'relstorage-cache-checkpointer'
+            ).start()
+
+    def __validate_lazy_restore(self, adapter, local_client, timeout):
+        try:
+            self.__poll_old_oids_and_remove(adapter, local_client, timeout)
+        except Exception: # pylint:disable=broad-except
+            # We'll never load any of the rows, but
+            # that's no worse than an empty cache.
+            logger.exception("Failed to validate the persistent cache")
+        else:
+            local_client.lazy_restore_validated()
 
     @log_timed
     def __poll_old_oids_and_remove(self, adapter, local_client, timeout):
         from relstorage.adapters.connmanager import connection_callback
         from relstorage.adapters.interfaces import AggregateOperationTimeoutError
 
-        cached_oids = OidSet(local_client.keys())
+        cached_oid_tids = local_client.restored_oid_tids()
+        cutoff_tid = self._restore_cutoff_tid(cached_oid_tids)
         # In local tests, this function executes against PostgreSQL 11 in .78s
         # for 133,002 older OIDs; or, .35s for 57,002 OIDs against MySQL 5.7.
         # In one production environment of 800,000 OIDs with a 98% survival rate,
@@ -1002,36 +1607,126 @@ class MVCCDatabaseCoordinator(DetachableMVCCDatabaseCoordinator):
         # is under intense IO stress, this can take 400s for 500,000 OIDS:
         # since the ``current_object_tids`` batches in groups of 1024, that works out to
         # .75s per SQL query. Not good. Hence the ability to set a timeout.
+        #
+        # So when we can, we only look up the OIDs with older states
+        # that way, and validate the rest with a single poll for the
+        # changes since the oldest of them. See ``_restore_cutoff_tid``.
         logger.info("Polling %d oids stored in cache with SQL timeout %r",
-                    len(cached_oids), timeout)
+                    len(cached_oid_tids), timeout)
 
         @connection_callback(isolation_level=adapter.connmanager.isolation_load,
                              read_only=True)
-        def poll_cached_oids(_conn, cursor):
-            # type: (Any, Any) -> Dict[Int, Int]
-            """Return mapping of {oid_int: tid_int}"""
+        def poll_cached_oids(conn, cursor):
+            # type: (Any, Any) -> Tuple[Dict[Int, Int], OidSet]
+            """
+            Return mapping of {oid_int: tid_int}, and the set of
+            OIDs known not to have any other TID.
+            """
+            polled = OidTMap()
+            polled_oids = OidSet()
+            query_oids = cached_oid_tids
+            if cutoff_tid is not None:
+                changes = self._poll_changes_since(adapter, conn, cursor, cutoff_tid,
+                                                   cached_oid_tids)
+                if changes is not None:
+                    polled = changes
+                    polled_oids = OidSet(
+                        oid for oid, tid in iteroiditems(cached_oid_tids)
+                        if tid > cutoff_tid
+                    )
+                    query_oids = OidSet(
+                        oid for oid, tid in iteroiditems(cached_oid_tids)
+                        if tid <= cutoff_tid
+                    )
             try:
-                return adapter.mover.current_object_tids(cursor, cached_oids,
-                                                         timeout=timeout)
+                current = adapter.mover.current_object_tids(cursor, query_oids,
+                                                            timeout=timeout)
             except AggregateOperationTimeoutError as ex:
                 # If we time out, we can at least validate the results we have
                 # so far.
                 logger.info(
                     "Timed out polling the database for %s oids; will use %s partial results",
-                    len(cached_oids), len(ex.partial_result)
+                    len(query_oids), len(ex.partial_result)
                 )
-                return ex.partial_result
+                current = ex.partial_result
+            polled.update(current)
+            return polled, polled_oids
 
-        current_tids = adapter.connmanager.open_and_call(poll_cached_oids)
+        current_tids, polled_oids = adapter.connmanager.open_and_call(poll_cached_oids)
         current_tid = current_tids.get
         polled_invalid_oids = OidSet()
-        cache_is_correct = local_client._cache.contains_oid_with_tid
+        cache_is_correct = local_client.restored_state_is_current
 
-        for oid_int in cached_oids:
-            if not cache_is_correct(oid_int, current_tid(oid_int)):
+        for oid_int in cached_oid_tids:
+            tid = current_tid(oid_int)
+            if tid is None and oid_int in polled_oids:
+                # Not changed since before the state we have; that can only
+                # be true if it's gone from the database.
+                polled_invalid_oids.add(oid_int)
+            elif not cache_is_correct(oid_int, tid):
                 polled_invalid_oids.add(oid_int)
 
         logger.info("Polled %d older oids stored in cache (%d found in database); %d survived",
-                    len(cached_oids), len(current_tids),
-                    len(cached_oids) - len(polled_invalid_oids))
+                    len(cached_oid_tids), len(current_tids),
+                    len(cached_oid_tids) - len(polled_invalid_oids))
         local_client.remove_invalid_persistent_oids(polled_invalid_oids)
+
+    #: When validating a restored cache, look up at most about this
+    #: fraction of the OIDs (the ones with the oldest states)
+    #: individually; validate the rest by polling for changes since
+    #: then.
+    restore_lookup_fraction = 0.1
+    #: ...unless that poll finds more than this many changes for each
+    #: OID in the cache, in which case we look them all up.
+    restore_max_changes_per_oid = 2
+
+    def _restore_cutoff_tid(self, cached_oid_tids):
+        """
+        Choose the TID dividing the restored states that we look up
+        from those we validate by polling, or None to look them all
+        up.
+
+        A saved checkpoint only tells us how new the cache was, not
+        how old its states might be: processes sharing the cache file
+        write at different times, and the checkpoints are written
+        while connections are still using older states. The TIDs of
+        the states themselves are all we can rely on. A state whose
+        TID is newer than the cutoff is current if, and only if, the
+        poll finds its object last changed at that TID.
+        """
+        count = len(cached_oid_tids)
+        if not count:
+            return None
+        tids = sorted(cached_oid_tids.values())
+        cutoff_tid = tids[int(count * self.restore_lookup_fraction)]
+        if cutoff_tid >= tids[-1]:
+            # Nothing to poll for.
+            return None
+        return cutoff_tid
+
+    def _poll_changes_since(self, adapter, conn, cursor, tid, cached_oid_tids):
+        """
+        Return the ``{oid: tid}`` changes since *tid* for the objects
+        in *cached_oid_tids*, or None if there are too many changes
+        (or the database can't tell us).
+        """
+        from relstorage.adapters.interfaces import StaleConnectionError
+        try:
+            changes, _ = adapter.poller.poll_invalidations(conn, cursor, tid)
+        except StaleConnectionError:
+            changes = None
+        if changes is None:
+            return None
+
+        limit = len(cached_oid_tids) * self.restore_max_changes_per_oid
+        result = OidTMap()
+        for count, (oid, changed_tid) in enumerate(changes, 1):
+            if count > limit:
+                logger.info(
+                    "More than %d objects changed since TID %d; "
+                    "checking all %d cached oids instead",
+                    limit, tid, len(cached_oid_tids))
+                return None
+            if oid in cached_oid_tids:
+                result[oid] = changed_tid
+        return result
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""
+Predicting which objects will be loaded next.
+
+The ZODB loads objects one at a time, as the application traverses
+them. On a cold cache, that turns into one database query per object.
+But applications tend to traverse the same objects in the same order
+over and over (think of rendering the same page template), so if we
+remember which objects were loaded right after a given object, the
+next time that object has to come from the database we can fetch its
+likely followers in the same query.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import threading
+from collections import OrderedDict
+
+from relstorage._compat import OID_SET_TYPE as OidSet
+from relstorage._util import positive_integer
+
+logger = __import__('logging').getLogger(__name__)
+
+
+class FollowerPredictor(object):
+    """
+    A bounded table of ``{oid: (follower_oid, ...)}``.
+
+    For each OID we remember up to *followers* distinct OIDs that
+    were loaded immediately after it, most recent first. At most
+    *table_size* OIDs are remembered; when that is exceeded, the
+    least recently recorded OIDs are discarded.
+
+    This is shared by all the viewers of a
+    :class:`relstorage.cache.mvcc.MVCCDatabaseCoordinator`, so all
+    of its methods are thread safe.
+    """
+
+    #: The maximum number of OIDs we keep followers for.
+    table_size = positive_integer(
+        os.environ.get('RS_CACHE_PREFETCH_TABLE_SIZE', '10000')
+    )
+
+    def __init__(self, followers, table_size=None):
+        self.followers = followers
+        if table_size is not None:
+            self.table_size = table_size
+        self._lock = threading.Lock()
+        self._table = OrderedDict()
+        # The OIDs we fetched on a guess that haven't been
+        # loaded yet.
+        self._pending = OidSet()
+        self.prefetched_count = 0
+        self.hit_count = 0
+
+    def __len__(self):
+        return len(self._table)
+
+    def record(self, previous_oid, oid):
+        """
+        Note that *oid* was loaded right after *previous_oid*.
+
+        *previous_oid* may be None, in which case the only thing we
+        do is check whether the load of *oid* was predicted.
+        """
+        with self._lock:
+            if oid in self._pending:
+                self._pending.remove(oid)
+                self.hit_count += 1
+
+            if previous_oid is None or previous_oid == oid:
+                return
+
+            table = self._table
+            existing = table.pop(previous_oid, ())
+            if existing and existing[0] == oid:
+                table[previous_oid] = existing
+                return
+            followers = (oid,) + tuple(x for x in existing if x != oid)
+            table[previous_oid] = followers[:self.followers]
+            if len(table) > self.table_size:
+                table.popitem(False)
+
+    def predict(self, oid):
+        """
+        Return a tuple of the OIDs we expect to be loaded soon after
+        *oid*.
+        """
+        return self._table.get(oid, ())
+
+    def note_prefetched(self, oids):
+        """
+        Note that we loaded all of *oids* from the database on a
+        prediction.
+        """
+        with self._lock:
+            pending = self._pending
+            if len(pending) > self.table_size:
+                # Too many guesses that never panned out.
+                # They're all counted as waste.
+                pending.clear()
+            for oid in oids:
+                pending.add(oid)
+                self.prefetched_count += 1
+
+    def clear(self):
+        with self._lock:
+            self._table.clear()
+            self._pending.clear()
+
+    def stats(self):
+        prefetched = self.prefetched_count
+        hits = self.hit_count
+        return {
+            'prefetch_table_size': len(self._table),
+            'prefetch_count': prefetched,
+            'prefetch_hits': hits,
+            'prefetch_hit_ratio': hits / prefetched if prefetched else 0,
+            'prefetch_waste_ratio': (prefetched - hits) / prefetched if prefetched else 0,
+        }
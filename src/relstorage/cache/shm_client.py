@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""
+An implementation of ``IStateCache`` that keeps its data in a
+memory-mapped file, so that it can be shared between all the
+processes on a host.
+
+Like memcache, this cache only knows about exact ``(oid, tid)`` keys;
+it does not support frozen objects. It is meant to sit between the
+private :class:`relstorage.cache.local_client.LocalClient` of each
+process (which handles the MVCC details) and the database.
+
+The file is laid out as:
+
+- A small header holding the geometry of the file and the *head*,
+  the total number of bytes ever written to the data ring.
+- An index of fixed-size entries, grouped into buckets. All the
+  entries for any given OID are in the same bucket.
+- The data ring. Values are appended at the head, overwriting the
+  oldest values.
+
+Writers (in any process) serialize using a lock on the file. Readers
+don't lock at all. Each index entry has a sequence number that is odd
+while the entry is being changed, and a value is only valid if the
+head hasn't advanced far enough to overwrite it, so a reader can copy
+an entry and its value and then check that neither was disturbed
+while it was doing so. If anything was, the read is simply a miss.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from zope import interface
+
+from relstorage.cache.interfaces import IStateCache
+
+try:
+    import fcntl
+except ImportError: # pragma: no cover
+    # Windows.
+    fcntl = None
+
+logger = __import__('logging').getLogger(__name__)
+
+# magic, bucket count, ring size, head
+_HEADER = struct.Struct('<8sQQQ')
+_HEADER_SIZE = 64
+_HEAD = struct.Struct('<Q')
+_HEAD_OFFSET = 24
+_MAGIC = b'RSSHMC01'
+
+# seq, length, oid, tid, pos. A tid of 0 marks an empty entry.
+_ENTRY = struct.Struct('<IIqqQ')
+_SEQ = struct.Struct('<I')
+_ENTRIES_PER_BUCKET = 4
+_BUCKET_SIZE = _ENTRY.size * _ENTRIES_PER_BUCKET
+
+# The portion of the file given to the index.
+_INDEX_FRACTION = 8
+
+
+def shared_cache_dir():
+    """
+    Return the directory that holds the shared files.
+
+    This is the value of the environment variable
+    ``RS_CACHE_SHARED_DIR``, if set; otherwise, the RAM-backed
+    ``/dev/shm`` if it exists, or the temporary directory.
+    """
+    result = os.environ.get('RS_CACHE_SHARED_DIR')
+    if not result:
+        result = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return result
+
+
+@interface.implementer(IStateCache)
+class SharedMemoryStateCache(object):
+    """
+    A cache shared by all processes on a host.
+
+    All instances in a process that use the same file share a single
+    mapping, and all processes that use the same file share the same
+    memory.
+    """
+
+    @classmethod
+    def from_options(cls, options, prefix=''):
+        """
+        Create and return a SharedMemoryStateCache from the options,
+        if they allow it.
+        """
+        size = int(options.cache_local_storage_mb * 1000000)
+        if size <= 0:
+            return None
+        if fcntl is None: # pragma: no cover
+            logger.warning("Shared memory caching is not supported on this platform.")
+            return None
+        name = re.sub(r'[^\w.-]', '_', prefix) or 'default'
+        path = os.path.join(shared_cache_dir(), 'relstorage-shm-' + name + '.cache')
+        return cls(path, size)
+
+    def __init__(self, path, size):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        # Set by __map() once we know the geometry of the file.
+        self.bucket_count = None
+        self.ring_size = None
+        self.max_value_size = None
+        self._ring_offset = None
+        self._mm = None
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with self._write_lock():
+                self.__open_mapping(size)
+        except Exception:
+            os.close(self._fd)
+            raise
+        self.hits = self.misses = self.sets = 0
+
+    def __open_mapping(self, size):
+        fd = self._fd
+        existing_size = os.fstat(fd).st_size
+        if existing_size >= _HEADER_SIZE:
+            with open(self.path, 'rb') as f:
+                magic, bucket_count, ring_size, _ = _HEADER.unpack(f.read(_HEADER.size))
+            if (magic == _MAGIC
+                    and existing_size == self.__file_size(bucket_count, ring_size)):
+                # Another process already set it up. Use what they
+                # chose even if our size is different; other processes
+                # have it mapped.
+                if existing_size != self.__geometry(size)[2]:
+                    logger.info(
+                        "Using existing shared cache %s of %d bytes instead of %d",
+                        self.path, existing_size, size)
+                self.__map(bucket_count, ring_size)
+                return
+
+        bucket_count, ring_size, file_size = self.__geometry(size)
+        os.ftruncate(fd, 0)
+        os.ftruncate(fd, file_size)
+        self.__map(bucket_count, ring_size)
+        _HEADER.pack_into(self._mm, 0, _MAGIC, bucket_count, ring_size, 0)
+        logger.info("Created shared cache %s of %d bytes", self.path, file_size)
+
+    @staticmethod
+    def __file_size(bucket_count, ring_size):
+        return _HEADER_SIZE + bucket_count * _BUCKET_SIZE + ring_size
+
+    @classmethod
+    def __geometry(cls, size):
+        bucket_count = max(1, size // _INDEX_FRACTION // _BUCKET_SIZE)
+        ring_size = max(size - bucket_count * _BUCKET_SIZE, _BUCKET_SIZE)
+        return bucket_count, ring_size, cls.__file_size(bucket_count, ring_size)
+
+    def __map(self, bucket_count, ring_size):
+        self.bucket_count = bucket_count
+        self.ring_size = ring_size
+        self._ring_offset = _HEADER_SIZE + bucket_count * _BUCKET_SIZE
+        # Don't let any one value take up too much of the ring.
+        self.max_value_size = ring_size // 8
+        self._mm = mmap.mmap(self._fd, self.__file_size(bucket_count, ring_size))
+
+    @property
+    def limit(self):
+        return self.ring_size
+
+    @contextmanager
+    def _write_lock(self):
+        # File locks belong to the process, so we need
+        # a lock for our threads too.
+        with self._thread_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+
+    def _bucket_offset(self, oid):
+        return _HEADER_SIZE + ((oid * 2654435761) % self.bucket_count) * _BUCKET_SIZE
+
+    def _read(self, oid, tid):
+        # Lock-free. Returns the state bytes, or None.
+        mm = self._mm
+        offset = self._bucket_offset(oid)
+        for offset in range(offset, offset + _BUCKET_SIZE, _ENTRY.size):
+            seq, length, entry_oid, entry_tid, pos = _ENTRY.unpack_from(mm, offset)
+            if entry_oid != oid or entry_tid != tid or seq & 1:
+                continue
+            start = self._ring_offset + pos % self.ring_size
+            data = mm[start:start + length]
+            # The value is intact only if the head hasn't wrapped
+            # around to it, and the entry still describes it.
+            if (_HEAD.unpack_from(mm, _HEAD_OFFSET)[0] <= pos + self.ring_size
+                    and _SEQ.unpack_from(mm, offset)[0] == seq):
+                return data
+        return None
+
+    def __getitem__(self, oid_tid, peek=False):
+        oid, tid = oid_tid
+        if tid is None:
+            # We don't support frozen keys, only those in the index
+            return None
+        data = self._read(oid, tid)
+        if data is None:
+            if not peek:
+                self.misses += 1
+            return None
+        if not peek:
+            self.hits += 1
+        return data, tid
+
+    get = __getitem__
+
+    def get_multiple(self, oids_tids):
+        result = {}
+        for oid, tid in oids_tids:
+            value = self[(oid, tid)]
+            if value is not None:
+                result[oid] = value
+        return result
+
+    def __contains__(self, oid_tid):
+        return self.get(oid_tid, True) is not None
+
+    def _write_locked(self, oid, tid, state):
+        # Must hold the write lock.
+        length = len(state)
+        mm = self._mm
+        ring_size = self.ring_size
+        head = _HEAD.unpack_from(mm, _HEAD_OFFSET)[0]
+        start = head % ring_size
+        if start + length > ring_size:
+            # Values don't wrap; skip the tail of the ring.
+            head += ring_size - start
+            start = 0
+        # Advance the head before writing any data so that
+        # readers can tell what we're overwriting.
+        _HEAD.pack_into(mm, _HEAD_OFFSET, head + length)
+        data_start = self._ring_offset + start
+        mm[data_start:data_start + length] = state
+
+        # Replace an existing or empty entry, or else the one
+        # holding the oldest value.
+        bucket = self._bucket_offset(oid)
+        victim = victim_pos = None
+        for offset in range(bucket, bucket + _BUCKET_SIZE, _ENTRY.size):
+            _, _, entry_oid, entry_tid, pos = _ENTRY.unpack_from(mm, offset)
+            if not entry_tid or (entry_oid == oid and entry_tid == tid):
+                victim = offset
+                break
+            if victim is None or pos < victim_pos:
+                victim = offset
+                victim_pos = pos
+        self.__update_entry(victim, length, oid, tid, head)
+
+    def __update_entry(self, offset, length, oid, tid, pos):
+        mm = self._mm
+        seq = _SEQ.unpack_from(mm, offset)[0]
+        _SEQ.pack_into(mm, offset, (seq + 1) & 0xFFFFFFFF)
+        _ENTRY.pack_into(mm, offset, (seq + 1) & 0xFFFFFFFF, length, oid, tid, pos)
+        _SEQ.pack_into(mm, offset, (seq + 2) & 0xFFFFFFFF)
+
+    def __setitem__(self, oid_tid, state_bytes_tid):
+        oid, tid = oid_tid
+        state = state_bytes_tid[0] or b''
+        if len(state) > self.max_value_size:
+            return
+        with self._write_lock():
+            self._write_locked(oid, tid, state)
+        self.sets += 1
+
+    def __delitem__(self, oid_tid):
+        self._remove(lambda oid, tid: (oid, tid) == oid_tid, (oid_tid[0],))
+
+    def _remove(self, matches, oids):
+        mm = self._mm
+        with self._write_lock():
+            for oid in oids:
+                bucket = self._bucket_offset(oid)
+                for offset in range(bucket, bucket + _BUCKET_SIZE, _ENTRY.size):
+                    _, _, entry_oid, entry_tid, _ = _ENTRY.unpack_from(mm, offset)
+                    if entry_tid and matches(entry_oid, entry_tid):
+                        self.__update_entry(offset, 0, 0, 0, 0)
+
+    def invalidate_all(self, oids):
+        oids = set(oids)
+        self._remove(lambda oid, _tid: oid in oids, oids)
+
+    def set_all_for_tid(self, tid_int, state_oid_iter):
+        max_value_size = self.max_value_size
+        count = 0
+        with self._write_lock():
+            for state, oid_int, _ in state_oid_iter:
+                state = state or b''
+                if len(state) > max_value_size:
+                    continue
+                self._write_locked(oid_int, tid_int, state)
+                count += 1
+        self.sets += count
+
+    def flush_all(self):
+        mm = self._mm
+        index_size = self.bucket_count * _BUCKET_SIZE
+        with self._write_lock():
+            mm[_HEADER_SIZE:_HEADER_SIZE + index_size] = b'\0' * index_size
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'path': self.path,
+            'limit': self.limit,
+            'hits': self.hits,
+            'misses': self.misses,
+            'sets': self.sets,
+            'ratio': self.hits / total if total else 0,
+        }
+
+    def new_instance(self):
+        # All instances in the process share the mapping.
+        return self
+
+    def release(self):
+        "Does nothing; the root instance owns the mapping."
+
+    def close(self):
+        if self._fd is not None:
+            self._mm.close()
+            os.close(self._fd)
+            self._fd = None
+            self._mm = None
+
+    def updating_delta_map(self, deltas):
+        return deltas
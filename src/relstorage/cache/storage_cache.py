@@ -17,6 +17,7 @@ from __future__ import print_function
 
 # pylint:disable=too-many-lines
 
+import importlib
 import logging
 import os
 import threading
@@ -29,6 +30,7 @@ from zope import interface
 from relstorage._compat import IN_TESTRUNNER
 from relstorage._compat import OID_SET_TYPE as OIDSet
 from relstorage._compat import OID_TID_MAP_TYPE as OidTMap
+from relstorage._compat import iteroiditems
 from relstorage._util import bytes8_to_int64
 from relstorage._mvcc import DetachableMVCCDatabaseViewer
 
@@ -47,11 +49,12 @@ logger = log = logging.getLogger(__name__)
 
 class _UsedAfterRelease(object):
     size = limit = 0
+    predictor = checkpointer = None
     def __len__(self):
         return 0
     def __call__(self):
         raise NotImplementedError
-    close = reset_stats = release = unregister = lambda self, *args: None
+    close = reset_stats = release = unregister = stop_checkpointing = lambda self, *args: None
     stats = lambda s: {}
     new_instance = lambda s: s
 _UsedAfterRelease = _UsedAfterRelease()
@@ -76,6 +79,7 @@ class StorageCache(DetachableMVCCDatabaseViewer):
         'local_client',
         'cache',
         'object_index',
+        'last_loaded_oid',
     )
 
 
@@ -100,13 +104,15 @@ class StorageCache(DetachableMVCCDatabaseViewer):
             # polling.
             self.polling_state = MVCCDatabaseCoordinator(self.options)
             self.local_client = LocalClient(options, self.prefix)
+            self.cache = self.local_client
 
+            host_cache = self._host_cache_from_options(options, self.prefix)
+            if host_cache is not None:
+                self.cache = MultiStateCache(self.cache, host_cache)
 
             shared_cache = MemcacheStateCache.from_options(options, self.prefix)
             if shared_cache is not None:
-                self.cache = MultiStateCache(self.local_client, shared_cache)
-            else:
-                self.cache = self.local_client
+                self.cache = MultiStateCache(self.cache, shared_cache)
 
             tracefile = persistence.trace_file(options, self.prefix)
             if tracefile:
@@ -125,6 +131,9 @@ class StorageCache(DetachableMVCCDatabaseViewer):
         # where we're sure to be single threaded.)
         # This object can be None
         self.object_index = None
+        # The OID we loaded most recently in this transaction,
+        # for the prefetch predictor.
+        self.last_loaded_oid = None
 
         # It is also important not to register with the coordinator until
         # we are fully initialized; we could be constructing a new_instance
@@ -137,6 +146,20 @@ class StorageCache(DetachableMVCCDatabaseViewer):
             self.restore()
 
 
+    @staticmethod
+    def _host_cache_from_options(options, prefix):
+        """
+        Create the cache shared between the processes on this host
+        named by ``cache_local_storage``, if any.
+        """
+        factory = options.cache_local_storage
+        if not factory:
+            return None
+        if not callable(factory):
+            module_name, class_name = factory.rsplit('.', 1)
+            factory = getattr(importlib.import_module(module_name), class_name)
+        return factory.from_options(options, prefix)
+
     @property
     def current_tid(self):
         # testing
@@ -166,6 +189,10 @@ class StorageCache(DetachableMVCCDatabaseViewer):
         stats = self.local_client.stats()
         stats['local_index_stats'] = self.object_index.stats() if self.object_index else None
         stats['global_index_stats'] = self.polling_state.stats()
+        predictor = self.polling_state.predictor
+        stats['prefetch_stats'] = predictor.stats() if predictor is not None else None
+        checkpointer = self.polling_state.checkpointer
+        stats['checkpoint_stats'] = checkpointer.stats() if checkpointer is not None else None
         return stats
 
     def __repr__(self):
@@ -228,8 +255,10 @@ class StorageCache(DetachableMVCCDatabaseViewer):
         polling_state = self.polling_state
 
         # Go ahead and release our polling_state now, in case
-        # it helps to vacuum for save.
+        # it helps to vacuum for save. Any background writes must be finished
+        # first; what's left for save to write is only what they haven't.
         self.polling_state.unregister(self)
+        self.polling_state.stop_checkpointing()
         self.save(**save_args)
         self.release()
         cache.close()
@@ -437,6 +466,11 @@ class StorageCache(DetachableMVCCDatabaseViewer):
         # internally in the clients.
 
 
+        predictor = self.polling_state.predictor
+        if predictor is not None:
+            predictor.record(self.last_loaded_oid, oid_int)
+            self.last_loaded_oid = oid_int
+
         cache = self.cache
         index = self.object_index
         indexed_tid_int = index[oid_int] # Could be None pylint:disable=unsubscriptable-object
@@ -453,6 +487,11 @@ class StorageCache(DetachableMVCCDatabaseViewer):
             return cache_data
 
         # Cache miss.
+        followers = predictor.predict(oid_int) if predictor is not None else ()
+        if followers:
+            return self._load_with_followers(cursor, oid_int, indexed_tid_int,
+                                             followers, predictor)
+
         state, actual_tid_int = self.adapter.mover.load_current(
             cursor, oid_int)
         if actual_tid_int:
@@ -468,6 +507,129 @@ class StorageCache(DetachableMVCCDatabaseViewer):
         # This is in the bytecode as a LOAD_CONST
         return None, None
 
+    def load_multiple(self, cursor, oid_ints):
+        """
+        Load all of the given objects, from cache if possible.
+
+        This is like calling :meth:`load` for each object, except that
+        all the cache lookups are done at once, and all the cache
+        misses are loaded from the database with a single query. The
+        prefetch predictor learns from the order of *oid_ints*, but
+        doesn't add any predicted objects to the query.
+
+        Returns a dictionary ``{oid_int: (state_bytes, tid_int)}``.
+        Objects that do not exist are not included.
+        """
+        if not self.object_index:
+            # No poll has occurred yet. For safety, don't use the cache.
+            return {
+                oid: (state, tid_int)
+                for oid, state, tid_int in self.adapter.mover.load_currents(cursor, oid_ints)
+                if tid_int
+            }
+
+        predictor = self.polling_state.predictor
+        if predictor is not None:
+            # Learn from these in order, as if they were loaded one
+            # at a time.
+            oid_ints = list(oid_ints)
+            last_loaded_oid = self.last_loaded_oid
+            for oid_int in oid_ints:
+                predictor.record(last_loaded_oid, oid_int)
+                last_loaded_oid = oid_int
+            self.last_loaded_oid = last_loaded_oid
+
+        cache = self.cache
+        index = self.object_index
+        hvt = self.highest_visible_tid
+        # {oid: indexed_tid}; the TID may be None. See load().
+        indexed_tids = {
+            oid_int: index[oid_int] # pylint:disable=unsubscriptable-object
+            for oid_int in oid_ints
+        }
+        result = cache.get_multiple(iteroiditems(indexed_tids))
+        for oid_int, cache_data in list(result.items()):
+            if indexed_tids[oid_int] is None and cache_data[1] > hvt:
+                # A wildcard hit that didn't verify. See load().
+                del result[oid_int]
+
+        to_fetch = {
+            oid_int: indexed_tid
+            for oid_int, indexed_tid in iteroiditems(indexed_tids)
+            if oid_int not in result
+        }
+        if to_fetch:
+            result.update(self._load_currents_and_cache(cursor, to_fetch))
+        return result
+
+    def _load_currents_and_cache(self, cursor, expected_tids, speculative=()):
+        """
+        Load all the objects in the mapping *expected_tids*
+        (``{oid_int: indexed_tid_int_or_None}``) from the database
+        with a single query, verifying them against their indexed
+        TIDs and storing them in the cache and the index.
+
+        Objects in *speculative* weren't asked for; if they don't
+        verify, they're silently left out instead of raising an error.
+
+        Returns a dictionary ``{oid_int: (state_bytes, tid_int)}``
+        of the objects that exist.
+        """
+        cache = self.cache
+        check = self._check_tid_after_load
+        highest_visible_tid = self.highest_visible_tid
+        result = {}
+        loaded_tids = OidTMap()
+        for oid_int, state, actual_tid_int in self.adapter.mover.load_currents(
+                cursor, list(expected_tids)):
+            if not actual_tid_int:
+                continue
+            expect_tid_int = expected_tids[oid_int]
+            if oid_int in speculative:
+                # The load connection's snapshot may be newer than
+                # what we've polled (if polls were skipped), so this
+                # can legitimately be newer than we can use. That's
+                # not a reason to fail the load that was asked for.
+                if (actual_tid_int > highest_visible_tid
+                        or (expect_tid_int is not None and actual_tid_int != expect_tid_int)):
+                    continue
+            else:
+                check(oid_int, actual_tid_int, expect_tid_int, cursor)
+            loaded_tids[oid_int] = actual_tid_int
+            cache[(oid_int, actual_tid_int)] = (state, actual_tid_int)
+            result[oid_int] = (state, actual_tid_int)
+
+        self.object_index.update(loaded_tids) # pylint:disable=no-member
+        return result
+
+    def _load_with_followers(self, cursor, oid_int, indexed_tid_int,
+                             followers, predictor):
+        """
+        Handle a cache miss for *oid_int* by also loading the
+        *followers* we predict will be needed soon, if they're not
+        already cached, all in a single query.
+
+        Returns ``(state_bytes, tid_int)`` for *oid_int*, just
+        like :meth:`load`.
+        """
+        cache = self.cache
+        index = self.object_index
+        expected_tids = {oid_int: indexed_tid_int}
+        for follower in followers:
+            follower_tid = index[follower] # pylint:disable=unsubscriptable-object
+            # As for prefetch(), don't disturb the LRU or the stats.
+            if (follower, follower_tid) not in cache:
+                expected_tids[follower] = follower_tid
+
+        # Only the object we were asked for must verify.
+        speculative = set(expected_tids)
+        speculative.discard(oid_int)
+        loaded = self._load_currents_and_cache(cursor, expected_tids, speculative)
+        result = loaded.pop(oid_int, (None, None))
+        if loaded:
+            predictor.note_prefetched(loaded)
+        return result
+
     def prefetch(self, cursor, oid_ints):
         # Just like load(), but we only fetch the OIDs
         # we can't find in the cache.
@@ -485,12 +647,17 @@ class StorageCache(DetachableMVCCDatabaseViewer):
         # for it. That would trigger stats updates (hits/misses)
         # and move it to the front of the LRU list. But this is just
         # in advance, we don't know if it will actually be used.
-        # `in` has a race condition (it could be evicted soon), but
+        # Checking has a race condition (it could be evicted soon), but
         # if it is, there was probably something else more important
-        # going on.
-        to_fetch = {oid_int
-                    for oid_int in oid_ints
-                    if (oid_int, index[oid_int]) not in cache} # pylint:disable=unsubscriptable-object
+        # going on. If there are global caches, everything the local
+        # cache lacks is asked for in one request, and what they have
+        # is copied to the local cache.
+        to_fetch = {
+            oid_int
+            for oid_int, _ in cache.prefetch_multiple(
+                [(oid_int, index[oid_int]) for oid_int in oid_ints] # pylint:disable=unsubscriptable-object
+            )
+        }
 
         if not to_fetch:
             return
@@ -571,8 +738,11 @@ class StorageCache(DetachableMVCCDatabaseViewer):
         """
         tid_int = bytes8_to_int64(tid)
         self.cache.set_all_for_tid(tid_int, temp_storage)
+        self.polling_state.saw_commit(tid_int)
 
     def poll(self, conn, cursor, ignore_tid):
+        # A new transaction starts a new sequence of loads.
+        self.last_loaded_oid = None
         try:
             changes = self.polling_state.poll(self, conn, cursor)
         except self.MVCCInternalConsistencyError: # pragma: no cover
@@ -585,6 +755,11 @@ class StorageCache(DetachableMVCCDatabaseViewer):
             self._reset("Unknown internal violation")
 
         if changes is not None:
+            changed_in = getattr(changes, 'changed_in', None)
+            if changed_in is not None and (ignore_tid is None or not changed_in(ignore_tid)):
+                # Nothing to filter out, so we can use the OIDs
+                # (and their bytes) that other viewers share.
+                return changes.oids()
             return OIDSet(oid for oid, tid in changes if tid != ignore_tid)
 
 
@@ -427,6 +427,161 @@ def local_benchmark(runner):
             _combine_benchmark_results(runner.args, name, group, options)
 
 
+def contention_benchmark(runner):
+    # pylint:disable=too-many-locals
+    import threading
+    from relstorage.cache.local_client import LocalClient
+
+    THREAD_COUNT = 32
+    KEY_COUNT = 20000
+    OPS_PER_THREAD = 20000
+    random_data = _read_random(512)
+    keys = list(range(KEY_COUNT))
+
+    def makeOne(shard_count):
+        options = MockOptions()
+        options.cache_local_mb = 100
+        options.cache_local_shards = shard_count
+        client = LocalClient(options, 'pfx')
+        client._bulk_update([
+            (oid, (random_data, oid, False, 1))
+            for oid in keys
+        ])
+        return client
+
+    def worker(client, seed, start):
+        rnd = random.Random(seed)
+        choice = rnd.choice
+        get = client.get
+        start.wait()
+        for i in range(OPS_PER_THREAD):
+            oid = choice(keys)
+            if i % 10:
+                get((oid, oid))
+            else:
+                # Store a new revision; every new one is bigger than
+                # the last so they're never equal.
+                tid = oid + KEY_COUNT * (seed * OPS_PER_THREAD + i + 1)
+                client[(oid, tid)] = (random_data, tid)
+
+    def contend(loops, shard_count):
+        duration = 0
+        for _ in range(loops):
+            client = makeOne(shard_count)
+            start = threading.Event()
+            threads = [
+                threading.Thread(target=worker, args=(client, seed, start))
+                for seed in range(THREAD_COUNT)
+            ]
+            for t in threads:
+                t.start()
+            begin = perf_counter()
+            start.set()
+            for t in threads:
+                t.join()
+            duration += perf_counter() - begin
+        return duration
+
+    run_and_report_funcs(
+        runner,
+        [
+            ('contention %d shards' % (shard_count,), contend, shard_count)
+            for shard_count in (1, 4, 16)
+        ]
+    )
+
+
+def index_benchmark(runner):
+    # pylint:disable=too-many-locals
+    from relstorage.cache import mvcc
+
+    OID_COUNT = 500000
+    POLL_COUNT = 10
+    CHANGES_PER_POLL = 5000
+    rnd = random.Random(42)
+    oids = list(range(1, OID_COUNT + 1))
+    rnd.shuffle(oids)
+    # One big poll, as from a persistent cache or a bulk import,
+    # followed by some small ones.
+    first_tid = 1000
+    first_poll = [(oid, first_tid - oid % 100) for oid in oids]
+    polls = [
+        [(rnd.choice(oids), tid) for _ in range(CHANGES_PER_POLL)]
+        for tid in range(first_tid + 1, first_tid + 1 + POLL_COUNT)
+    ]
+    lookups = rnd.sample(oids, 100000)
+    index_types = (
+        ('btree', mvcc._ObjectIndex),
+        ('array', mvcc._ArrayObjectIndex),
+    )
+
+    def build(index_type):
+        index = index_type(1)
+        index = index.with_polled_changes(
+            first_tid, 1,
+            index_type.map_type.from_polled_changes(first_tid, 1, first_poll))
+        for tid, changes in enumerate(polls, first_tid + 1):
+            index = index.with_polled_changes(tid, tid - 1, changes)
+        return index
+
+    def make(loops, index_type):
+        duration = 0
+        for _ in range(loops):
+            begin = perf_counter()
+            build(index_type)
+            duration += perf_counter() - begin
+        return duration
+
+    def lookup(loops, index_type):
+        index = build(index_type)
+        begin = perf_counter()
+        for _ in range(loops):
+            for oid in lookups:
+                index[oid] # pylint:disable=pointless-statement
+        return perf_counter() - begin
+
+    def vacuum(loops, index_type):
+        index = build(index_type)
+        # The last map is the empty one we started with; the one
+        # before it holds the first poll and is the one to vacuum.
+        oldest = index.maps[-2]
+        newer = index_type.__new__(index_type)
+        newer.maps = index.maps[:-2]
+        begin = perf_counter()
+        for _ in range(loops):
+            newer.keys_in(oldest)
+        return perf_counter() - begin
+
+    def changes(loops, index_type):
+        index = build(index_type)
+        begin = perf_counter()
+        for _ in range(loops):
+            index.changes_since(first_tid)
+        return perf_counter() - begin
+
+    if not runner.args.worker:
+        for name, index_type in index_types:
+            mem_before = get_memory_usage()
+            index = build(index_type)
+            print("Index %s holding %d OIDs used %s" % (
+                name, index.total_size, byte_display(get_memory_usage() - mem_before)))
+            del index
+
+    run_and_report_funcs(
+        runner,
+        [
+            ('index %s %s' % (op_name, name), op, index_type)
+            for name, index_type in index_types
+            for op_name, op in (
+                ('build', make),
+                ('lookup', lookup),
+                ('vacuum', vacuum),
+                ('changes', changes),
+            )
+        ]
+    )
+
+
 StorageRecord = namedtuple('Record', ['asu', 'lba', 'size', 'opcode', 'ts'])
 
 class StorageTraceSimulator(object):
@@ -825,7 +980,7 @@ def main():
     runner.argparser.add_argument(
         '--type',
         default='io',
-        choices=['local', 'io', 'simlocal', 'simstorage']
+        choices=['local', 'io', 'simlocal', 'simstorage', 'contention', 'index']
     )
     runner.argparser.add_argument(
         '--temp'
@@ -854,6 +1009,10 @@ def main():
         local_benchmark(runner)
     elif kind == 'io':
         save_load_benchmark(runner)
+    elif kind == 'contention':
+        contention_benchmark(runner)
+    elif kind == 'index':
+        index_benchmark(runner)
     elif kind == 'simlocal':
         StorageTraceSimulator().simulate('local')
     else:
@@ -56,6 +56,34 @@ class TestMultiStateCache(TestCase):
         self.assertIsNone(child.l)
         self.assertIsNone(child.g)
 
+    def test_prefetch_multiple(self):
+        from relstorage.tests import fakecache
+        from relstorage.cache.memcache_client import MemcacheStateCache
+        from . import LocalClient
+        fakecache.data.clear()
+        self.addCleanup(fakecache.data.clear)
+
+        class Client(fakecache.Client):
+            requests = 0
+            def get_multi(self, keys):
+                Client.requests += 1
+                return fakecache.Client.get_multi(self, keys)
+
+        local = LocalClient(100)
+        glob = MemcacheStateCache(lambda: Client(()), 'p')
+        c = self._makeOne(local, glob)
+        local[(1, 1)] = (b'local', 1)
+        glob[(2, 1)] = (b'global', 1)
+        glob[(3, 1)] = (b'global', 1)
+
+        missing = c.prefetch_multiple([(1, 1), (2, 1), (3, 1), (4, 1)])
+        self.assertEqual(missing, [(4, 1)])
+        # One request for everything the local cache lacked.
+        self.assertEqual(Client.requests, 1)
+        self.assertEqual(local[(3, 1)], (b'global', 1))
+        self.assertEqual(local.stats()['hits'], 1)
+        self.assertEqual(local.stats()['misses'], 0)
+
 class MockTracer(object):
     def __init__(self):
         self.trace_events = []
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+from relstorage.tests import TestCase
+from relstorage.tests import MockAdapter
+
+
+class MockCoordinator(object):
+
+    def __init__(self, poll=lambda viewer: iter([(1, 2)])):
+        self._poll = poll
+        self.registered = set()
+
+    def register(self, viewer):
+        self.registered.add(viewer)
+
+    def unregister(self, viewer):
+        self.registered.discard(viewer)
+
+    def poll(self, viewer, conn, _cursor):
+        assert conn is not None
+        return self._poll(viewer)
+
+
+class TestBackgroundPoller(TestCase):
+
+    def _makeOne(self, coordinator, interval=60):
+        from relstorage.cache.background_poller import BackgroundPoller
+        return BackgroundPoller(coordinator, MockAdapter(), None, interval)
+
+    def test_run_once(self):
+        poller = self._makeOne(MockCoordinator())
+        self.assertIsNone(poller.lag)
+        self.assertFalse(poller.is_current())
+        poller.run_once()
+        poller.run_once()
+        stats = poller.stats()
+        self.assertEqual(stats['background_poll_count'], 2)
+        self.assertEqual(stats['background_poll_errors'], 0)
+        self.assertIsNotNone(stats['background_poll_last_duration'])
+        self.assertIsNotNone(stats['background_poll_average_duration'])
+        self.assertGreaterEqual(stats['background_poll_lag'], 0)
+        self.assertTrue(poller.is_current())
+
+    def test_run_once_error(self):
+        def poll(_viewer):
+            raise ValueError
+        poller = self._makeOne(MockCoordinator(poll))
+        poller.run_once()
+        self.assertEqual(poller.poll_count, 0)
+        self.assertEqual(poller.error_count, 1)
+        # The connection was discarded, to be opened again next time.
+        self.assertIsNone(poller._conn)
+        self.assertFalse(poller.is_current())
+
+    def test_thread(self):
+        ran = threading.Event()
+        def poll(_viewer):
+            ran.set()
+        coordinator = MockCoordinator(poll)
+        poller = self._makeOne(coordinator, interval=0.01).start()
+        self.assertIn(poller, coordinator.registered)
+        self.assertTrue(ran.wait(5))
+        poller.stop(5)
+        self.assertFalse(poller._thread.is_alive())
+        self.assertNotIn(poller, coordinator.registered)
+        self.assertIsNone(poller._conn)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+
+from relstorage.tests import TestCase
+
+
+class TestBackgroundCheckpointer(TestCase):
+
+    def _makeOne(self, checkpoint, interval=60):
+        from relstorage.cache.checkpointer import BackgroundCheckpointer
+        return BackgroundCheckpointer(interval, checkpoint)
+
+    def test_run_once(self):
+        counts = [3, None]
+        c = self._makeOne(counts.pop)
+        c.run_once()
+        c.run_once()
+        stats = c.stats()
+        self.assertEqual(stats['checkpoint_count'], 2)
+        self.assertEqual(stats['checkpoint_objects_written'], 3)
+        self.assertIsNotNone(stats['checkpoint_last_duration'])
+
+    def test_run_once_error(self):
+        def checkpoint():
+            raise ValueError
+        c = self._makeOne(checkpoint)
+        c.run_once()
+        self.assertEqual(c.stats()['checkpoint_count'], 0)
+
+    def test_thread(self):
+        ran = threading.Event()
+        def checkpoint():
+            ran.set()
+            return 1
+        c = self._makeOne(checkpoint, interval=0.01).start()
+        self.assertTrue(ran.wait(5))
+        c.stop(5)
+        self.assertFalse(c._thread.is_alive())
+        self.assertGreaterEqual(c.checkpoint_count, 1)
+        # Stopping again is fine.
+        c.stop()
@@ -269,6 +269,221 @@ class LocalClientOIDTests(AbstractStateCacheTests):
         self.assertEqual(c[self.key], None)
         self.assertEqual(c[self.missing_key], None)
 
+    def test_zero_copy(self):
+        c = self._makeOne(cache_local_zero_copy=True)
+        c[self.key] = self.value
+        c[self.missing_key] = (None, 1)
+        state, tid = c[self.key]
+        self.assertIsInstance(state, memoryview)
+        self.assertTrue(state.readonly)
+        self.assertEqual(state, self.value[0])
+        self.assertEqual(tid, self.tid)
+        self.assertEqual(c[self.missing_key], (b'', 1))
+        self.assertEqual(c.get_multiple([self.key]), {self.oid: self.value})
+        self.assertIsInstance(c.get_multiple([self.key])[self.oid][0], memoryview)
+
+        # The view remains valid after the entry is gone.
+        c.flush_all()
+        self.assertIsNone(c[self.key])
+        self.assertEqual(state.tobytes(), self.value[0])
+        state.release()
+
+    def test_zero_copy_compressed(self):
+        c = self._makeOne(cache_local_zero_copy=True, cache_local_compression='zlib')
+        data = b'abcdefgh' * 100
+        c[self.key] = (data, self.tid)
+        self.assertEqual(c._cache.peek_item_with_tid(self.oid, self.tid).state[:2], b'.z')
+        state, tid = c[self.key]
+        self.assertEqual(state, data)
+        self.assertIsInstance(state, bytes)
+        self.assertEqual(tid, self.tid)
+
+    def _check_codec(self, name, marker):
+        from relstorage.cache import _compression
+        if name not in _compression.CODECS:
+            self.skipTest("%s not installed" % (name,))
+        c = self._makeOne(cache_local_compression=name)
+        data = b'abcdefgh' * 100
+        c[self.key] = (data, self.tid)
+        self.assertEqual(c._cache.peek_item_with_tid(self.oid, self.tid).state[:2], marker)
+        self.assertEqual(c[self.key], (data, self.tid))
+
+    def test_set_and_get_zstd(self):
+        self._check_codec('zstd', b'.s')
+
+    def test_set_and_get_lz4(self):
+        self._check_codec('lz4', b'.4')
+
+    def test_missing_codec(self):
+        from relstorage.cache import _compression
+        from relstorage.tests import mock
+        with mock.patch.object(_compression, 'MISSING_CODECS', frozenset(('zstd',))):
+            with self.assertRaisesRegex(ValueError, 'not installed'):
+                self._makeOne(cache_local_compression='zstd')
+
+    def test_eviction_policy(self):
+        c = self._makeOne()
+        self.assertEqual(c._cache.eviction_policy, 'segmented-lru')
+        with self.assertRaisesRegex(ValueError, 'Unknown eviction policy'):
+            self._makeOne(cache_local_eviction_policy='fifo')
+
+        # Room for about 90 objects.
+        c = self._makeOne(cache_local_eviction_policy='tinylfu', cache_local_mb=0.1)
+        self.assertEqual(c._cache.eviction_policy, 'tinylfu')
+        state = b'x' * 1000
+        hot = range(1, 61)
+        for _ in range(5):
+            for oid in hot:
+                if c[(oid, 1)] is None:
+                    c[(oid, 1)] = (state, 1)
+        # A scan of objects used only once doesn't push out the
+        # popular objects.
+        for oid in range(1000, 2000):
+            if c[(oid, 1)] is None:
+                c[(oid, 1)] = (state, 1)
+        self.assertEqual(
+            [oid for oid in hot if c.get((oid, 1), peek=True) is None],
+            []
+        )
+        self.assertLess(len(c), 100)
+
+    def test_compression_dictionary(self):
+        import tempfile
+        import shutil
+        from relstorage.cache import _compression
+        if _compression.zstandard is None:
+            self.skipTest("zstd not installed")
+        temp_dir = tempfile.mkdtemp(".rstest_cache")
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+
+        def make(**kwargs):
+            c = self._makeOne(cache_local_dir=temp_dir,
+                              cache_local_compression='zstd',
+                              cache_local_compression_dictionary_size=1024,
+                              **kwargs)
+            c.restore()
+            return c
+
+        def state(oid):
+            return (b'cpersistent.mapping\nPersistentMapping\nq\x01.}q\x02(U\x04data%d' % oid) * 3
+
+        c = make(cache_local_checkpoint_interval=1)
+        c.set_all_for_tid(5, [(state(oid), oid, None) for oid in range(1, 1001)])
+        self.assertIsNone(c._dictionaries.active)
+        # Checkpointing in the background doesn't train one; other
+        # threads may be using the cache.
+        self.assertEqual(c.checkpoint(), 1000)
+        self.assertIsNone(c._dictionaries.active)
+        c.save()
+        # Saving trained a dictionary and started using it.
+        self.assertIsNotNone(c._dictionaries.active)
+        c[(2000, 6)] = (state(2000), 6)
+        self.assertEqual(c._cache.peek_item_with_tid(2000, 6).state[:2], b'.Z')
+        self.assertEqual(c[(2000, 6)], (state(2000), 6))
+        c.save()
+
+        # A new cache loads the dictionary and can read everything.
+        c2 = make()
+        self.assertEqual(len(c2._dictionaries), 1)
+        self.assertIsNotNone(c2._dictionaries.active)
+        self.assertEqual(c2[(2000, None)], (state(2000), 6))
+        self.assertEqual(c2[(7, None)], (state(7), 5))
+
+        # A cache that doesn't know the dictionary ignores those states.
+        c3 = self._makeOne()
+        c3._dictionaries = _compression.ZstdDictionaries()
+        self.assertTrue(c3._unreadable_state(
+            c._cache.peek_item_with_tid(2000, 6).state))
+        self.assertFalse(c3._unreadable_state(state(1)))
+
+    def test_checkpoint(self):
+        import tempfile
+        import shutil
+        temp_dir = tempfile.mkdtemp(".rstest_cache")
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+
+        c = self._makeOne(cache_local_dir=temp_dir)
+        # Nothing to do if we're not checkpointing.
+        c[(1, 5)] = (b'abc', 5)
+        self.assertEqual(c.checkpoint((5, 5)), 0)
+        self.assertIsNone(c._dirty_oids)
+
+        c = self._makeOne(cache_local_dir=temp_dir, cache_local_checkpoint_interval=1)
+        self.assertEqual(c.checkpoint((5, 5)), 0)
+        c.set_all_for_tid(5, [(b'abc', 1, None), (b'def', 2, None)])
+        self.assertEqual(set(c._dirty_oids), {1, 2})
+        self.assertEqual(c.checkpoint((5, 5)), 2)
+        self.assertEqual(len(c._dirty_oids), 0)
+        self.assertEqual(c.checkpoint((5, 5)), 0)
+
+        # Evicted objects are skipped.
+        c[(3, 6)] = (b'ghi', 6)
+        c[(4, 6)] = (b'jkl', 6)
+        del c[(4, 6)]
+        self.assertEqual(c.checkpoint((6, 6)), 1)
+
+        c2 = self._makeOne(cache_local_dir=temp_dir)
+        self.assertEqual(c2.restore(), (6, 6))
+        self.assertEqual(c2[(1, None)], (b'abc', 5))
+        self.assertEqual(c2[(3, None)], (b'ghi', 6))
+        self.assertEqual(len(c2), 3)
+        # Only what was restored, not what's stored afterwards.
+        c2[(9, 7)] = (b'xyz', 7)
+        self.assertEqual(dict(c2.restored_oid_tids()), {1: 5, 2: 5, 3: 6})
+
+        # If writing fails, the objects are written next time.
+        c[(5, 7)] = (b'mno', 7)
+        from relstorage.tests import mock
+        with mock.patch.object(c, 'write_to_sqlite', side_effect=TypeError):
+            with self.assertRaises(TypeError):
+                c.checkpoint((7, 7))
+        self.assertEqual(set(c._dirty_oids), {5})
+        self.assertEqual(c.save(checkpoints=(7, 7)), 1)
+        self.assertEqual(len(c._dirty_oids), 0)
+
+    def test_lazy_restore(self):
+        import tempfile
+        import shutil
+        temp_dir = tempfile.mkdtemp(".rstest_cache")
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+
+        c = self._makeOne(cache_local_dir=temp_dir)
+        c.set_all_for_tid(5, [(b'abc', oid, None) for oid in range(1, 5)])
+        c.save(checkpoints=(5, 5))
+
+        c = self._makeOne(cache_local_dir=temp_dir, cache_local_lazy_restore=True)
+        self.assertEqual(c.restore(), (5, 5))
+        self.addCleanup(c.close)
+        self.assertEqual(len(c), 0)
+        self.assertEqual(c.stats()['lazy_rows'], 4)
+        self.assertEqual(set(c.restored_oids()), {1, 2, 3, 4})
+        self.assertEqual(dict(c.restored_oid_tids()), {1: 5, 2: 5, 3: 5, 4: 5})
+        # That was a snapshot, taken while restoring; we don't keep it.
+        self.assertEqual(dict(c.restored_oid_tids()), {})
+        self.assertTrue(c.restored_state_is_current(1, 5))
+        self.assertTrue(c.restored_state_is_current(1, None))
+        self.assertFalse(c.restored_state_is_current(1, 6))
+        self.assertFalse(c.restored_state_is_current(9, 5))
+
+        # Nothing comes out until we're validated
+        self.assertIsNone(c[(1, 5)])
+        c.invalidate_all([4])
+        c.lazy_restore_validated()
+
+        self.assertEqual(c[(1, None)], (b'abc', 5))
+        self.assertEqual(len(c), 1)
+        # Now it's in memory, and frozen.
+        self.assertEqual(c[(1, None)], (b'abc', 5))
+        self.assertIsNone(c[(2, 4)])
+        self.assertIsNone(c[(4, 5)])
+        self.assertEqual(c.get_multiple([(1, 5), (2, 5), (3, 5), (4, 5)]),
+                         {1: (b'abc', 5), 2: (b'abc', 5), 3: (b'abc', 5)})
+        self.assertEqual(c.stats()['lazy_loads'], 3)
+        self.assertEqual(c.stats()['lazy_rows'], 0)
+
+        c.flush_all()
+        self.assertIsNone(c._lazy_rows)
+
     def test_load_and_save(self):
         # pylint:disable=too-many-statements,too-many-locals
         import tempfile
@@ -358,3 +573,77 @@ class LocalClientOIDTests(AbstractStateCacheTests):
 
         # At no point did we spawn extra threads
         self.assertEqual(1, threading.active_count())
+
+
+class ShardedLocalClientOIDTests(LocalClientOIDTests):
+
+    class Options(MockOptions):
+        cache_local_shards = 4
+
+    def test_sharded(self):
+        from relstorage.cache._sharded_cache import ShardedPyCache
+        c = self._makeOne()
+        self.assertIsInstance(c._cache, ShardedPyCache)
+        self.assertEqual(len(c._cache.shards), 4)
+        self.assertEqual(c.limit, 1000000)
+        # The generation limits are divided among the shards.
+        self.assertLessEqual(c._cache.limit, c.limit)
+
+        c.set_all_for_tid(5, [(b'abc', oid, None) for oid in range(8)])
+        self.assertEqual(len(c), 8)
+        self.assertEqual([len(s) for s in c._cache.shards], [2, 2, 2, 2])
+        self.assertEqual(sorted(c.keys()), list(range(8)))
+        self.assertEqual(c.get_multiple([(1, 5), (2, 5), (9, 5)]),
+                         {1: (b'abc', 5), 2: (b'abc', 5)})
+        self.assertEqual(c.stats()['hits'], 2)
+        self.assertEqual(c.stats()['misses'], 1)
+
+        # Freezing fans out
+        c.freeze({1: 5, 2: 5})
+        self.assertEqual(c[(1, None)], (b'abc', 5))
+        self.assertEqual(c[(2, None)], (b'abc', 5))
+
+        # As does invalidation
+        c.invalidate_all([1, 3])
+        self.assertIsNone(c[(1, None)])
+        self.assertIsNone(c[(3, 5)])
+        c.delitems({2: 5, 4: 5})
+        self.assertIsNone(c[(2, None)])
+        self.assertIsNone(c[(4, 5)])
+        self.assertEqual(len(c), 4)
+
+        # And aging.
+        c._cache.age_frequencies()
+
+    def test_set_all_for_tid_locks_each_shard_once_per_batch(self):
+        c = self._makeOne()
+        cache = c._cache
+        acquired = []
+
+        class CountingLock(object):
+            def __init__(self, index):
+                self.index = index
+
+            def __enter__(self):
+                acquired.append(self.index)
+
+            def __exit__(self, *_args):
+                pass
+
+        cache.locks = [CountingLock(i) for i in range(4)]
+        cache.set_batch_size = 10
+        c.set_all_for_tid(5, ((b'abc', oid, None) for oid in range(20)))
+        self.assertEqual(len(c), 20)
+        self.assertEqual(acquired, [0, 1, 2, 3, 0, 1, 2, 3])
+
+    def test_bulk_update(self):
+        c = self._makeOne()
+        count = c._bulk_update([
+            (oid, (b'abc', 5, False, 1))
+            for oid in range(10)
+        ])
+        self.assertEqual(count, (10, 10))
+        self.assertEqual(len(c), 10)
+        self.assertEqual(c[(7, 5)], (b'abc', 5))
+        with self.assertRaises(ValueError):
+            c._bulk_update([(1, (b'abc', 5, False, 1))])
@@ -69,6 +69,19 @@ class AbstractStateCacheTests(TestCase):
         self.assertEqual(c[0, 2],
                          (b'def', 2))
 
+    def test_get_multiple(self):
+        c = self._makeOne()
+        c.set_all_for_tid(
+            1,
+            [(b'abc', 0, -1),
+             (b'ghi', 1, -1),])
+
+        self.assertEqual(
+            c.get_multiple([(0, 1), (1, 1), (2, 1)]),
+            {0: (b'abc', 1), 1: (b'ghi', 1)}
+        )
+        self.assertEqual(c.get_multiple(()), {})
+
     def test_updating_delta_map(self):
         self.assertIs(self._makeOne().updating_delta_map(self), self)
 
@@ -90,3 +103,41 @@ class MemcacheClientTests(AbstractStateCacheTests):
         inst = self._makeOne()
         new = inst.new_instance()
         self.assertIsNot(inst, new)
+
+    def test_new_instance_shares_clients(self):
+        from relstorage.tests import fakecache
+        made = []
+        def constructor():
+            made.append(fakecache.Client(()))
+            return made[-1]
+        from relstorage.cache.memcache_client import MemcacheStateCache
+        root = MemcacheStateCache(constructor, 'p')
+        child = root.new_instance()
+        self.assertIsNot(child.client, root.client)
+        child_client = child.client
+        child.release()
+        self.assertIsNone(child.client)
+        # The released client is reused.
+        self.assertIs(root.new_instance().client, child_client)
+        self.assertEqual(len(made), 2)
+        root.close()
+
+    def test_background_writes(self):
+        import threading
+        from relstorage.tests import fakecache
+        inst = self._makeOne(cache_servers_background_writes=True)
+        child = inst.new_instance()
+        child.set_all_for_tid(1, [(b'abc', 0, -1), (b'ghi', 1, -1)])
+        child.set_all_for_tid(2, [(b'def', 0, -1)])
+        writer = inst._pool.writer
+        self.assertIsNotNone(writer)
+        # Instances share the thread.
+        self.assertIs(child._pool.writer, writer)
+        writer.flush()
+        self.assertEqual(len(fakecache.data), 3)
+        self.assertEqual(inst[0, 2], (b'def', 2))
+
+        child.release()
+        inst.close()
+        self.assertFalse(writer._thread.is_alive())
+        self.assertEqual(threading.active_count(), 1)
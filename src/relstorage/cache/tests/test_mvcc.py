@@ -17,6 +17,7 @@ from __future__ import division
 from __future__ import print_function
 
 from hamcrest import assert_that
+from ZODB.utils import p64
 from nti.testing.matchers import validly_provides
 
 from relstorage.tests import TestCase
@@ -24,6 +25,7 @@ from relstorage.tests import MockAdapter
 from relstorage.options import Options
 from relstorage.cache import interfaces
 from relstorage.cache import mvcc
+from relstorage._compat import OID_SET_TYPE as OidSet
 
 from . import LocalClient
 
@@ -224,6 +226,67 @@ class TestMVCCDatabaseCorrdinator(TestCase):
         self.assertIn((0, 1), self.viewer.local_client)
 
 
+    def test_vacuum_budget(self):
+        self.coord.vacuum_budget = 3
+        self.test_poll_no_index_begins(2)
+        for oid in range(5):
+            self.viewer.local_client[(oid, 1)] = (b'cached data', 1)
+            self.viewer.object_index[oid] = 1
+
+        # All but the first change.
+        self.polled_tid = 3
+        self.polled_changes = self.expected_poll_result = [(oid, 3) for oid in range(1, 5)]
+        self.do_poll()
+        # We didn't get through them all, so the old map stays.
+        self.assertLength(self.viewer.object_index.maps, 2)
+        stats = self.coord.stats()
+        self.assertEqual(stats['vacuum_pending_oids'], 1)
+        self.assertEqual(stats['vacuum_deferred'], 1)
+        self.assertEqual(stats['vacuumed_maps'], 0)
+        self.assertNotIn((0, None), self.viewer.local_client)
+
+        # The next poll finishes.
+        self.polled_tid = 4
+        self.polled_changes = self.expected_poll_result = [(9, 4)]
+        self.do_poll()
+        self.assertLength(self.viewer.object_index.maps, 1)
+        stats = self.coord.stats()
+        self.assertEqual(stats['vacuum_pending_oids'], 0)
+        self.assertEqual(stats['vacuumed_oids'], 4)
+        self.assertEqual(stats['vacuumed_maps'], 2)
+        self.assertEqual(len(self.viewer.local_client), 1)
+        self.assertIn((0, None), self.viewer.local_client)
+
+    def test_viewers_share_change_set(self):
+        second_viewer = self.add_viewer()
+        self.test_poll_no_index_begins()
+        self.polled_changes = ()
+        self.do_poll(viewer=second_viewer)
+
+        # Both move from 1 to 2.
+        self.polled_tid = 2
+        self.polled_changes = [(5, 2), (6, 2)]
+        self.expected_poll_last_tid = 1
+        first = self.coord.poll(self.viewer, None, None)
+        # Polls from the index's TID, and finds nothing new.
+        self.expected_poll_last_tid = 2
+        self.polled_changes = ()
+        second = self.coord.poll(second_viewer, None, None)
+        self.assertIs(first, second)
+        self.assertEqual(sorted(first), [(5, 2), (6, 2)])
+        self.assertIs(first.oids(), second.oids())
+        self.assertEqual(first.oids().invalidations(),
+                         {p64(5): 1, p64(6): 1})
+        self.assertTrue(first.changed_in(2))
+        self.assertFalse(first.changed_in(1))
+        self.assertEqual(self.coord.stats()['change_set_hits'], 1)
+
+        # Once the index moves on, nobody can ask for it again.
+        self.polled_tid = 3
+        self.polled_changes = [(7, 3)]
+        self.coord.poll(self.viewer, None, None)
+        self.assertEqual(list(self.coord._change_sets), [(2, 3)])
+
     def test_poll_many_times_vacuums_two_viewer(self):
         # A viewer that keeps moving forward, and a viewer that
         # is stuck in the past.
@@ -399,6 +462,187 @@ class TestMVCCDatabaseCorrdinator(TestCase):
         self.assertEqual(self.coord.minimum_highest_visible_tid, 5)
         self.assertEqual(self.coord.object_index.depth, 3)
 
+    def test_poll_skipped_with_commit_listener(self):
+        class MockListener(object):
+            generation = 0
+            stopped = False
+            def start(self):
+                return self
+            def mark(self):
+                return self.generation
+            def no_changes_since(self, token):
+                return token == self.generation
+            def saw_commit(self, _tid):
+                self.generation += 1
+            def stop(self):
+                self.stopped = True
+
+        listener = MockListener()
+        self.viewer.adapter.poller.new_commit_listener = lambda: listener
+        self.test_poll_no_index_begins(2)
+        self.assertIs(self.coord.commit_listener, listener)
+
+        # We can't skip until we've made a poll the listener watched.
+        self.polled_tid = 3
+        self.polled_changes = self.expected_poll_result = [(1, 3)]
+        self.do_poll()
+
+        second_viewer = self.add_viewer()
+        second_viewer.highest_visible_tid = 2
+        polls = []
+        self.viewer.adapter.poller.poll_invalidations = lambda *args: polls.append(args)
+        # Nothing happened, so nobody queries, but a viewer that's
+        # behind still gets the changes it missed.
+        self.assertEqual(list(self.coord.poll(self.viewer, None, None)), [])
+        self.assertEqual(list(self.coord.poll(second_viewer, None, None)), [(1, 3)])
+        self.assertEqual(polls, [])
+        self.assertIs(second_viewer.object_index, self.coord.object_index)
+        self.assertEqual(second_viewer.highest_visible_tid, 3)
+
+        # Once something commits, we have to ask again.
+        self.coord.saw_commit(4)
+        self.viewer.adapter.poller.poll_invalidations = self.poll_invalidations
+        self.polled_tid = 4
+        self.polled_changes = self.expected_poll_result = [(2, 4)]
+        self.do_poll()
+        self.assertEqual(self.coord.object_index.highest_visible_tid, 4)
+
+        self.coord.unregister(second_viewer)
+        self.coord.close()
+        self.assertTrue(listener.stopped)
+        self.assertIsNone(self.coord.commit_listener)
+
+    def test_concurrent_polls_share_one_query(self):
+        import threading
+        self.test_poll_no_index_begins(2)
+        second_viewer = self.add_viewer()
+        self.polled_changes = []
+        self.coord.poll(second_viewer, None, None)
+        self.assertEqual(second_viewer.highest_visible_tid, 2)
+
+        started = threading.Event()
+        release = threading.Event()
+        joined = threading.Event()
+        polls = []
+        def poll_invalidations(_conn, _cursor, since):
+            polls.append(since)
+            started.set()
+            release.wait(5)
+            return [(1, 3)], 3
+        self.viewer.adapter.poller.poll_invalidations = poll_invalidations
+
+        class Watching(dict):
+            def get(self, k, default=None):
+                result = dict.get(self, k, default)
+                if result is not None:
+                    joined.set()
+                return result
+        self.coord._polls_in_flight = Watching()
+
+        results = {}
+        def poll(viewer):
+            results[viewer] = list(self.coord.poll(viewer, None, None))
+        leader = threading.Thread(target=poll, args=(self.viewer,))
+        leader.start()
+        self.assertTrue(started.wait(5))
+        follower = threading.Thread(target=poll, args=(second_viewer,))
+        follower.start()
+        self.assertTrue(joined.wait(5))
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(polls, [2])
+        self.assertEqual(results[self.viewer], [(1, 3)])
+        self.assertEqual(results[second_viewer], [(1, 3)])
+        self.assertIs(second_viewer.object_index, self.viewer.object_index)
+        self.assertEqual(second_viewer.highest_visible_tid, 3)
+        self.assertEqual(self.coord.stats()['shared_polls'], 1)
+        self.assertEqual(dict(self.coord._polls_in_flight), {})
+        self.coord.unregister(second_viewer)
+
+    def test_concurrent_poll_not_shared_after_local_commit(self):
+        import threading
+        self.test_poll_no_index_begins(2)
+        second_viewer = self.add_viewer()
+        self.polled_changes = []
+        self.coord.poll(second_viewer, None, None)
+
+        started = threading.Event()
+        release = threading.Event()
+        joined = threading.Event()
+        polls = []
+        def poll_invalidations(_conn, _cursor, since):
+            polls.append(since)
+            if len(polls) == 1:
+                started.set()
+                release.wait(5)
+                return [(1, 3)], 3
+            return [(1, 3), (2, 4)], 4
+        self.viewer.adapter.poller.poll_invalidations = poll_invalidations
+
+        class Watching(dict):
+            def get(self, k, default=None):
+                result = dict.get(self, k, default)
+                if result is not None:
+                    joined.set()
+                return result
+        self.coord._polls_in_flight = Watching()
+
+        results = {}
+        def poll(viewer):
+            results[viewer] = sorted(self.coord.poll(viewer, None, None))
+        leader = threading.Thread(target=poll, args=(self.viewer,))
+        leader.start()
+        self.assertTrue(started.wait(5))
+        follower = threading.Thread(target=poll, args=(second_viewer,))
+        follower.start()
+        self.assertTrue(joined.wait(5))
+        # We commit something while the leader's query is running;
+        # its results can't include it.
+        self.coord.saw_commit(4)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(polls, [2, 2])
+        self.assertEqual(results[self.viewer], [(1, 3)])
+        self.assertEqual(results[second_viewer], [(1, 3), (2, 4)])
+        self.assertEqual(second_viewer.highest_visible_tid, 4)
+        self.assertEqual(self.coord.stats()['shared_polls'], 0)
+        self.coord.unregister(second_viewer)
+
+    def test_poll_served_by_background_poller(self):
+        self.coord.background_poll_interval = 60
+        self.test_poll_no_index_begins(2)
+        background_poller = self.coord.background_poller
+        self.assertIsNotNone(background_poller)
+        self.assertTrue(self.coord.is_registered(background_poller))
+
+        polls = []
+        def poll_invalidations(_conn, _cursor, since):
+            polls.append(since)
+            return [(since - 1, since + 1)], since + 1
+        self.viewer.adapter.poller.poll_invalidations = poll_invalidations
+        background_poller.run_once()
+        self.assertEqual(polls, [2])
+        self.assertEqual(self.coord.object_index.highest_visible_tid, 3)
+
+        # The viewer takes what the background found.
+        self.assertEqual(list(self.coord.poll(self.viewer, None, None)), [(1, 3)])
+        self.assertEqual(polls, [2])
+        self.assertEqual(self.viewer.highest_visible_tid, 3)
+        self.assertEqual(self.coord.stats()['background_served_polls'], 1)
+
+        # But not if we've committed something it hasn't seen.
+        self.coord.saw_commit(4)
+        self.assertEqual(list(self.coord.poll(self.viewer, None, None)), [(2, 4)])
+        self.assertEqual(polls, [2, 3])
+
+        self.coord.close()
+        self.assertIsNone(self.coord.background_poller)
+        self.assertFalse(background_poller._thread.is_alive())
+
     def test_restore_timeout(self):
         from relstorage.tests import mock
         from relstorage.tests import MockOptions
@@ -462,6 +706,15 @@ class TestMVCCDatabaseCorrdinator(TestCase):
             def keys(self):
                 return oids
 
+            def restored_oids(self):
+                return OidSet(self.keys())
+
+            def restored_oid_tids(self):
+                return {oid: 1 for oid in self.keys()}
+
+            def restored_state_is_current(self, oid, tid):
+                return self._cache.contains_oid_with_tid(oid, tid)
+
             def remove_invalid_persistent_oids(self, oids):
                 self.invalid_oids = list(oids)
 
@@ -481,13 +734,90 @@ class TestMVCCDatabaseCorrdinator(TestCase):
             3, 4, 5, 6, 7, 8, 9, 10
         ])
 
+    def _restore_with_changes(self, cached_oid_tids, changes):
+        from relstorage.tests import MockPoller
+
+        adapter = MockAdapter()
+        adapter.poller = MockPoller()
+        adapter.poller.poll_changes = changes
+        looked_up = []
+        class Mover(object):
+            @staticmethod
+            def current_object_tids(_cursor, oids, **_kwargs):
+                oids = list(oids)
+                looked_up.extend(oids)
+                # These objects haven't changed.
+                return {oid: cached_oid_tids[oid] for oid in oids}
+        adapter.mover = Mover()
+
+        class MockLocalClient(object):
+            invalid_oids = None
+            def restore(self):
+                return (10, 10)
+
+            def restored_oid_tids(self):
+                return cached_oid_tids
+
+            def restored_state_is_current(self, oid, tid):
+                return cached_oid_tids[oid] == tid
+
+            def remove_invalid_persistent_oids(self, oids):
+                self.invalid_oids = sorted(oids)
+
+        local_client = MockLocalClient()
+        self.coord.restore(adapter, local_client)
+        return sorted(looked_up), local_client.invalid_oids
+
+    def test_restore_polls_newer_states(self):
+        # Ten objects with old states, ten with newer states.
+        cached_oid_tids = {oid: 1 if oid < 10 else oid for oid in range(20)}
+        self.coord.restore_lookup_fraction = 0.4
+        # Object 11 changed again; 12 went away.
+        changes = [(11, 21), (13, 13), (14, 14), (15, 15), (16, 16),
+                   (17, 17), (18, 18), (19, 19), (10, 10), (3, 20)]
+        looked_up, invalid = self._restore_with_changes(cached_oid_tids, changes)
+        self.assertEqual(looked_up, list(range(10)))
+        self.assertEqual(invalid, [11, 12])
+
+    def test_restore_too_many_changes(self):
+        cached_oid_tids = {oid: oid + 1 for oid in range(10)}
+        changes = [(oid, 100) for oid in range(100, 121)]
+        looked_up, invalid = self._restore_with_changes(cached_oid_tids, changes)
+        # We looked up everything, and found nothing changed.
+        self.assertEqual(looked_up, list(range(10)))
+        self.assertEqual(invalid, [])
+
+    def test_restore_cannot_poll(self):
+        cached_oid_tids = {oid: oid + 1 for oid in range(10)}
+        looked_up, invalid = self._restore_with_changes(cached_oid_tids, None)
+        self.assertEqual(looked_up, list(range(10)))
+        self.assertEqual(invalid, [])
+
+
+class TestMVCCDatabaseCoordinatorArrayIndex(TestMVCCDatabaseCorrdinator):
+
+    def _makeOne(self):
+        return mvcc.MVCCDatabaseCoordinator(Options(cache_object_index='array'))
+
+    def test_uses_array_index(self):
+        self.polled_tid = 1
+        self.do_poll()
+        self.assertIsInstance(self.coord.object_index, mvcc._ArrayObjectIndex)
+
+    def test_unknown_index_type(self):
+        with self.assertRaises(ValueError):
+            mvcc.MVCCDatabaseCoordinator(Options(cache_object_index='hash'))
+
+
 class TestTransactionRangeObjectIndex(TestCase):
 
+    map_type = mvcc._TransactionRangeObjectIndex
+
     def _makeOne(self,
                  highest_visible_tid,
                  complete_since_tid,
                  data):
-        return mvcc._TransactionRangeObjectIndex(
+        return self.map_type(
             highest_visible_tid,
             complete_since_tid,
             data)
@@ -496,6 +826,18 @@ class TestTransactionRangeObjectIndex(TestCase):
         with self.assertRaises(AssertionError):
             self._makeOne(highest_visible_tid=1, complete_since_tid=2, data=())
 
+    def test_from_polled_changes(self):
+        rows = ((oid, 5 if oid % 2 else 4) for oid in range(10))
+        c = self.map_type.from_polled_changes(5, 3, rows, chunk_size=3)
+        self.assertEqual(c.highest_visible_tid, 5)
+        self.assertEqual(c.complete_since_tid, 3)
+        self.assertEqual(len(c), 10)
+        self.assertEqual(c[9], 5)
+        self.assertEqual(c[8], 4)
+
+        c = self.map_type.from_polled_changes(5, 5, ())
+        self.assertEqual(len(c), 0)
+
     def test_bad_data(self):
         # Too high
         with self.assertRaises(AssertionError):
@@ -577,13 +919,15 @@ class TestTransactionRangeObjectIndex(TestCase):
 
 class TestObjectIndex(TestCase):
 
+    index_type = mvcc._ObjectIndex
+
     def _makeOne(self, highest_visible_tid=1, data=()):
-        return mvcc._ObjectIndex(highest_visible_tid, data=data)
+        return self.index_type(highest_visible_tid, data=data)
 
     def test_ctor_empty(self):
         ix = self._makeOne()
         self.assertEqual(1, len(ix.maps))
-        self.assertIsInstance(ix.maps[0], mvcc._TransactionRangeObjectIndex)
+        self.assertIsInstance(ix.maps[0], self.index_type.map_type)
         self.assertEqual(1, ix.highest_visible_tid)
         self.assertEqual(1, ix.maximum_highest_visible_tid)
         self.assertEqual(1, ix.minimum_highest_visible_tid)
@@ -737,3 +1081,25 @@ class TestObjectIndex(TestCase):
         self.assertEqual(ix2[2], second_poll_tid - 1)
         self.assertEqual(ix2[3], second_poll_tid)
         self.assertEqual(ix2[1], first_poll_tid)
+
+
+class TestArrayTransactionRangeObjectIndex(TestTransactionRangeObjectIndex):
+
+    map_type = mvcc._ArrayTransactionRangeObjectIndex
+
+
+class TestArrayObjectIndex(TestObjectIndex):
+
+    index_type = mvcc._ArrayObjectIndex
+
+    def test_vacuum_helpers(self):
+        ix = self._makeOne(highest_visible_tid=1, data=[(1, 1), (2, 1)])
+        ix = ix.with_polled_changes(3, 1, [(1, 3), (3, 2)])
+        ix = ix.with_polled_changes(5, 3, [(3, 4), (4, 5)])
+        self.assertEqual(dict(ix.changes_since(1)), {1: 3, 3: 4, 4: 5})
+        self.assertEqual(dict(ix.changes_since(3)), {3: 4, 4: 5})
+        self.assertEqual(ix.keys(), {1, 2, 3, 4})
+        # The oldest map doesn't count itself.
+        self.assertEqual(ix.keys_in(ix.maps[-1]), {1})
+        oldest = ix.maps.pop()
+        self.assertEqual(ix.keys_in(oldest), {1})
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from relstorage.tests import TestCase
+
+from .._oid_tid_array import OidTidArray
+
+
+class TestOidTidArray(TestCase):
+
+    def _makeOne(self, data=()):
+        return OidTidArray(data)
+
+    def test_empty(self):
+        m = self._makeOne()
+        self.assertEqual(len(m), 0)
+        self.assertFalse(m)
+        self.assertIsNone(m.get(1))
+        self.assertNotIn(1, m)
+        with self.assertRaises(KeyError):
+            m[1] # pylint:disable=pointless-statement
+        with self.assertRaises(KeyError):
+            del m[1]
+        with self.assertRaises(ValueError):
+            m.maxKey()
+        with self.assertRaises(ValueError):
+            m.maxValue()
+
+    def test_update_and_lookup(self):
+        m = self._makeOne([(3, 30), (1, 10)])
+        m.update({2: 20, 3: 31})
+        self.assertEqual(len(m), 3)
+        self.assertEqual(list(m.keys()), [1, 2, 3])
+        self.assertEqual(list(m.values()), [10, 20, 31])
+        self.assertEqual(dict(m.items()), {1: 10, 2: 20, 3: 31})
+        self.assertEqual(m[3], 31)
+        self.assertEqual(m.get(4, 'default'), 'default')
+        self.assertEqual(m.maxKey(), 3)
+        self.assertEqual(m.minKey(), 1)
+        self.assertEqual(m.maxValue(), 31)
+        self.assertEqual(m.minValue(), 10)
+
+    def test_set_and_delete_pending(self):
+        m = self._makeOne([(1, 10), (2, 20)])
+        m[3] = 30
+        m[1] = 11
+        del m[2]
+        # Not merged into the arrays yet, but visible.
+        self.assertEqual(len(m._pending), 3)
+        self.assertEqual(len(m), 2)
+        self.assertNotIn(2, m)
+        self.assertEqual(m[1], 11)
+        self.assertEqual(dict(m.items()), {1: 11, 3: 30})
+        self.assertFalse(m._pending)
+        m[2] = 21
+        self.assertEqual(len(m), 3)
+
+    def test_compacts_when_pending_grows(self):
+        class Array(OidTidArray):
+            __slots__ = ()
+            min_pending_size = 2
+        m = Array()
+        for oid in range(10):
+            m[oid] = oid
+        self.assertLessEqual(len(m._pending), len(m._arrays[0]))
+        self.assertEqual(len(m), 10)
+        self.assertEqual(list(m), list(range(10)))
+
+    def test_out_of_range(self):
+        # Checked when merged into the arrays.
+        m = self._makeOne([(1, -1)])
+        with self.assertRaises(TypeError):
+            m.compact()
+
+    def test_clear(self):
+        m = self._makeOne([(1, 1)])
+        m[2] = 2
+        m.clear()
+        self.assertEqual(len(m), 0)
+        self.assertNotIn(2, m)
+
+    def test_set_operations(self):
+        m1 = self._makeOne([(1, 1), (2, 2), (3, 3)])
+        m2 = self._makeOne([(2, 5), (4, 5)])
+        self.assertEqual(m1.difference(m2), {1: 1, 3: 3})
+        self.assertEqual(OidTidArray.union_keys([m1, m2]), {1, 2, 3, 4})
+        # The first map wins.
+        self.assertEqual(OidTidArray.union_items([m2, m1]),
+                         {1: 1, 2: 5, 3: 3, 4: 5})
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from relstorage.tests import TestCase
+
+
+class TestFollowerPredictor(TestCase):
+
+    def _makeOne(self, followers=2, table_size=3):
+        from relstorage.cache.predictor import FollowerPredictor
+        return FollowerPredictor(followers, table_size)
+
+    def test_record_and_predict(self):
+        p = self._makeOne()
+        self.assertEqual(p.predict(1), ())
+        p.record(None, 1)
+        p.record(1, 2)
+        self.assertEqual(p.predict(1), (2,))
+        # Most recent first
+        p.record(1, 3)
+        self.assertEqual(p.predict(1), (3, 2))
+        # Bounded, dropping the oldest follower.
+        p.record(1, 4)
+        self.assertEqual(p.predict(1), (4, 3))
+        # Repeating moves to the front without duplicates.
+        p.record(1, 3)
+        self.assertEqual(p.predict(1), (3, 4))
+        p.record(1, 3)
+        self.assertEqual(p.predict(1), (3, 4))
+        # Loading the same object twice in a row is not a follower.
+        p.record(1, 1)
+        self.assertEqual(p.predict(1), (3, 4))
+
+    def test_table_size_bounded(self):
+        p = self._makeOne()
+        p.record(1, 2)
+        p.record(2, 3)
+        p.record(3, 4)
+        self.assertEqual(len(p), 3)
+        # Touching 1 makes it recent.
+        p.record(1, 5)
+        p.record(4, 5)
+        self.assertEqual(len(p), 3)
+        self.assertEqual(p.predict(2), ())
+        self.assertEqual(p.predict(1), (5, 2))
+
+    def test_stats(self):
+        p = self._makeOne()
+        stats = p.stats()
+        self.assertEqual(stats['prefetch_hit_ratio'], 0)
+        self.assertEqual(stats['prefetch_waste_ratio'], 0)
+
+        p.note_prefetched([2, 3, 4, 5])
+        p.record(None, 2)
+        p.record(2, 3)
+        # Only counted once
+        p.record(3, 2)
+        stats = p.stats()
+        self.assertEqual(stats['prefetch_count'], 4)
+        self.assertEqual(stats['prefetch_hits'], 2)
+        self.assertEqual(stats['prefetch_hit_ratio'], 0.5)
+        self.assertEqual(stats['prefetch_waste_ratio'], 0.5)
+
+        p.clear()
+        self.assertEqual(len(p), 0)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+# Copyright (c) 2020 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from relstorage.cache import shm_client
+
+from .test_memcache_client import AbstractStateCacheTests
+
+@unittest.skipIf(shm_client.fcntl is None, "Requires fcntl")
+class SharedMemoryStateCacheTests(AbstractStateCacheTests):
+
+    def setUp(self):
+        super(SharedMemoryStateCacheTests, self).setUp()
+        self.temp_dir = tempfile.mkdtemp(prefix=self.rs_temp_prefix)
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        os.environ['RS_CACHE_SHARED_DIR'] = self.temp_dir
+        self.addCleanup(os.environ.pop, 'RS_CACHE_SHARED_DIR')
+
+    def getClass(self):
+        return shm_client.SharedMemoryStateCache
+
+    def _makeOne(self, **kw):
+        kw.setdefault('cache_local_storage_mb', 1)
+        options = self.Options.from_args(**kw)
+        inst = self.getClass().from_options(options, 'pfx')
+        self.addCleanup(inst.close)
+        return inst
+
+    def test_file_location(self):
+        c = self._makeOne()
+        self.assertEqual(c.path,
+                         os.path.join(self.temp_dir, 'relstorage-shm-pfx.cache'))
+        self.assertTrue(os.path.exists(c.path))
+
+    def test_disabled(self):
+        options = self.Options.from_args(cache_local_storage_mb=0)
+        self.assertIsNone(self.getClass().from_options(options))
+
+    def test_shared_between_mappings(self):
+        c1 = self._makeOne()
+        # Asking for a different size uses the existing file.
+        c2 = self._makeOne(cache_local_storage_mb=2)
+        self.assertEqual(c1.ring_size, c2.ring_size)
+
+        c1[(1, 2)] = (b'abc', 2)
+        self.assertEqual(c2[(1, 2)], (b'abc', 2))
+        self.assertIn((1, 2), c2)
+        self.assertNotIn((1, 3), c2)
+        # Frozen keys aren't supported.
+        self.assertIsNone(c2[(1, None)])
+
+        del c2[(1, 2)]
+        self.assertIsNone(c1[(1, 2)])
+
+        c1.set_all_for_tid(5, [(b'abc', 1, -1), (b'def', 2, -1)])
+        c2.invalidate_all([1])
+        self.assertIsNone(c1[(1, 5)])
+        self.assertEqual(c1[(2, 5)], (b'def', 5))
+
+        c2.flush_all()
+        self.assertIsNone(c1[(2, 5)])
+
+        stats = c1.stats()
+        self.assertEqual(stats['sets'], 3)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_ring_wraps(self):
+        c = self._makeOne()
+        value = b'x' * (c.max_value_size - 1)
+        c[(1, 1)] = (value, 1)
+        self.assertEqual(c[(1, 1)], (value, 1))
+        # Write enough to completely overwrite the ring.
+        for oid in range(2, 12):
+            c[(oid, 1)] = (value, 1)
+        # The index entry may still be there, but the data is
+        # gone, and we notice.
+        self.assertIsNone(c[(1, 1)])
+        self.assertEqual(c[(11, 1)], (value, 1))
+
+    def test_too_large(self):
+        c = self._makeOne()
+        c[(1, 1)] = (b'x' * (c.max_value_size + 1), 1)
+        self.assertIsNone(c[(1, 1)])
+
+    def test_many_versions_in_bucket(self):
+        c = self._makeOne()
+        for tid in range(1, 10):
+            c[(1, tid)] = (b'abc', tid)
+        # Only the most recent few fit.
+        self.assertIsNone(c[(1, 1)])
+        self.assertEqual(c[(1, 9)], (b'abc', 9))
@@ -80,6 +80,31 @@ class StorageCacheTests(TestCase):
         c.close()
         self.test_closed_state(c)
 
+    def test_ctor_host_cache(self):
+        import os
+        import shutil
+        import tempfile
+        from relstorage.cache.shm_client import SharedMemoryStateCache
+        from relstorage.cache.local_client import LocalClient
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        os.environ['RS_CACHE_SHARED_DIR'] = temp_dir
+        self.addCleanup(os.environ.pop, 'RS_CACHE_SHARED_DIR')
+
+        c = self._makeOne(
+            cache_local_storage='relstorage.cache.shm_client.SharedMemoryStateCache',
+            cache_local_storage_mb=1)
+        self.addCleanup(c.close)
+        cache = c.cache
+        # Local, then host, then memcache.
+        self.assertIsInstance(cache.l.l, LocalClient)
+        self.assertIsInstance(cache.l.g, SharedMemoryStateCache)
+
+        cache.l.g[(1, 2)] = (b'abc', 2)
+        self.assertEqual(cache[(1, 2)], (b'abc', 2))
+        # It was copied to the local cache.
+        self.assertEqual(c.local_client[(1, 2)], (b'abc', 2))
+
     def test_closed_state(self, c=None):
         if c is None:
             c = self._makeOne()
@@ -142,6 +167,55 @@ class StorageCacheTests(TestCase):
         if fname:
             self.assertTrue(os.path.exists(fname), fname)
 
+    def test_checkpoint(self):
+        import tempfile
+        import shutil
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, True)
+        c = self._makeOne(cache_local_dir=temp_dir,
+                          cache_local_checkpoint_interval=3600)
+        checkpointer = c.polling_state.checkpointer
+        self.assertIsNotNone(checkpointer)
+        self.assertIn('checkpoint_interval', c.stats()['checkpoint_stats'])
+        # Nothing to checkpoint until we've polled.
+        self.assertEqual(c.polling_state.checkpoint(c.local_client), 0)
+
+        tid = 268595726030645777
+        c.local_client[(2, tid)] = (b'abc', tid)
+        from relstorage.cache import mvcc
+        c.polling_state.object_index = mvcc._ObjectIndex(tid)
+        self.assertEqual(c.polling_state.checkpoint(c.local_client), 1)
+        self.assertEqual(0, len(c.local_client._dirty_oids))
+
+        c2 = self._makeOne(current_oids={2: tid}, cache_local_dir=temp_dir)
+        self.assertEqual(1, len(c2))
+        c2.close()
+
+        c.close()
+        self.assertIsNone(c.polling_state.checkpointer)
+        self.assertFalse(checkpointer._thread.is_alive())
+
+    def test_lazy_restore(self):
+        import time
+        c, oid, tid = self._setup_for_save()
+        c.local_client[(3, tid - 1)] = (b'def', tid - 1)
+        c.save(overwrite=True)
+
+        # oid 3 changed since we saved.
+        c2 = self._makeOne(current_oids={oid: tid, 3: tid},
+                           cache_local_dir=c.options.cache_local_dir,
+                           cache_local_lazy_restore=True)
+        self.assertEqual(0, len(c2))
+        lazy_rows = c2.local_client._lazy_rows
+        for _ in range(500):
+            if lazy_rows.validated:
+                break
+            time.sleep(0.01)
+        self.assertTrue(lazy_rows.validated)
+        self.assertEqual(list(lazy_rows.oid_to_tid.keys()), [oid])
+        self.assertEqual(c2.local_client[(oid, None)], (b'abc', tid))
+        self.assertEqual(1, len(c2))
+
     def test_save_and_clear(self):
         c, oid, tid = self._setup_for_save()
         self.assertNoPersistentCache(c)
@@ -236,6 +310,142 @@ class StorageCacheTests(TestCase):
         res = c.load(None, 2)
         self.assertEqual(res, (None, None))
 
+    def test_load_multiple_without_poll(self):
+        c = self._makeOne(current_oids={1: 5})
+        self.assertEqual(c.load_multiple(None, [1, 2]), {1: (b'', 5)})
+        # Nothing was cached.
+        self.assertEqual(len(c), 0)
+
+    def test_load_multiple(self):
+        from relstorage.cache import mvcc
+        c = self._makeOne()
+        c.adapter.mover.data.update({
+            1: (b'one', 4),
+            2: (b'two', 5),
+            3: (b'three', 3),
+        })
+        ix = mvcc._ObjectIndex(4)
+        ix = ix.with_polled_changes(5, 4, [(2, 5)])
+        c.polling_state.object_index = ix
+        c.object_index = ix
+        c.highest_visible_tid = 5
+        # 2 is already cached.
+        c.cache[(2, 5)] = (b'two', 5)
+
+        result = c.load_multiple(None, [1, 2, 3, 4])
+        self.assertEqual(result, {
+            1: (b'one', 4),
+            2: (b'two', 5),
+            3: (b'three', 3),
+        })
+        # The misses were cached and indexed.
+        self.assertEqual(ix[1], 4)
+        self.assertEqual(ix[3], 3)
+        self.assertEqual(c.cache[(1, 4)], (b'one', 4))
+        self.assertEqual(c.cache[(3, 3)], (b'three', 3))
+
+        # Now everything comes from the cache.
+        c.adapter.mover.data.clear()
+        self.assertEqual(c.load_multiple(None, [1, 2, 3]), result)
+
+    def test_load_multiple_from_future(self):
+        from ZODB.POSException import ReadConflictError
+        from relstorage.cache import mvcc
+        c = self._makeOne(current_oids={1: 6})
+        ix = mvcc._ObjectIndex(5)
+        c.polling_state.object_index = ix
+        c.object_index = ix
+        c.highest_visible_tid = 5
+        with self.assertRaises(ReadConflictError):
+            c.load_multiple(None, [1])
+
+    def test_load_predicted_followers(self):
+        from relstorage.cache import mvcc
+        c = self._makeOne(cache_prefetch_followers=2)
+        predictor = c.polling_state.predictor
+        self.assertIsNotNone(predictor)
+        c.adapter.mover.data.update({
+            1: (b'one', 4),
+            2: (b'two', 4),
+            3: (b'three', 4),
+        })
+        ix = mvcc._ObjectIndex(4)
+        c.polling_state.object_index = ix
+        c.object_index = ix
+        c.highest_visible_tid = 4
+
+        # Learn the sequence.
+        self.assertEqual(c.load(None, 1), (b'one', 4))
+        self.assertEqual(c.load(None, 2), (b'two', 4))
+        self.assertEqual(predictor.predict(1), (2,))
+
+        # A miss on 1 now brings 2 and 3 along, if they're not cached.
+        c.last_loaded_oid = None
+        c.cache.flush_all()
+        predictor.record(3, 2)
+        predictor.record(1, 3)
+        self.assertEqual(predictor.predict(1), (3, 2))
+        self.assertEqual(c.load(None, 1), (b'one', 4))
+        self.assertEqual(c.cache[(3, 4)], (b'three', 4))
+        self.assertEqual(c.cache[(2, 4)], (b'two', 4))
+        self.assertEqual(ix[3], 4)
+
+        # Which we can see when we load them.
+        c.adapter.mover.data.clear()
+        self.assertEqual(c.load(None, 3), (b'three', 4))
+        stats = c.stats()['prefetch_stats']
+        self.assertEqual(stats['prefetch_count'], 2)
+        self.assertEqual(stats['prefetch_hits'], 1)
+        self.assertEqual(stats['prefetch_hit_ratio'], 0.5)
+
+    def test_load_multiple_records_followers(self):
+        from relstorage.cache import mvcc
+        c = self._makeOne(cache_prefetch_followers=2)
+        predictor = c.polling_state.predictor
+        c.adapter.mover.data.update({
+            1: (b'one', 4),
+            2: (b'two', 4),
+            3: (b'three', 4),
+        })
+        ix = mvcc._ObjectIndex(4)
+        c.polling_state.object_index = ix
+        c.object_index = ix
+        c.highest_visible_tid = 4
+
+        c.load(None, 3)
+        c.load_multiple(None, iter([1, 2]))
+        self.assertEqual(predictor.predict(3), (1,))
+        self.assertEqual(predictor.predict(1), (2,))
+        self.assertEqual(c.last_loaded_oid, 2)
+
+        # Bulk loads count as hits for what we prefetched.
+        predictor.note_prefetched([1])
+        c.load_multiple(None, [1])
+        self.assertEqual(c.stats()['prefetch_stats']['prefetch_hits'], 1)
+
+    def test_load_predicted_followers_from_future(self):
+        from relstorage.cache import mvcc
+        c = self._makeOne(cache_prefetch_followers=2)
+        predictor = c.polling_state.predictor
+        c.adapter.mover.data.update({
+            1: (b'one', 4),
+            # Committed after we polled, but visible to the load
+            # connection's snapshot.
+            2: (b'two', 6),
+        })
+        ix = mvcc._ObjectIndex(4)
+        c.polling_state.object_index = ix
+        c.object_index = ix
+        c.highest_visible_tid = 4
+        predictor.record(1, 2)
+        self.assertEqual(predictor.predict(1), (2,))
+
+        # The follower we didn't ask for is skipped, not an error.
+        self.assertEqual(c.load(None, 1), (b'one', 4))
+        self.assertIsNone(c.cache[(2, 6)])
+        self.assertIsNone(ix[2])
+        self.assertEqual(c.stats()['prefetch_stats']['prefetch_count'], 0)
+
     def test_store_temp(self):
         c = self._makeOne()
         temp_storage = TemporaryStorage()
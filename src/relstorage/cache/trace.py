@@ -15,16 +15,22 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import argparse
+import gzip
 import logging
 import struct
+import sys
 import threading
 import time
 
 from ZODB.utils import p64
+from ZODB.utils import u64
 from ZODB.utils import z64
 
 log = logging.getLogger(__name__)
 
+_HEADER = struct.Struct(">iiH8s8s")
+
 
 class ZEOTracer(object):
     # Knows how to write ZEO trace files.
@@ -37,7 +43,7 @@ class ZEOTracer(object):
         # (going off example in ZEO code; in one test locally this gets us a
         # ~15% improvement)
         _now = time.time
-        _pack = struct.Struct(">iiH8s8s").pack
+        _pack = _HEADER.pack
         _trace_file_write = trace_file.write
         _p64 = p64
         _z64 = z64
@@ -85,3 +91,146 @@ class ZEOTracer(object):
     def close(self):
         self._trace_file.close()
         del self._trace
+
+
+def read_trace(trace_file):
+    """
+    Iterate the records of the ZEO-format trace in the open binary
+    file *trace_file*, such as those written by :class:`ZEOTracer`.
+
+    Each record is a tuple ``(timestamp, code, oid_int, tid_int,
+    end_tid_int, dlen)``.
+    """
+    header_size = _HEADER.size
+    unpack = _HEADER.unpack
+    read = trace_file.read
+    while True:
+        header = read(header_size)
+        if len(header) < header_size:
+            break
+        ts, encoded, oidlen, tid, end_tid = unpack(header)
+        oid = read(oidlen) if oidlen else b''
+        if len(oid) < oidlen:
+            break
+        yield (
+            ts,
+            encoded & 0x7e,
+            u64(oid) if oid else 0,
+            u64(tid),
+            u64(end_tid),
+            encoded >> 8,
+        )
+
+
+class TraceReplay(object):
+    """
+    Replays a trace against a fresh local cache using one eviction
+    policy and counts the hits.
+
+    Loads (codes 0x2x) look up the object at the last TID stored for
+    it; stores (codes 0x5x) add it with a state of the recorded size,
+    replacing an older revision; invalidations (codes 0x1x) remove
+    it. Compression is not used, so the state sizes are those of the
+    trace.
+
+    A load that was a hit when the trace was recorded, but misses
+    here, stores the object just as a real miss would have loaded
+    it from the database; we know its TID and size from the trace.
+    """
+
+    def __init__(self, cache_mb, eviction_policy):
+        from relstorage.options import Options
+        from relstorage.cache.local_client import LocalClient
+        self.eviction_policy = eviction_policy
+        self.cache = LocalClient(Options(
+            cache_local_mb=cache_mb,
+            cache_local_eviction_policy=eviction_policy,
+        ))
+        self.current_tids = {}
+        self.loads = 0
+        self.hits = 0
+
+    def replay(self, records):
+        cache = self.cache
+        current_tids = self.current_tids
+        for _ts, code, oid, tid, _end_tid, dlen in records:
+            action = code & 0x70
+            if action == 0x20:
+                self.loads += 1
+                if cache.get((oid, current_tids.get(oid, tid or None))) is not None:
+                    self.hits += 1
+                    continue
+                tid = tid or current_tids.get(oid)
+                if code != 0x22 or not tid:
+                    # A miss in the trace; it will be followed by a store.
+                    continue
+                action = 0x50
+            if action == 0x50:
+                old_tid = current_tids.get(oid)
+                if old_tid is not None and old_tid != tid:
+                    cache.delitems({oid: old_tid})
+                current_tids[oid] = tid
+                if cache.get((oid, tid), peek=True) is None:
+                    cache[(oid, tid)] = (b'\0' * dlen, tid)
+            elif action == 0x10:
+                old_tid = current_tids.pop(oid, None)
+                if old_tid is not None:
+                    cache.delitems({oid: old_tid})
+        return self
+
+    @property
+    def hit_ratio(self):
+        return self.hits / self.loads if self.loads else 0
+
+
+def _read_trace_file(path):
+    if path == '-':
+        return list(read_trace(getattr(sys.stdin, 'buffer', sys.stdin)))
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as trace_file:
+        return list(read_trace(trace_file))
+
+
+def main(argv=None):
+    """
+    Replay trace files through each local cache eviction policy
+    and report the hit ratios.
+    """
+    from relstorage.cache.local_client import LocalClient
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        '-s', '--size', type=float, default=10,
+        help="The size of the local cache in MB, as for cache-local-mb. "
+        "Default: %(default)s")
+    parser.add_argument(
+        '-p', '--policy', action='append', dest='policies',
+        choices=LocalClient._eviction_policies,
+        help="The policy to replay. May be given more than once. "
+        "Default: all policies.")
+    parser.add_argument(
+        'tracefiles', nargs='+',
+        help="The trace files to replay, in order. A name ending in .gz "
+        "is decompressed; '-' reads standard input.")
+    args = parser.parse_args(argv)
+
+    policies = args.policies or LocalClient._eviction_policies
+    replays = [TraceReplay(args.size, policy) for policy in policies]
+    for path in args.tracefiles:
+        records = _read_trace_file(path)
+        for replay in replays:
+            replay.replay(records)
+
+    print("%-15s %10s %10s %8s" % ('Policy', 'Loads', 'Hits', 'Hit rate'))
+    for replay in replays:
+        print("%-15s %10s %10s %7.1f%%" % (
+            replay.eviction_policy,
+            '{:,}'.format(replay.loads),
+            '{:,}'.format(replay.hits),
+            replay.hit_ratio * 100,
+        ))
+    return replays
+
+
+if __name__ == '__main__':
+    main()
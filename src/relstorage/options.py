@@ -87,8 +87,26 @@ class Options(object):
     ro_replica_conf = None
     #: ?
     replica_timeout = 600.0
+    #: If set, check how far behind the read-only replicas are this
+    #: often, in seconds, and load from the least lagged one.
+    replica_lag_check_interval = 0
+    #: If set, stop loading from a replica this many seconds behind.
+    replica_max_lag = 0
     #: Specifies what to do when a database connection is stale.
     revert_when_stale = False
+    #: Listen for commits (PostgreSQL only) and skip polls that would
+    #: find nothing.
+    poll_notify = False
+    #: If set, poll for changes in a background thread this often, in seconds.
+    background_poll_interval = 0
+    #: Keep a table of the objects each transaction changed and poll it.
+    invalidation_log = False
+    #: If set, upload stored objects to the database in batches of about
+    #: this many bytes while the transaction is still storing them.
+    store_stream_size = 0
+    #: If set, check the objects stored for conflicts each time about
+    #: this many bytes of existing objects have been stored.
+    store_conflict_check_size = 0
     #: Perform a GC when packing
     pack_gc = True
     #: Only prepack
@@ -100,20 +118,44 @@ class Options(object):
 
     #: List of memcache servers
     cache_servers = ()  # ['127.0.0.1:11211']
+    #: Send new objects to the memcache servers from a background thread?
+    cache_servers_background_writes = False
     #: Module to wrap a memcache connection with.
     cache_module_name = 'relstorage.pylibmc_wrapper'
     #: Database-specific prefix key
     cache_prefix = ''
     #: How much memory to use for the pickle cache
     cache_local_mb = 10
+    #: How many independently locked parts to divide the pickle cache into
+    cache_local_shards = 1
+    #: How the pickle cache chooses what to evict: 'segmented-lru' or 'tinylfu'
+    cache_local_eviction_policy = 'segmented-lru'
     #: The largest pickle to hold in the pickle cache
     cache_local_object_max = 16384
+    #: Dotted name of a cache shared by all processes on the host
+    cache_local_storage = None
+    #: How much memory to use for the cache shared by all processes
+    cache_local_storage_mb = 100
     #: How to compress local pickles
     cache_local_compression = 'none'
+    #: How big a zstd dictionary to train for compressing local pickles
+    cache_local_compression_dictionary_size = 0
+    #: Return views of the pickle cache's memory instead of copies
+    cache_local_zero_copy = False
     #: Directory holding persistent cache files
     cache_local_dir = None
+    #: How often, in seconds, to write changes to the persistent cache files
+    cache_local_checkpoint_interval = 0
+    #: Load persistent cache entries when first used instead of at startup
+    cache_local_lazy_restore = False
     #: Switch checkpoints after this many writes
     cache_delta_size_limit = 100000 if not PYPY else 50000
+    #: How to store the MVCC object index: 'btree' or 'array'
+    cache_object_index = 'btree'
+    #: How many object index entries each poll may vacuum; 0 is no limit
+    cache_vacuum_budget = 0
+    #: How many followers of each object to remember and prefetch
+    cache_prefetch_followers = 0
 
     #: How long to wait for a commit lock, in seconds.
     commit_lock_timeout = 30
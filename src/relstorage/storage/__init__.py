@@ -754,7 +754,13 @@ class RelStorage(LegacyMethodsMixin,
             # with an actual dict(), or something that is a sequence and can be
             # iterated using integer indices. If you give it a dict, all it cares
             # about are the keys.
-            oids = {int64_to_8bytes(oid_int): 1 for oid_int in changed_oids}
+            invalidations = getattr(changed_oids, 'invalidations', None)
+            if invalidations is not None:
+                # Shared with other connections that polled the same
+                # changes; the PickleCache doesn't modify it.
+                oids = invalidations()
+            else:
+                oids = {int64_to_8bytes(oid_int): 1 for oid_int in changed_oids}
         return oids
 
     def __stale(self, stale_error):
@@ -883,7 +889,14 @@ class RelStorage(LegacyMethodsMixin,
             # This is reset by poll_invalidations.
             self.__queued_changes = None
         elif self.__queued_changes is not None:
-            self.__queued_changes.update(changes)
+            if not self.__queued_changes:
+                # Usually the Connection polls us first. Keep what
+                # the cache gave us, which may be shared.
+                self.__queued_changes = changes
+            else:
+                if not isinstance(self.__queued_changes, OID_SET_TYPE):
+                    self.__queued_changes = OID_SET_TYPE(self.__queued_changes)
+                self.__queued_changes.update(changes)
             if len(self.__queued_changes) > self._options.cache_delta_size_limit:
                 # Hmm, ok, the Connection isn't polling us in a timely fashion.
                 # Maybe we're the root storage? Maybe our APIs are being used
@@ -123,6 +123,30 @@ class Loader(object):
                                               "creation undone"))
         return state, int64_to_8bytes(tid_int)
 
+    @stale_aware
+    @storage_method
+    @metricmethod_sampled
+    def load_multiple(self, oids):
+        """
+        Load the current state of each of the *oids* at once.
+
+        Returns a dictionary ``{oid: (state, tid)}``. Unlike
+        :meth:`load`, objects that do not exist, or whose creation has
+        been undone, are not reported with a ``POSKeyError``; they are
+        simply left out of the result.
+
+        Objects that aren't in the cache are fetched from the database
+        using a single query.
+        """
+        oid_ints = [bytes8_to_int64(oid) for oid in oids]
+        load_cursor = self.load_connection.cursor
+        loaded = self.__load_using_method(load_cursor, self.cache.load_multiple, oid_ints)
+        return {
+            int64_to_8bytes(oid_int): (state, int64_to_8bytes(tid_int))
+            for oid_int, (state, tid_int) in loaded.items()
+            if state
+        }
+
     @storage_method
     def getTid(self, oid):
         """
@@ -26,6 +26,7 @@ from __future__ import print_function
 
 import logging
 import os
+from functools import partial
 
 from transaction.interfaces import NoTransaction
 from transaction._transaction import rm_key
@@ -201,6 +202,32 @@ class SharedTPCState(object):
     def has_temp_data(self):
         return 'temp_storage' in self.__dict__ and self.temp_storage
 
+    @BaseLazy
+    def store_stream_size(self):
+        return self._storage._options.store_stream_size
+
+    @BaseLazy
+    def store_conflict_check_size(self):
+        return self._storage._options.store_conflict_check_size
+
+    @BaseLazy
+    def conflict_resolver(self):
+        # Holds the old states needed to resolve conflicts, which
+        # may be fetched before we vote.
+        from .vote import _CachedConflictResolver
+        return _CachedConflictResolver(self._storage, {})
+
+    def upload_temps(self, cursor):
+        """
+        Send whatever is in the temporary storage that hasn't been
+        sent yet to the database's ``temp_store``.
+        """
+        mover = self.adapter.mover
+        self.temp_storage.upload_unflushed(
+            partial(mover.store_temps, cursor),
+            partial(mover.replace_temps, cursor),
+        )
+
     def __cleanup(self, method_name, method_args):
         storage = self._storage
         resources = self._used_resources
@@ -26,6 +26,7 @@ from ZODB.utils import z64 as NO_PREV_TID
 
 
 from relstorage._compat import base64_decodebytes
+from relstorage._compat import iteroiditems
 from relstorage._compat import metricmethod_sampled
 from relstorage._compat import OID_TID_MAP_TYPE
 from relstorage._util import to_utf8
@@ -70,6 +71,11 @@ class AbstractBegin(AbstractTPCStateDatabaseAvailable):
         # Stored in their 8 byte form
         'invalidated_oids',
 
+        # {oid_int: prev_tid_int} for existing objects stored since we
+        # last checked for conflicts, and the total size of their
+        # states. Only used if ``store_conflict_check_size`` is set.
+        'unchecked_tids',
+        'unchecked_size',
     )
 
     _DEFAULT_TPC_VOTE_FACTORY = _BadFactory # type: Callable[..., AbstractTPCState]
@@ -80,6 +86,8 @@ class AbstractBegin(AbstractTPCStateDatabaseAvailable):
         # We'll replace this later with the right type when it's needed.
         self.required_tids = {} # type: Dict[int, int]
         self.tpc_vote_factory = self._DEFAULT_TPC_VOTE_FACTORY # type: ignore
+        self.unchecked_tids = {}
+        self.unchecked_size = 0
 
         user = to_utf8(self.transaction.user)
         desc = to_utf8(self.transaction.description)
@@ -117,7 +125,59 @@ class AbstractBegin(AbstractTPCStateDatabaseAvailable):
         # Save the data locally in a temporary place. Later, closer to commit time,
         # we'll send it all over at once. This lets us do things like use
         # COPY in postgres.
-        self.shared_state.temp_storage.store_temp(oid_int, data, prev_tid_int)
+        temp_storage = self.shared_state.temp_storage
+        temp_storage.store_temp(oid_int, data, prev_tid_int)
+        # Unless there's going to be a lot of it, and we've been asked
+        # to send it in pieces as we go, so there's less to do in tpc_vote.
+        stream_size = self.shared_state.store_stream_size
+        if stream_size and temp_storage.unflushed_size >= stream_size:
+            self.shared_state.upload_temps(self.shared_state.store_connection.cursor)
+        # Likewise, we may have been asked to look for conflicts as we go, so
+        # that a transaction that can't commit finds out before it's
+        # done all its work.
+        check_size = self.shared_state.store_conflict_check_size
+        if check_size and prev_tid_int:
+            self.unchecked_tids[oid_int] = prev_tid_int
+            self.unchecked_size += len(data)
+            if self.unchecked_size >= check_size:
+                self._check_for_conflicts()
+
+    def _check_for_conflicts(self):
+        """
+        Compare the TIDs the objects stored since the last check were
+        based on to the TIDs currently committed.
+
+        If any have changed and can't be resolved, raise a `ConflictError`
+        now. Otherwise, fetch the old states we'll need to resolve them,
+        so we don't have to do that while holding locks in ``tpc_vote``.
+        Conflicts are still detected (again) and resolved when we vote.
+        """
+        unchecked_tids = self.unchecked_tids
+        self.unchecked_tids = {}
+        self.unchecked_size = 0
+        shared_state = self.shared_state
+        current_tids = shared_state.adapter.mover.current_object_tids(
+            shared_state.store_connection.cursor,
+            list(unchecked_tids)
+        )
+        conflicts = [
+            (oid_int, current_tids[oid_int], prev_tid_int, None)
+            for oid_int, prev_tid_int in iteroiditems(unchecked_tids)
+            if current_tids.get(oid_int, prev_tid_int) != prev_tid_int
+        ]
+        if not conflicts:
+            return
+
+        resolver = shared_state.conflict_resolver
+        read_temp = shared_state.temp_storage.read_temp
+        resolver.group_by_class(
+            (conflict, read_temp(conflict[0]))
+            for conflict in conflicts
+        )
+        resolver.old_states_and_tids.update(shared_state.cache.prefetch_for_conflicts(
+            shared_state.load_connection.cursor,
+            [(oid_int, prev_tid_int) for oid_int, _, prev_tid_int, _ in conflicts]
+        ))
 
     @metricmethod_sampled
     def checkCurrentSerialInTransaction(self, oid, required_tid, transaction):
@@ -22,16 +22,47 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from array import array
 from tempfile import SpooledTemporaryFile
 
-from relstorage._compat import OID_OBJECT_MAP_TYPE as OidObjectMap
-from relstorage._compat import OidObjectMap_max_key
-from relstorage._compat import iteroiditems
+from relstorage._compat import OID_TID_MAP_TYPE
+from relstorage._compat import OID_SET_TYPE
+
+# 'Q' is an unsigned 64-bit integer everywhere we run.
+_TYPECODE = 'Q'
+
 
 class TemporaryStorage(object):
+    """
+    The object states stored by a transaction.
+
+    The states are appended to a temporary file. For each call to
+    `store_temp` we remember the OID, the position of the end of the
+    state, and the previous TID in parallel arrays of native integers,
+    so a transaction that stores millions of objects doesn't need
+    millions of Python objects to keep track of them. An OID stored
+    more than once only uses its latest entry.
+    """
+
     __slots__ = (
         '_queue',
-        '_queue_contents',
+        # Parallel arrays with one entry for each call to store_temp(),
+        # in the order the states were written to _queue. A state begins
+        # where the previous entry's ends.
+        '_oids',
+        '_ends',
+        '_prev_tids',
+        # {oid_int: index}: the current entry for each OID.
+        '_index',
+        '_max_stored_oid',
+        # The number of entries that had been made at the last
+        # upload_unflushed(), and the total size of the states stored
+        # since then.
+        '_flushed_count',
+        '_unflushed_size',
+        # The set of OIDs that have been uploaded, or None if
+        # we haven't uploaded anything yet.
+        '_uploaded',
     )
 
     def __init__(self):
@@ -39,12 +70,20 @@ class TemporaryStorage(object):
         # already be spooled to disk.
         # TODO: An alternate idea would be a temporary sqlite database.
         self._queue = SpooledTemporaryFile(max_size=10 * 1024 * 1024)
-        # {oid: (startpos, endpos, prev_tid_int)}
-        self._queue_contents = OidObjectMap()
+        self.reset()
 
     def reset(self):
-        self._queue_contents.clear()
-        self._queue.seek(0)
+        if self._queue is not None:
+            self._queue.seek(0)
+            self._queue.truncate()
+        self._oids = array(_TYPECODE)
+        self._ends = array(_TYPECODE)
+        self._prev_tids = array(_TYPECODE)
+        self._index = OID_TID_MAP_TYPE()
+        self._max_stored_oid = 0
+        self._flushed_count = 0
+        self._unflushed_size = 0
+        self._uploaded = None
 
     def store_temp(self, oid_int, state, prev_tid_int=0):
         """
@@ -55,24 +94,117 @@ class TemporaryStorage(object):
         """
         queue = self._queue
         queue.seek(0, 2)  # seek to end
-        startpos = queue.tell()
         queue.write(state)
-        endpos = queue.tell()
-        self._queue_contents[oid_int] = (startpos, endpos, prev_tid_int)
+        self._index[oid_int] = len(self._oids)
+        self._oids.append(oid_int)
+        self._ends.append(queue.tell())
+        self._prev_tids.append(prev_tid_int)
+        self._unflushed_size += len(state)
+        self._max_stored_oid = max(self._max_stored_oid, oid_int)
 
     def __len__(self):
         # How many distinct OIDs have been stored?
         # This also lets us be used in a boolean context to see
         # if we've actually stored anything or are closed.
-        return len(self._queue_contents)
+        return len(self._index)
 
     @property
     def stored_oids(self):
-        return self._queue_contents
+        """
+        A read-only mapping ``{oid_int: (startpos, endpos, prev_tid_int)}``.
+        """
+        return _StoredOIDs(self)
 
     @property
     def max_stored_oid(self):
-        return OidObjectMap_max_key(self._queue_contents)
+        return self._max_stored_oid
+
+    @property
+    def unflushed_size(self):
+        """
+        The number of bytes stored since the last `upload_unflushed`.
+        """
+        return self._unflushed_size
+
+    def upload_unflushed(self, store_temps, replace_temps):
+        """
+        Send everything stored since the last time we were called to
+        the database.
+
+        The objects we haven't uploaded before are passed to
+        ``store_temps(iterable)``, and the ones we have (because they
+        were stored again) to ``replace_temps(iterable)``, where the
+        iterables produce ``(state, oid_int, prev_tid_int)`` like
+        iterating this object does. These are the ``IObjectMover``
+        methods of the same names, with the cursor bound.
+        """
+        begin = self._flushed_count
+        end = len(self._oids)
+        if begin == end:
+            return
+        self._flushed_count = end
+        self._unflushed_size = 0
+        uploaded = self._uploaded
+        if uploaded is None:
+            # The usual case, at vote time: Everything, all at once.
+            self._uploaded = OID_SET_TYPE(self._index)
+            store_temps(self)
+            return
+
+        new_indexes = []
+        replaced_indexes = []
+        for i in self._current_indexes(begin, end):
+            oid_int = self._oids[i]
+            if oid_int in uploaded:
+                replaced_indexes.append(i)
+            else:
+                new_indexes.append(i)
+                uploaded.add(oid_int)
+        if new_indexes:
+            store_temps(self._iter_for_indexes(new_indexes))
+        if replaced_indexes:
+            replace_temps(self._iter_for_indexes(replaced_indexes))
+
+    def _current_indexes(self, begin=0, end=None):
+        # The indexes of the entries from *begin* to *end* that
+        # haven't been superseded, in file order.
+        oids = self._oids
+        if end is None:
+            end = len(oids)
+        if len(self._index) == len(oids):
+            # Nothing was stored twice.
+            return range(begin, end)
+        index = self._index
+        return (i for i in range(begin, end) if index[oids[i]] == i)
+
+    def _entry(self, i):
+        return (
+            self._ends[i - 1] if i else 0,
+            self._ends[i],
+            self._prev_tids[i],
+        )
+
+    def _iter_for_indexes(self, indexes):
+        read_temp_state = self._read_temp_state
+        oids = self._oids
+        ends = self._ends
+        prev_tids = self._prev_tids
+        for i in indexes:
+            yield read_temp_state(ends[i - 1] if i else 0, ends[i]), oids[i], prev_tids[i]
+
+    def _iter_all(self):
+        # Like ``_iter_for_indexes(self._current_indexes())``, but
+        # walking the arrays together is much faster.
+        read_temp_state = self._read_temp_state
+        index = self._index
+        check = len(index) != len(self._oids)
+        startpos = 0
+        i = 0
+        for oid_int, endpos, prev_tid_int in zip(self._oids, self._ends, self._prev_tids):
+            if not check or index[oid_int] == i:
+                yield read_temp_state(startpos, endpos), oid_int, prev_tid_int
+            startpos = endpos
+            i += 1
 
     def _read_temp_state(self, startpos, endpos):
         self._queue.seek(startpos)
@@ -86,32 +218,67 @@ class TemporaryStorage(object):
         """
         Return the bytes for a previously stored temporary item.
         """
-        startpos, endpos, _ = self._queue_contents[oid_int]
+        startpos, endpos, _ = self._entry(self._index[oid_int])
         return self._read_temp_state(startpos, endpos)
 
     def __iter__(self):
         return self.iter_for_oids(None)
 
     def iter_for_oids(self, oids):
-        read_temp_state = self._read_temp_state
-        for startpos, endpos, oid_int, prev_tid_int in self.items(oids):
-            state = read_temp_state(startpos, endpos)
-            yield state, oid_int, prev_tid_int
+        """
+        Iterate ``(state, oid_int, prev_tid_int)`` for the stored objects
+        in *oids*, or all of them if *oids* is None, in the order they
+        were written to the file, which helps if the file is large
+        and needs to be read sequentially from disk.
+        """
+        if oids is None:
+            return self._iter_all()
+        return self._iter_for_indexes(self._indexes_for_oids(oids))
 
     def items(self, oids=None):
-        # Order the queue by file position, which should help
-        # if the file is large and needs to be read
-        # sequentially from disk.
-        items = [
-            (startpos, endpos, oid_int, prev_tid_int)
-            for (oid_int, (startpos, endpos, prev_tid_int)) in iteroiditems(self._queue_contents)
-            if oids is None or oid_int in oids
-        ]
-        items.sort()
-        return items
+        """
+        Iterate ``(startpos, endpos, oid_int, prev_tid_int)`` for the
+        stored objects in *oids*, or all of them, in file order.
+        """
+        oid_list = self._oids
+        for i in self._indexes_for_oids(oids):
+            startpos, endpos, prev_tid_int = self._entry(i)
+            yield startpos, endpos, oid_list[i], prev_tid_int
+
+    def _indexes_for_oids(self, oids):
+        if oids is None:
+            return self._current_indexes()
+        index = self._index
+        return sorted(index[oid_int] for oid_int in oids if oid_int in index)
 
     def close(self):
         if self._queue is not None:
             self._queue.close()
             self._queue = None
-            self._queue_contents = () # Not None so len() keeps working
+            self.reset()
+
+
+class _StoredOIDs(object):
+    """
+    The mapping returned by `TemporaryStorage.stored_oids`.
+    """
+
+    __slots__ = ('_temp_storage',)
+
+    def __init__(self, temp_storage):
+        self._temp_storage = temp_storage
+
+    def __len__(self):
+        return len(self._temp_storage._index)
+
+    def __iter__(self):
+        return iter(self._temp_storage._index)
+
+    keys = __iter__
+
+    def __contains__(self, oid_int):
+        return oid_int in self._temp_storage._index
+
+    def __getitem__(self, oid_int):
+        temp_storage = self._temp_storage
+        return temp_storage._entry(temp_storage._index[oid_int])
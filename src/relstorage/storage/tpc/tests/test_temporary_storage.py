@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for temporary_storage.py.
+
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+from ..temporary_storage import TemporaryStorage
+
+
+class TestTemporaryStorage(unittest.TestCase):
+
+    def _makeOne(self):
+        return TemporaryStorage()
+
+    def _upload(self, temp_storage):
+        stored = []
+        replaced = []
+        temp_storage.upload_unflushed(stored.extend, replaced.extend)
+        return stored, replaced
+
+    def test_store_and_read(self):
+        temp_storage = self._makeOne()
+        temp_storage.store_temp(1, b'abc', 5)
+        temp_storage.store_temp(2, b'de')
+        temp_storage.store_temp(1, b'fgh', 6)
+        self.assertEqual(len(temp_storage), 2)
+        self.assertEqual(temp_storage.read_temp(1), b'fgh')
+        self.assertEqual(temp_storage.max_stored_oid, 2)
+        self.assertEqual(sorted(temp_storage), [(b'de', 2, 0), (b'fgh', 1, 6)])
+        temp_storage.close()
+        self.assertEqual(len(temp_storage), 0)
+
+    def test_iterates_in_file_order(self):
+        temp_storage = self._makeOne()
+        temp_storage.store_temp(3, b'abc', 5)
+        temp_storage.store_temp(1, b'de')
+        temp_storage.store_temp(2, b'f', 7)
+        temp_storage.store_temp(3, b'gh', 6)
+        self.assertEqual(list(temp_storage), [
+            (b'de', 1, 0), (b'f', 2, 7), (b'gh', 3, 6),
+        ])
+        self.assertEqual(list(temp_storage.items()), [
+            (3, 5, 1, 0), (5, 6, 2, 7), (6, 8, 3, 6),
+        ])
+        self.assertEqual(list(temp_storage.iter_for_oids({3, 1, 42})), [
+            (b'de', 1, 0), (b'gh', 3, 6),
+        ])
+        stored_oids = temp_storage.stored_oids
+        self.assertEqual(dict(stored_oids), {1: (3, 5, 0), 2: (5, 6, 7), 3: (6, 8, 6)})
+        self.assertIn(2, stored_oids)
+        self.assertNotIn(42, stored_oids)
+        self.assertEqual(len(stored_oids), 3)
+
+    def test_reset(self):
+        temp_storage = self._makeOne()
+        temp_storage.store_temp(3, b'abc', 5)
+        temp_storage.reset()
+        self.assertEqual(len(temp_storage), 0)
+        self.assertEqual(temp_storage.max_stored_oid, 0)
+        self.assertEqual(temp_storage.unflushed_size, 0)
+        temp_storage.store_temp(1, b'de')
+        self.assertEqual(list(temp_storage), [(b'de', 1, 0)])
+        temp_storage.close()
+
+    def test_upload_everything_at_once(self):
+        temp_storage = self._makeOne()
+        temp_storage.store_temp(1, b'abc')
+        temp_storage.store_temp(1, b'def')
+        temp_storage.store_temp(2, b'gh')
+        self.assertEqual(temp_storage.unflushed_size, 8)
+
+        stored, replaced = self._upload(temp_storage)
+        self.assertEqual(sorted(stored), [(b'def', 1, 0), (b'gh', 2, 0)])
+        self.assertEqual(replaced, [])
+        self.assertEqual(temp_storage.unflushed_size, 0)
+        # Nothing more to do.
+        self.assertEqual(self._upload(temp_storage), ([], []))
+
+    def test_upload_in_pieces(self):
+        temp_storage = self._makeOne()
+        temp_storage.store_temp(1, b'abc')
+        temp_storage.store_temp(2, b'de')
+        self._upload(temp_storage)
+
+        temp_storage.store_temp(3, b'fgh', 7)
+        temp_storage.store_temp(1, b'ijk', 8)
+        temp_storage.store_temp(3, b'lmn', 9)
+        self.assertEqual(temp_storage.unflushed_size, 9)
+        stored, replaced = self._upload(temp_storage)
+        self.assertEqual(stored, [(b'lmn', 3, 9)])
+        self.assertEqual(replaced, [(b'ijk', 1, 8)])
+
+        temp_storage.store_temp(3, b'opq')
+        stored, replaced = self._upload(temp_storage)
+        self.assertEqual(stored, [])
+        self.assertEqual(replaced, [(b'opq', 3, 0)])
+        temp_storage.close()
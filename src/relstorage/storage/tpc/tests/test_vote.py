@@ -85,3 +85,55 @@ class TestHistoryPreservingDeletOnly(_InterfaceMixin, unittest.TestCase):
     def _getClass(self):
         from ..vote import HistoryPreservingDeleteOnly
         return HistoryPreservingDeleteOnly
+
+
+class TestCachedConflictResolver(unittest.TestCase):
+
+    def _makeOne(self):
+        from ..vote import _CachedConflictResolver
+
+        class Storage(object):
+            @staticmethod
+            def _crs_transform_record_data(data):
+                return data
+            _crs_untransform_record_data = _crs_transform_record_data
+
+        return _CachedConflictResolver(Storage())
+
+    def _pickle(self, obj):
+        from ZODB.serialize import ObjectWriter
+        return ObjectWriter().serialize(obj)
+
+    def test_group_by_class(self):
+        from BTrees.Length import Length
+        from BTrees.OOBTree import OOBucket
+        length = self._pickle(Length())
+        bucket = self._pickle(OOBucket())
+        conflicts = [
+            ((1, 3, 2, b''), length),
+            ((2, 3, 2, b''), bucket),
+            ((3, 3, 2, b''), length),
+            ((4, 3, 2, b''), b'not a pickle'),
+        ]
+        by_class = self._makeOne().group_by_class(conflicts)
+        self.assertEqual(by_class, {
+            Length: [conflicts[0], conflicts[2]],
+            OOBucket: [conflicts[1]],
+            None: [conflicts[3]],
+        })
+
+    def test_group_by_class_unresolvable(self):
+        from BTrees.Length import Length
+        from persistent.mapping import PersistentMapping
+        from ZODB.POSException import ConflictError
+        from ZODB.utils import p64
+        mapping = self._pickle(PersistentMapping())
+        conflicts = [
+            ((1, 3, 2, b''), self._pickle(Length())),
+            ((2, 3, 2, b''), mapping),
+        ]
+        with self.assertRaises(ConflictError) as exc:
+            self._makeOne().group_by_class(conflicts)
+        self.assertEqual(exc.exception.oid, p64(2))
+        # (tid we saw, committed tid), like a failed resolution.
+        self.assertEqual(exc.exception.serials, (p64(2), p64(3)))
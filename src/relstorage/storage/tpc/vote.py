@@ -22,10 +22,14 @@ from __future__ import absolute_import
 from __future__ import print_function
 
 import time
+from io import BytesIO
 
 from zope.interface import implementer
 
+from ZODB._compat import PersistentUnpickler
 from ZODB.ConflictResolution import ConflictResolvingStorage
+from ZODB.ConflictResolution import PersistentReferenceFactory
+from ZODB.ConflictResolution import find_global
 from ZODB.POSException import ConflictError
 from ZODB.POSException import StorageTransactionError
 from ZODB.utils import p64 as int64_to_8bytes
@@ -157,8 +161,9 @@ class AbstractVote(AbstractTPCStateDatabaseAvailable):
     @log_timed
     def _flush_temps_to_db(self, cursor):
         if self.shared_state.has_temp_data():
-            # Don't bother if we're empty.
-            self.shared_state.adapter.mover.store_temps(cursor, self.shared_state.temp_storage)
+            # Don't bother if we're empty. If we've been uploading
+            # while objects were stored, this is only the remainder.
+            self.shared_state.upload_temps(cursor)
 
     def __enter_critical_phase_until_transaction_end(self):
         self.shared_state.load_connection.enter_critical_phase_until_transaction_end()
@@ -240,7 +245,7 @@ class AbstractVote(AbstractTPCStateDatabaseAvailable):
         # make get serviced ASAP (some gevent drivers can actually
         # guarantee this), but only right before we're about to do something
         # that could potentially be unbounded or allow switching.
-        invalidated_oid_ints = self.__check_and_resolve_conflicts(storage, conflicts)
+        invalidated_oid_ints = self.__check_and_resolve_conflicts(conflicts)
 
         blobs_must_be_moved_now = False
         committing_tid_bytes = None
@@ -269,7 +274,7 @@ class AbstractVote(AbstractTPCStateDatabaseAvailable):
         return invalidated_oid_ints
 
     @log_timed_only_self
-    def __check_and_resolve_conflicts(self, storage, conflicts):
+    def __check_and_resolve_conflicts(self, conflicts):
         """
         Either raises an `ConflictError`, or successfully resolves
         all conflicts.
@@ -355,19 +360,6 @@ class AbstractVote(AbstractTPCStateDatabaseAvailable):
             # we have no other opportunities to switch.
             return invalidated_oid_ints
 
-        # We're probably going to need to make a database query. Elevate our
-        # priority and regain control ASAP.
-        self.__enter_critical_phase_until_transaction_end()
-
-        old_states_and_tids = self.shared_state.cache.prefetch_for_conflicts(
-            self.shared_state.load_connection.cursor,
-            old_states_to_prefetch
-        )
-
-        tryToResolveConflict = _CachedConflictResolver(
-            storage, old_states_and_tids
-        ).tryToResolveConflict
-
         adapter = self.shared_state.adapter
         read_temp = self.shared_state.temp_storage.read_temp
         store_temp = self.shared_state.temp_storage.store_temp
@@ -376,33 +368,62 @@ class AbstractVote(AbstractTPCStateDatabaseAvailable):
         # them in traceback info. (Plus they could be sensitive.)
         __traceback_info__ = count_conflicts, invalidated_oid_ints
 
-        for conflict in actual_conflicts:
-            # Match the names of the arguments used
-            oid_int, committed_tid_int, tid_this_txn_saw_int, committedData = conflict
-
-            oid = int64_to_8bytes(oid_int)
-            committedSerial = int64_to_8bytes(committed_tid_int)
-            oldSerial = int64_to_8bytes(tid_this_txn_saw_int)
-            newpickle = read_temp(oid_int)
-
-            # Because we're using the _CachedConflictResolver, we can only loadSerial()
-            # one state: the ``oldSerial`` state. Therefore the committedData *must* be
-            # given.
+        # Before we query for old states, make sure every class involved
+        # can resolve conflicts at all. One that can't (and there's
+        # usually one class that conflicts over and over) dooms the
+        # transaction, and it should release its locks as soon as possible.
+        resolver = self.shared_state.conflict_resolver
+        conflicts_by_class = resolver.group_by_class(
+            (conflict, read_temp(conflict[0]))
+            for conflict in actual_conflicts
+        )
 
-            resolved_state = tryToResolveConflict(oid, committedSerial, oldSerial,
-                                                  newpickle, committedData)
+        # We're probably going to need to make a database query. Elevate our
+        # priority and regain control ASAP.
+        self.__enter_critical_phase_until_transaction_end()
 
-            if resolved_state is None:
-                # unresolvable; kill the whole transaction
-                raise ConflictError(
-                    oid=oid,
-                    serials=(oldSerial, committedSerial),
-                    data=newpickle,
-                )
+        # Some of the old states may have been fetched already, while
+        # objects were being stored (see ``store_conflict_check_size``).
+        old_states_and_tids = resolver.old_states_and_tids
+        old_states_to_prefetch = [
+            (oid_int, tid_int)
+            for oid_int, tid_int in old_states_to_prefetch
+            if old_states_and_tids.get(oid_int, (None, None))[1] != tid_int
+        ]
+        if old_states_to_prefetch:
+            old_states_and_tids.update(self.shared_state.cache.prefetch_for_conflicts(
+                self.shared_state.load_connection.cursor,
+                old_states_to_prefetch
+            ))
+        tryToResolveConflict = resolver.tryToResolveConflict
+
+        for conflicts_and_pickles in conflicts_by_class.values():
+            for conflict, newpickle in conflicts_and_pickles:
+                # Match the names of the arguments used
+                oid_int, committed_tid_int, tid_this_txn_saw_int, committedData = conflict
+
+                oid = int64_to_8bytes(oid_int)
+                committedSerial = int64_to_8bytes(committed_tid_int)
+                oldSerial = int64_to_8bytes(tid_this_txn_saw_int)
+
+                # Because we're using the _CachedConflictResolver, we can
+                # only loadSerial() one state: the ``oldSerial`` state.
+                # Therefore the committedData *must* be given.
+
+                resolved_state = tryToResolveConflict(oid, committedSerial, oldSerial,
+                                                      newpickle, committedData)
+
+                if resolved_state is None:
+                    # unresolvable; kill the whole transaction
+                    raise ConflictError(
+                        oid=oid,
+                        serials=(oldSerial, committedSerial),
+                        data=newpickle,
+                    )
 
-            # resolved
-            invalidated_oid_ints.add(oid_int)
-            store_temp(oid_int, resolved_state, committed_tid_int)
+                # resolved
+                invalidated_oid_ints.add(oid_int)
+                store_temp(oid_int, resolved_state, committed_tid_int)
 
         # We resolved some conflicts, so we need to send them over to the database.
         adapter.mover.replace_temps(
@@ -596,13 +617,65 @@ class HistoryPreservingDeleteOnly(HistoryPreserving):
 
 
 class _CachedConflictResolver(ConflictResolvingStorage):
+    """
+    Resolves conflicts using the old states in *old_states_and_tids*,
+    ``{oid_int: (state, tid_int)}``, which must be set before
+    resolving.
+    """
 
-    def __init__(self, storage, old_states_and_tids):
-        self._old_states_and_tids = old_states_and_tids
+    def __init__(self, storage, old_states_and_tids=None):
+        self.old_states_and_tids = old_states_and_tids
         self._crs_transform_record_data = storage._crs_transform_record_data
         self._crs_untransform_record_data = storage._crs_untransform_record_data
 
     def loadSerial(self, oid, serial):
-        state, tid = self._old_states_and_tids[bytes8_to_int64(oid)]
+        state, tid = self.old_states_and_tids[bytes8_to_int64(oid)]
         assert bytes8_to_int64(serial) == tid
         return state
+
+    def _class_of(self, pickle):
+        # Only read the first record, ``(klass, args)`` or ``klass``.
+        # ZODB caches the class lookups done by ``find_global``.
+        unpickler = PersistentUnpickler(
+            find_global,
+            PersistentReferenceFactory().persistent_load,
+            BytesIO(self._crs_untransform_record_data(pickle)))
+        meta = unpickler.load()
+        klass = meta[0] if isinstance(meta, tuple) else meta
+        if isinstance(klass, tuple):
+            klass = find_global(*klass)
+        return klass
+
+    def group_by_class(self, conflicts_and_pickles):
+        """
+        Group ``(conflict, new_pickle)`` pairs by the class of the object.
+
+        Returns a dict ``{klass: [(conflict, new_pickle)]}``. If any class
+        cannot resolve conflicts, raises a `ConflictError` for the first
+        such object instead. Pickles whose class can't be determined are
+        grouped under None, leaving `tryToResolveConflict` to report the
+        problem.
+        """
+        by_class = {}
+        resolvable = {}
+        for conflict, pickle in conflicts_and_pickles:
+            try:
+                klass = self._class_of(pickle)
+                hash(klass)
+            except Exception: # pylint:disable=broad-except
+                klass = None
+            if klass is not None:
+                if klass not in resolvable:
+                    resolvable[klass] = hasattr(klass, '_p_resolveConflict')
+                if not resolvable[klass]:
+                    logger.debug("Conflict resolution on %s is not possible", klass)
+                    oid_int, committed_tid_int, tid_this_txn_saw_int, _ = conflict
+                    # The same order as when resolution fails.
+                    raise ConflictError(
+                        oid=int64_to_8bytes(oid_int),
+                        serials=(int64_to_8bytes(tid_this_txn_saw_int),
+                                 int64_to_8bytes(committed_tid_int)),
+                        data=pickle,
+                    )
+            by_class.setdefault(klass, []).append((conflict, pickle))
+        return by_class
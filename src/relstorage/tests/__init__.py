@@ -352,6 +352,7 @@ class MockPoller(object):
 
     poll_query = MockQuery('SELECT MAX(tid) FROM object_state')
     last_requested_range = None
+    transactions_may_go_backwards = False
     def __init__(self, driver=None):
         self.driver = driver or MockDriver()
         self.changes = []  # [(oid, tid)]
@@ -364,6 +365,9 @@ class MockPoller(object):
     def get_current_tid(self, _cursor):
         return self.poll_tid
 
+    def new_commit_listener(self):
+        return None
+
 
 class DisconnectedException(Exception):
     pass
@@ -412,6 +416,12 @@ class MockObjectMover(object):
     def load_current(self, _cursor, oid_int):
         return self.data.get(oid_int, (None, None))
 
+    def load_currents(self, _cursor, oid_ints):
+        for oid_int in oid_ints:
+            if oid_int in self.data:
+                state, tid_int = self.data[oid_int]
+                yield oid_int, state, tid_int
+
     def current_object_tids(self, _cursor, oids, timeout=None):
         # pylint:disable=unused-argument
         return {
@@ -39,6 +39,7 @@ import ZODB.tests.util
 from ZODB.Connection import TransactionMetaData
 from ZODB.DB import DB
 from ZODB.FileStorage import FileStorage
+from ZODB.POSException import ConflictError
 from ZODB.POSException import ReadConflictError
 from ZODB.POSException import ReadOnlyError
 from ZODB.serialize import referencesf
@@ -541,6 +542,85 @@ class GenericRelStorageTests(
         # If we clear the cache, we can still loadSerial()
         self.checkResolveConflictBetweenConnections(clear_cache=True)
 
+    def checkStoreConflictCheck(self):
+        # With store_conflict_check_size, store() finds conflicts
+        # that can't be resolved, and fetches the states to resolve
+        # those that can.
+        self._storage = self.make_storage(store_conflict_check_size=1)
+        # Establish a polling state; dostoreNP won't.
+        self._storage.poll_invalidations()
+        counter_oid = self._storage.new_oid()
+        counter = ConflictResolution.PCounter()
+        counter.inc()
+        counter_revid = self._dostoreNP(counter_oid, data=zodb_pickle(counter))
+        minpo_oid = self._storage.new_oid()
+        minpo_revid = self._dostoreNP(minpo_oid, data=zodb_pickle(MinPO(1)))
+        self._storage.poll_invalidations()
+
+        # This instance sees the objects as they are now...
+        storage = self._closing(self._storage.new_instance())
+        storage.load(counter_oid, '')
+        storage.load(minpo_oid, '')
+        # ...and then they change.
+        counter.inc()
+        self._dostoreNP(counter_oid, revid=counter_revid, data=zodb_pickle(counter))
+        self._dostoreNP(minpo_oid, revid=minpo_revid, data=zodb_pickle(MinPO(2)))
+
+        t = TransactionMetaData()
+        storage.tpc_begin(t)
+        storage.store(counter_oid, counter_revid, zodb_pickle(counter), '', t)
+        resolver = storage._tpc_phase.shared_state.conflict_resolver
+        self.assertEqual(
+            resolver.old_states_and_tids[bytes8_to_int64(counter_oid)][1],
+            bytes8_to_int64(counter_revid))
+        storage.tpc_vote(t)
+        storage.tpc_finish(t)
+        self._storage.poll_invalidations()
+        data, _ = self._storage.load(counter_oid, '')
+        self.assertEqual(zodb_unpickle(data)._value, 3)
+
+        t = TransactionMetaData()
+        storage.tpc_begin(t)
+        try:
+            with self.assertRaises(ConflictError):
+                storage.store(minpo_oid, minpo_revid, zodb_pickle(MinPO(3)), '', t)
+        finally:
+            storage.tpc_abort(t)
+
+    def checkStoreStreamReplacesAndResolves(self):
+        # With store_stream_size, each store() uploads. Storing the
+        # same object again replaces what was uploaded, as many times
+        # as needed, and a conflict on it can still be resolved when we vote.
+        self._storage = self.make_storage(store_stream_size=1)
+        # Establish a polling state; dostoreNP won't.
+        self._storage.poll_invalidations()
+        oid = self._storage.new_oid()
+        counter = ConflictResolution.PCounter()
+        counter.inc()
+        revid = self._dostoreNP(oid, data=zodb_pickle(counter))
+        self._storage.poll_invalidations()
+
+        storage = self._closing(self._storage.new_instance())
+        storage.load(oid, '')
+        counter.inc()
+        self._dostoreNP(oid, revid=revid, data=zodb_pickle(counter))
+
+        t = TransactionMetaData()
+        storage.tpc_begin(t)
+        other_oid = storage.new_oid()
+        for data in (zodb_pickle(MinPO(1)), zodb_pickle(MinPO(2)), zodb_pickle(counter)):
+            storage.store(oid, revid, data, '', t)
+            storage.store(other_oid, z64, data, '', t)
+            self.assertEqual(storage._tpc_phase.shared_state.temp_storage.unflushed_size, 0)
+        storage.tpc_vote(t)
+        storage.tpc_finish(t)
+
+        self._storage.poll_invalidations()
+        data, _ = self._storage.load(oid, '')
+        self.assertEqual(zodb_unpickle(data)._value, 3)
+        data, _ = self._storage.load(other_oid, '')
+        self.assertEqual(zodb_unpickle(data)._value, 2)
+
     def check16KObject(self):
         # Store 16 * 1024 bytes in an object, then retrieve it
         data = b'a 16 byte string' * 1024
@@ -940,6 +1020,58 @@ class GenericRelStorageTests(
             db.close()
             adapter.connmanager.close(test_conn, test_cursor)
 
+    def checkPackTrimsInvalidationLog(self):
+        # Once the invalidation log exists, packing trims it, even
+        # from a storage that doesn't have the option set.
+        self.make_storage(invalidation_log=True).close()
+        self._storage = self.make_storage(zap=False)
+        self.assertFalse(self._storage._options.invalidation_log)
+        connmanager = self._storage._adapter.connmanager
+
+        def count_log(_conn, cursor):
+            cursor.execute('SELECT COUNT(*) FROM invalidation_log')
+            return cursor.fetchall()[0][0]
+
+        def drop_log(_conn, cursor):
+            cursor.execute('DROP TABLE invalidation_log')
+
+        db = self._closing(DB(self._storage))
+        try:
+            c = self._closing(db.open())
+            r = c.root()
+            r['alpha'] = PersistentMapping()
+            transaction.commit()
+            del r['alpha']
+            transaction.commit()
+            self.assertGreater(connmanager.open_and_call(count_log), 0)
+
+            now = packtime = time.time()
+            while packtime <= now:
+                packtime = time.time()
+            self._storage.pack(packtime, referencesf)
+            self.assertEqual(connmanager.open_and_call(count_log), 0)
+        finally:
+            db.close()
+            connmanager.open_and_call(drop_log)
+
+    def checkInvalidationLogCheckedOnce(self):
+        # Commits only look for the invalidation log once, not
+        # every time.
+        mover = self._storage._adapter.mover
+        db = self._closing(DB(self._storage))
+        try:
+            c = self._closing(db.open())
+            r = c.root()
+            r['alpha'] = PersistentMapping()
+            transaction.commit()
+            self.assertFalse(mover._invalidation_log_exists)
+
+            mover._invalidation_log_exists_query = 'SELECT no_such_column FROM no_such_table'
+            r['beta'] = PersistentMapping()
+            transaction.commit()
+        finally:
+            db.close()
+
     def checkPackKeepNewObjects(self):
         # Packing should not remove objects created or modified after
         # the pack time, even if they are unreferenced.
@@ -1330,6 +1462,26 @@ class GenericRelStorageTests(
         conn.prefetch(z64, mapping)
         self.assertEqual(2, len(self._storage._cache))
 
+    def checkLoadMultiple(self):
+        db = DB(self._storage)
+        conn = db.open()
+
+        mapping = conn.root()['key'] = PersistentMapping()
+        transaction.commit()
+        self._storage._cache.clear()
+        self.assertEmpty(self._storage._cache)
+        storage = conn._storage
+
+        missing_oid = int64_to_8bytes(bytes8_to_int64(mapping._p_oid) + 100)
+        result = storage.load_multiple([z64, mapping._p_oid, missing_oid])
+        self.assertEqual(sorted(result), [z64, mapping._p_oid])
+        self.assertEqual(result[z64], storage.load(z64))
+        self.assertEqual(result[mapping._p_oid], storage.load(mapping._p_oid))
+        # Everything we found is now cached.
+        self.assertEqual(2, len(self._storage._cache))
+        conn.close()
+        db.close()
+
     ######
     # Parallel Commit Tests
     ######
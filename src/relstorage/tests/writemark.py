@@ -0,0 +1,183 @@
+"""Measure how many small transactions per second a storage commits.
+
+Several threads, each with its own ZODB connection, repeatedly commit
+transactions that modify a few objects of their own (so they never
+conflict). This is the workload where the commit lock, and the
+durable flush each commit does while holding it, limits throughput.
+
+With ``--hot``, each transaction also changes objects shared by all
+the threads, so most commits have conflicts to resolve (``resolvable``:
+a ``BTrees.Length`` and a BTree bucket) or fail with a
+``ConflictError`` (``unresolvable``: a ``PersistentMapping``).
+Conflicts are found and resolved while the transaction holds its row
+locks, so this measures how that affects throughput.
+
+Run like this::
+
+    bin/py relstorage/tests/writemark.py --threads 8 --duration 10 \\
+        --config storage.conf
+
+where ``storage.conf`` contains a ZConfig ``<relstorage>`` section (or
+any other storage section). Without ``--config``, a temporary SQLite
+database is used.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+import transaction
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
+from persistent.mapping import PersistentMapping
+from ZODB.DB import DB
+from ZODB.POSException import ConflictError
+
+
+def _open_sqlite_storage(path):
+    from relstorage.options import Options
+    from relstorage.storage import RelStorage
+    from relstorage.adapters.sqlite.adapter import Sqlite3Adapter
+    options = Options(keep_history=False)
+    adapter = Sqlite3Adapter(path, {}, options=options)
+    return RelStorage(adapter, options=options)
+
+
+def _open_storage(config_path):
+    import ZODB.config
+    with open(config_path) as f:
+        return ZODB.config.storageFromFile(f)
+
+
+class Writer(object):
+    """
+    Commits transactions in a thread until told to stop.
+    """
+
+    def __init__(self, db, name, object_count, object_size, hot=None):
+        self.db = db
+        self.name = name
+        self.hot = hot
+        self.object_count = object_count
+        self.data = b'x' * object_size
+        self.latencies = []
+        self.conflicts = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=name)
+
+    def setup(self, root):
+        root[self.name] = PersistentMapping(
+            (i, PersistentMapping({'data': self.data})) for i in range(self.object_count)
+        )
+
+    def run(self):
+        tm = transaction.TransactionManager()
+        conn = self.db.open(transaction_manager=tm)
+        try:
+            root = conn.root()
+            objects = root[self.name]
+            counter = 0
+            while not self.stopped.is_set():
+                counter += 1
+                tm.begin()
+                try:
+                    for obj in objects.values():
+                        obj['counter'] = counter
+                    if self.hot == 'resolvable':
+                        root['hot-length'].change(1)
+                        root['hot-tree'][self.name] = counter
+                    elif self.hot == 'unresolvable':
+                        root['hot-mapping'][self.name] = counter
+                    begin = time.time()
+                    tm.commit()
+                except ConflictError:
+                    tm.abort()
+                    self.conflicts += 1
+                    continue
+                self.latencies.append(time.time() - begin)
+        finally:
+            conn.close()
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def writemark(storage, threads, duration, object_count, object_size, hot=None):
+    db = DB(storage)
+    try:
+        writers = [
+            Writer(db, 'writer-%d' % i, object_count, object_size, hot)
+            for i in range(threads)
+        ]
+        with db.transaction() as conn:
+            root = conn.root()
+            root['hot-length'] = Length()
+            root['hot-tree'] = OOBTree()
+            root['hot-mapping'] = PersistentMapping()
+            for writer in writers:
+                writer.setup(root)
+        for writer in writers:
+            writer.thread.start()
+        began = time.time()
+        time.sleep(duration)
+        for writer in writers:
+            writer.stopped.set()
+        elapsed = time.time() - began
+        for writer in writers:
+            writer.thread.join()
+    finally:
+        db.close()
+
+    latencies = sorted(latency for writer in writers for latency in writer.latencies)
+    commits = len(latencies)
+    print("Threads:          %d" % threads)
+    print("Objects/txn:      %d of %d bytes" % (object_count, object_size))
+    print("Shared objects:   %s" % (hot or 'none'))
+    print("Transactions:     %d in %.2fs" % (commits, elapsed))
+    print("Throughput:       %.1f txn/s, %.1f objects/s" % (
+        commits / elapsed, commits * object_count / elapsed))
+    print("Commit latency:   mean %.2fms, median %.2fms, 99%% %.2fms" % (
+        1000 * sum(latencies) / max(commits, 1),
+        1000 * _percentile(latencies, 0.5),
+        1000 * _percentile(latencies, 0.99),
+    ))
+    print("Conflicts:        %d" % sum(writer.conflicts for writer in writers))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', help="A ZConfig file describing the storage.")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10,
+                        help="How many seconds to measure for.")
+    parser.add_argument('--objects', type=int, default=5,
+                        help="How many objects each transaction modifies.")
+    parser.add_argument('--object-size', type=int, default=256)
+    parser.add_argument('--hot', choices=('resolvable', 'unresolvable'),
+                        help="Also change objects shared by all the threads.")
+    args = parser.parse_args(argv)
+
+    temp_dir = None
+    if args.config:
+        storage = _open_storage(args.config)
+    else:
+        temp_dir = tempfile.mkdtemp(prefix='writemark-')
+        storage = _open_sqlite_storage(temp_dir + '/writemark.sqlite3')
+    try:
+        writemark(storage, args.threads, args.duration, args.objects, args.object_size,
+                  args.hot)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
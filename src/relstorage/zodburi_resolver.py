@@ -151,7 +151,7 @@ class RelStorageURIResolver(Resolver):
         'name', 'blob_dir', 'replica_conf',
         'cache_module_name', 'cache_prefix',
         'cache_delta_size_limit', 'cache_local_compression',
-        'driver',
+        'cache_object_index', 'driver',
     )
     _bytesize_args = (
         'blob_cache_size', 'blob_cache_size_check',